@@ -0,0 +1,53 @@
+"""
+Backup e restauração de um cliente em NDJSON (uma linha JSON por registro).
+
+Uso:
+    python backup_cliente.py exportar 42 -o cliente42.ndjson.gz
+    python backup_cliente.py importar cliente42.ndjson.gz
+
+Arquivo terminado em .gz é lido/gravado com gzip. Exportar e importar rodam
+em streaming (memória constante, qualquer tamanho de cliente). O import cria
+um cliente NOVO com ids novos; emails que já existam na base abortam tudo.
+"""
+import argparse
+import gzip
+import sys
+import time
+
+from cxdata_app import Base, engine, exportar_cliente, importar_cliente
+
+
+def _abrir(caminho: str, modo: str):
+    if caminho == '-':
+        return sys.stdout if 'w' in modo else sys.stdin
+    if caminho.endswith('.gz'):
+        return gzip.open(caminho, modo + 't', encoding='utf-8')
+    return open(caminho, modo, encoding='utf-8')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Exporta/importa um cliente em NDJSON.')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    exportar = comandos.add_parser('exportar', help='grava o cliente em NDJSON')
+    exportar.add_argument('cliente_id', type=int)
+    exportar.add_argument('-o', '--saida', default='-', help='arquivo (.ndjson ou .ndjson.gz); - = stdout')
+    importar = comandos.add_parser('importar', help='cria um cliente novo a partir de um export')
+    importar.add_argument('arquivo', help='arquivo (.ndjson ou .ndjson.gz); - = stdin')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.comando == 'exportar':
+        with _abrir(args.saida, 'w') as saida:
+            for pedaco in exportar_cliente(args.cliente_id):
+                saida.write(pedaco)
+        print(f"Cliente {args.cliente_id} exportado em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    else:
+        Base.metadata.create_all(bind=engine)
+        try:
+            with _abrir(args.arquivo, 'r') as entrada:
+                totais = importar_cliente(entrada)
+        except Exception as e:
+            print(f"Erro ao importar (nada foi gravado): {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Sucesso em {time.perf_counter() - inicio:.1f}s: " + ', '.join(f'{k}={n}' for k, n in totais.items()),
+              file=sys.stderr)
@@ -0,0 +1,98 @@
+"""
+Benchmark de memória por client: abre N clients simulados (NiceGUI User,
+sem browser) em cada página e mede o crescimento de RSS do processo e a
+estimativa de MemoriaClientes por client.
+
+Uso:
+    python benchmark_memoria.py --clientes 100 [--saida memoria.json]
+
+Sem DATABASE_URL usa uma base SQLite temporária gerada por
+gerar_dados_sinteticos (--escala); com DATABASE_URL usa a base indicada,
+que precisa ter o usuário --email com a senha --senha.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import simulacao
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Fora do Linux: pico de RSS (ru_maxrss vem em bytes no macOS)
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if sys.platform == 'darwin' else maximo * 1024
+
+
+async def medir_rotas(email: str, senha: str, n_clientes: int) -> list:
+    from nicegui import ui
+    from cxdata_app import MemoriaClientes
+
+    async with simulacao.app_simulado():
+        navegador = await simulacao.logar(email, senha)
+
+        # Primeiro dashboard visível para o usuário
+        home = await navegador.abrir('/')
+        grid = next(e for e in home.elements.values() if isinstance(e, ui.html) and 'data-dash-id' in e.content)
+        dash_id = grid.content.split('data-dash-id="', 1)[1].split('"', 1)[0]
+
+        resultados = []
+        for rota, modelo in (('/', '/'), (f'/dashboard/{dash_id}', '/dashboard/{dash_id}')):
+            await navegador.abrir(rota)  # aquecimento: caches e imports da página fora da medição
+            simulacao.apagar_clients()
+            gc.collect()
+            rss_antes = rss_bytes()
+            inicio = time.perf_counter()
+
+            for _ in range(n_clientes):
+                await navegador.abrir(rota)
+
+            duracao = time.perf_counter() - inicio
+            gc.collect()
+            crescimento = rss_bytes() - rss_antes
+            agregado = MemoriaClientes.por_rota(forcar=True).get(modelo, {})
+            resultados.append({
+                'rota': rota,
+                'clientes': n_clientes,
+                'rss_por_client_kb': round(crescimento / n_clientes / 1024, 1),
+                'estimativa_por_client_kb': round(agregado.get('bytes_por_client', 0) / 1024, 1),
+                'elementos_por_client': agregado.get('elementos_por_client', 0),
+                'build_ms': round(duracao / n_clientes * 1000, 2),
+            })
+        return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='RSS por client conectado em cada página.')
+    parser.add_argument('--clientes', type=int, default=100, help='clients simulados por página')
+    parser.add_argument('--escala', type=float, default=0.05, help='escala da base sintética temporária')
+    parser.add_argument('--email', default='admin@cliente1.example.com')
+    parser.add_argument('--senha', default=None)
+    parser.add_argument('--saida', help='grava o resultado em JSON (para comparar entre versões)')
+    args = parser.parse_args()
+
+    simulacao.preparar_ambiente()
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="cx-bench-")}/bench.db'
+        from gerar_dados_sinteticos import gerar_dados, SENHA_PADRAO
+        gerar_dados(escala=args.escala)
+        args.senha = args.senha or SENHA_PADRAO
+
+    resultados = asyncio.run(medir_rotas(args.email, args.senha, args.clientes))
+
+    print(f"{'rota':<20} {'clients':>8} {'RSS/client':>12} {'estimado/client':>16} {'elementos':>10} {'build':>10}")
+    for r in resultados:
+        print(f"{r['rota']:<20} {r['clientes']:>8} {r['rss_por_client_kb']:>9.1f} KB {r['estimativa_por_client_kb']:>13.1f} KB "
+              f"{r['elementos_por_client']:>10} {r['build_ms']:>7.2f} ms")
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2), encoding='utf-8')
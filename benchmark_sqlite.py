@@ -0,0 +1,138 @@
+"""
+Benchmark de concorrência no SQLite: threads leitoras (o caminho do login e da
+home) e threads escritoras (carimbo de versão, tema do cliente) ao mesmo tempo
+na mesma base, com o modo de produção (WAL + pragmas + fila de escrita) e com
+os padrões antigos (CX_SQLITE_TUNING=0), para comparar.
+
+Uso:
+    python benchmark_sqlite.py --leitores 16 --escritores 2 --segundos 10 [--saida sqlite.json]
+
+Cada modo roda num subprocesso com a sua própria base temporária (o modo WAL
+fica gravado no arquivo). Por modo: leituras/s, latência p50/p99 das leituras,
+escritas/s, p99 das escritas e quantas operações falharam ("database is locked").
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODOS = {'producao': '1', 'padrao': '0'}
+DASHBOARDS_POR_CLIENTE = 50
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def rodar_modo(leitores: int, escritores: int, segundos: float, clientes: int, pausa_escrita: float) -> dict:
+    """Roda dentro do subprocesso: DATABASE_URL e CX_SQLITE_TUNING já vêm do pai"""
+    from sqlalchemy.exc import OperationalError
+    from gerar_dados_sinteticos import gerar_clientes_fixos, SENHA_PADRAO
+    from cxdata_app import (engine, autenticar_usuario, obter_dashboards_autorizados, carimbar_versoes,
+                            TemasClientes, PERFIL_ADMIN)
+
+    emails = gerar_clientes_fixos([DASHBOARDS_POR_CLIENTE] * clientes)
+    fim = time.perf_counter() + segundos
+    leituras, escritas = [], []  # latências em ms (list.append é thread-safe)
+    erros = {'leitura': 0, 'escrita': 0}
+
+    def leitor(semente: int):
+        rng = random.Random(semente)
+        while time.perf_counter() < fim:
+            cliente_id = rng.randint(1, clientes)
+            inicio = time.perf_counter()
+            try:
+                autenticar_usuario(emails[cliente_id - 1], SENHA_PADRAO)
+                obter_dashboards_autorizados(cliente_id, PERFIL_ADMIN)
+            except OperationalError:
+                erros['leitura'] += 1
+                continue
+            leituras.append((time.perf_counter() - inicio) * 1000)
+
+    def escritor(semente: int):
+        rng = random.Random(semente)
+        while time.perf_counter() < fim:
+            cliente_id = rng.randint(1, clientes)
+            inicio = time.perf_counter()
+            try:
+                if rng.random() < 0.5:
+                    # Lê e escreve na mesma transação: o padrão que trava sem a fila
+                    with engine.begin() as conn:
+                        carimbar_versoes(conn, {cliente_id})
+                else:
+                    TemasClientes.definir(cliente_id, {'primary': f'#{rng.randrange(0x1000000):06x}'})
+            except OperationalError:
+                erros['escrita'] += 1
+                continue
+            escritas.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(pausa_escrita)
+
+    threads = ([threading.Thread(target=leitor, args=(i,)) for i in range(leitores)]
+               + [threading.Thread(target=escritor, args=(1000 + i,)) for i in range(escritores)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'leituras_s': round(len(leituras) / segundos, 1),
+        'leitura_p50_ms': round(statistics.median(leituras), 2) if leituras else 0.0,
+        'leitura_p99_ms': round(percentil(leituras, 0.99), 2),
+        'escritas_s': round(len(escritas) / segundos, 1),
+        'escrita_p99_ms': round(percentil(escritas, 0.99), 2),
+        'erros_leitura': erros['leitura'],
+        'erros_escrita': erros['escrita'],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Concorrência de leitura no SQLite sob carga mista.')
+    parser.add_argument('--leitores', type=int, default=16)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--clientes', type=int, default=20)
+    parser.add_argument('--pausa-escrita', type=float, default=0.01, help='segundos entre escritas de cada escritor')
+    parser.add_argument('--modos', default=','.join(MODOS), help='lista separada por vírgula: ' + ', '.join(MODOS))
+    parser.add_argument('--saida', help='grava os resultados em JSON')
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        resultado = rodar_modo(args.leitores, args.escritores, args.segundos, args.clientes, args.pausa_escrita)
+        print(json.dumps(resultado))
+        sys.exit(0)
+
+    resultados = {}
+    for modo in args.modos.split(','):
+        env = dict(os.environ, CX_SQLITE_TUNING=MODOS[modo],
+                   DATABASE_URL=f'sqlite:///{tempfile.mkdtemp(prefix="cx-bench-sqlite-")}/bench.db')
+        processo = subprocess.run(
+            [sys.executable, __file__, '--filho', modo, '--leitores', str(args.leitores),
+             '--escritores', str(args.escritores), '--segundos', str(args.segundos),
+             '--clientes', str(args.clientes), '--pausa-escrita', str(args.pausa_escrita)],
+            env=env, capture_output=True, text=True,
+        )
+        if processo.returncode != 0:
+            print(f'{modo}: falhou\n{processo.stderr}', file=sys.stderr)
+            sys.exit(1)
+        resultados[modo] = json.loads(processo.stdout.strip().splitlines()[-1])
+
+    colunas = list(next(iter(resultados.values())))
+    print(f"{'modo':<10}" + ''.join(f'{c:>16}' for c in colunas))
+    for modo, medidas in resultados.items():
+        print(f'{modo:<10}' + ''.join(f'{medidas[c]:>16g}' for c in colunas))
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({'parametros': {k: v for k, v in vars(args).items() if k != 'filho'}, 'resultados': resultados},
+                      f, indent=2)
+        print(f'\nResultados em {args.saida}')
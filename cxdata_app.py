@@ -1,1736 +1,4649 @@
 """
-
 CX Data - Enterprise Analytics Platform
-
 ============================================
-
 Versão 7.1: Topbar Navigation Premium
-
 """
 
-
-
-from nicegui import ui, app
-
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Text
-
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-
+from nicegui import ui, app, run, background_tasks, core, Client
+from nicegui.slot import Slot
+from fastapi import Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+import httpx
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Text, Index, event, select, text, func, cast, delete, null, tuple_, union_all, bindparam, inspect as inspecionar
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker, relationship, declarative_base, Session, InstanceState
+import asyncio
+import atexit
+import base64
+import bisect
+import cProfile
+import functools
+import gzip
 import hashlib
-
-from typing import Optional, List, Callable, Dict, Any
-
+import hmac
+import html
+import json
+import re
+import secrets
+import select as select_io
+import sys
+import threading
+import time
+import types
+import urllib.parse
+import urllib.request
+import uuid
+import zlib
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional, List, Callable, Dict, Any, Tuple, Iterable, Iterator
 import os
-
 from datetime import datetime, timedelta
-
 import random
 
-
-
 # ============================================================================
-
 # DESIGN SYSTEM - ENTERPRISE PREMIUM
-
 # ============================================================================
 
-
+# Tokens de marca que cada cliente pode sobrescrever (TemaCliente). Os valores
+# padrão viram custom properties no :root; o DS referencia as variáveis, então
+# trocar o tema não muda nenhum byte dos elementos, só o CSS do cliente.
+TEMA_PADRAO = {
+    'primary': '#0f62fe',
+    'primary-hover': '#0353e9',
+    'primary-active': '#002d9c',
+    'primary-light': '#e8f0ff',
+    'primary-ultra-light': '#f5f9ff',
+    'border-focus': '#0f62fe',
+    'shadow-focus': '0 0 0 3px rgba(15, 98, 254, 0.12)',
+    'font': '-apple-system, BlinkMacSystemFont, "Inter", "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif',
+}
 
 class DS:
-
-"""Design System - Enterprise Grade"""
-
-
-# Primary Colors - Sophisticated Blue
-
-PRIMARY = '#0f62fe'
-
-PRIMARY_HOVER = '#0353e9'
-
-PRIMARY_ACTIVE = '#002d9c'
-
-PRIMARY_LIGHT = '#e8f0ff'
-
-PRIMARY_ULTRA_LIGHT = '#f5f9ff'
-
-
-# Surfaces - Neutral & Clean
-
-SURFACE = '#ffffff'
-
-SURFACE_50 = '#f8f9fa'
-
-SURFACE_100 = '#f1f3f5'
-
-SURFACE_200 = '#e9ecef'
-
-SURFACE_HOVER = '#f8f9fa'
-
-SURFACE_ELEVATED = '#ffffff'
-
-
-# Borders - Subtle & Refined
-
-BORDER = '#dee2e6'
-
-BORDER_LIGHT = '#e9ecef'
-
-BORDER_HOVER = '#adb5bd'
-
-BORDER_FOCUS = '#0f62fe'
-
-
-# Text - Clear Hierarchy
-
-TEXT_PRIMARY = '#212529'
-
-TEXT_SECONDARY = '#495057'
-
-TEXT_TERTIARY = '#6c757d'
-
-TEXT_DISABLED = '#adb5bd'
-
-TEXT_INVERSE = '#ffffff'
-
-
-# Shadows - Depth & Elevation
-
-SHADOW_XS = '0 1px 2px 0 rgba(0, 0, 0, 0.03)'
-
-SHADOW_SM = '0 1px 3px 0 rgba(0, 0, 0, 0.06), 0 1px 2px 0 rgba(0, 0, 0, 0.04)'
-
-SHADOW_MD = '0 4px 8px -2px rgba(0, 0, 0, 0.08), 0 2px 4px -2px rgba(0, 0, 0, 0.04)'
-
-SHADOW_LG = '0 12px 24px -4px rgba(0, 0, 0, 0.10), 0 4px 8px -4px rgba(0, 0, 0, 0.06)'
-
-SHADOW_FOCUS = '0 0 0 3px rgba(15, 98, 254, 0.12)'
-
-
-# Typography - Professional Sans
-
-FONT = '-apple-system, BlinkMacSystemFont, "Inter", "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif'
-
-
-# Spacing
-
-SPACING_XS = '4px'
-
-SPACING_SM = '8px'
-
-SPACING_MD = '12px'
-
-SPACING_LG = '16px'
-
-SPACING_XL = '24px'
-
-SPACING_2XL = '32px'
-
-SPACING_3XL = '48px'
-
-
-# Radius - Consistent & Modern
-
-RADIUS_SM = '6px'
-
-RADIUS_MD = '8px'
-
-RADIUS_LG = '12px'
-
-RADIUS_XL = '16px'
-
-RADIUS_FULL = '9999px'
-
-
-# Transitions - Smooth & Fast
-
-TRANSITION_FAST = '120ms cubic-bezier(0.4, 0, 0.2, 1)'
-
-TRANSITION_BASE = '200ms cubic-bezier(0.4, 0, 0.2, 1)'
-
-TRANSITION_SLOW = '300ms cubic-bezier(0.4, 0, 0.2, 1)'
-
+    """Design System - Enterprise Grade"""
+
+    # Primary Colors - Sophisticated Blue (tematizáveis por cliente)
+    PRIMARY = 'var(--cx-primary)'
+    PRIMARY_HOVER = 'var(--cx-primary-hover)'
+    PRIMARY_ACTIVE = 'var(--cx-primary-active)'
+    PRIMARY_LIGHT = 'var(--cx-primary-light)'
+    PRIMARY_ULTRA_LIGHT = 'var(--cx-primary-ultra-light)'
+
+    # Surfaces - Neutral & Clean
+    SURFACE = '#ffffff'
+    SURFACE_50 = '#f8f9fa'
+    SURFACE_100 = '#f1f3f5'
+    SURFACE_200 = '#e9ecef'
+    SURFACE_HOVER = '#f8f9fa'
+    SURFACE_ELEVATED = '#ffffff'
+
+    # Borders - Subtle & Refined
+    BORDER = '#dee2e6'
+    BORDER_LIGHT = '#e9ecef'
+    BORDER_HOVER = '#adb5bd'
+    BORDER_FOCUS = 'var(--cx-border-focus)'
+
+    # Text - Clear Hierarchy
+    TEXT_PRIMARY = '#212529'
+    TEXT_SECONDARY = '#495057'
+    TEXT_TERTIARY = '#6c757d'
+    TEXT_DISABLED = '#adb5bd'
+    TEXT_INVERSE = '#ffffff'
+
+    # Shadows - Depth & Elevation
+    SHADOW_XS = '0 1px 2px 0 rgba(0, 0, 0, 0.03)'
+    SHADOW_SM = '0 1px 3px 0 rgba(0, 0, 0, 0.06), 0 1px 2px 0 rgba(0, 0, 0, 0.04)'
+    SHADOW_MD = '0 4px 8px -2px rgba(0, 0, 0, 0.08), 0 2px 4px -2px rgba(0, 0, 0, 0.04)'
+    SHADOW_LG = '0 12px 24px -4px rgba(0, 0, 0, 0.10), 0 4px 8px -4px rgba(0, 0, 0, 0.06)'
+    SHADOW_FOCUS = 'var(--cx-shadow-focus)'
+
+    # Typography - Professional Sans
+    FONT = 'var(--cx-font)'
+
+    # Spacing
+    SPACING_XS = '4px'
+    SPACING_SM = '8px'
+    SPACING_MD = '12px'
+    SPACING_LG = '16px'
+    SPACING_XL = '24px'
+    SPACING_2XL = '32px'
+    SPACING_3XL = '48px'
+
+    # Radius - Consistent & Modern
+    RADIUS_SM = '6px'
+    RADIUS_MD = '8px'
+    RADIUS_LG = '12px'
+    RADIUS_XL = '16px'
+    RADIUS_FULL = '9999px'
+
+    # Transitions - Smooth & Fast
+    TRANSITION_FAST = '120ms cubic-bezier(0.4, 0, 0.2, 1)'
+    TRANSITION_BASE = '200ms cubic-bezier(0.4, 0, 0.2, 1)'
+    TRANSITION_SLOW = '300ms cubic-bezier(0.4, 0, 0.2, 1)'
 
 
 # ============================================================================
-
 # LAYOUT COMPONENTS - ENTERPRISE
-
 # ============================================================================
 
-
-
 class LayoutComponents:
-
-@staticmethod
-
-def page_container(max_width: str = '1400px', padding: str = '32px'):
-
-return ui.column().classes('w-full').style(f'''
-
-padding: {padding};
-
-max-width: {max_width};
-
-margin: 0 auto;
-
-''')
-
-
-@staticmethod
-
-def page_header(title: str, subtitle: Optional[str] = None):
-
-with ui.column().classes('w-full gap-1').style(f'margin-bottom: {DS.SPACING_2XL};'):
-
-ui.label(title).classes('text-2xl').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 700;
-
-letter-spacing: -0.03em;
-
-line-height: 1.2;
-
-font-family: {DS.FONT};
-
-''')
-
-if subtitle:
-
-ui.label(subtitle).classes('text-sm').style(f'''
-
-color: {DS.TEXT_SECONDARY};
-
-line-height: 1.5;
-
-margin-top: 4px;
-
-''')
-
-
-@staticmethod
-
-def section_header(title: str, badge: Optional[str] = None):
-
-with ui.row().classes('w-full items-center gap-3').style(f'margin-bottom: {DS.SPACING_LG};'):
-
-ui.label(title).classes('text-sm').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 600;
-
-letter-spacing: -0.01em;
-
-''')
-
-if badge:
-
-ui.label(badge).classes('text-xs').style(f'''
-
-color: {DS.TEXT_TERTIARY};
-
-background: {DS.SURFACE_100};
-
-padding: 4px 10px;
-
-border-radius: {DS.RADIUS_FULL};
-
-font-weight: 500;
-
-letter-spacing: 0;
-
-''')
-
-
-
-@staticmethod
-
-def empty_state(icon: str, title: str, description: str):
-
-with ui.column().classes('w-full items-center justify-center').style(f'padding: {DS.SPACING_3XL} {DS.SPACING_XL};'):
-
-with ui.column().classes('items-center justify-center').style(f'''
-
-width: 56px;
-
-height: 56px;
-
-background: {DS.SURFACE_100};
-
-border-radius: {DS.RADIUS_LG};
-
-margin-bottom: {DS.SPACING_LG};
-
-'''):
-
-ui.icon(icon, size='28px').style(f'color: {DS.TEXT_DISABLED};')
-
-ui.label(title).classes('text-base').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 600;
-
-margin-bottom: {DS.SPACING_XS};
-
-''')
-
-ui.label(description).classes('text-sm text-center').style(f'''
-
-color: {DS.TEXT_SECONDARY};
-
-max-width: 360px;
-
-line-height: 1.5;
-
-''')
-
+    @staticmethod
+    def page_container(max_width: str = '1400px', padding: str = '32px'):
+        return ui.column().classes('w-full').style(f'''
+            padding: {padding};
+            max-width: {max_width};
+            margin: 0 auto;
+        ''')
+
+    @staticmethod
+    def page_header(title: str, subtitle: Optional[str] = None):
+        with ui.column().classes('w-full gap-1').style(f'margin-bottom: {DS.SPACING_2XL};'):
+            ui.label(title).classes('text-2xl').style(f'''
+                color: {DS.TEXT_PRIMARY};
+                font-weight: 700;
+                letter-spacing: -0.03em;
+                line-height: 1.2;
+                font-family: {DS.FONT};
+            ''')
+            if subtitle:
+                ui.label(subtitle).classes('text-sm').style(f'''
+                    color: {DS.TEXT_SECONDARY};
+                    line-height: 1.5;
+                    margin-top: 4px;
+                ''')
+
+    @staticmethod
+    def section_header(title: str, badge: Optional[str] = None):
+        with ui.row().classes('w-full items-center gap-3').style(f'margin-bottom: {DS.SPACING_LG};'):
+            ui.label(title).classes('text-sm').style(f'''
+                color: {DS.TEXT_PRIMARY};
+                font-weight: 600;
+                letter-spacing: -0.01em;
+            ''')
+            if badge:
+                ui.label(badge).classes('text-xs').style(f'''
+                    color: {DS.TEXT_TERTIARY};
+                    background: {DS.SURFACE_100};
+                    padding: 4px 10px;
+                    border-radius: {DS.RADIUS_FULL};
+                    font-weight: 500;
+                    letter-spacing: 0;
+                ''')
+
+    @staticmethod
+    def empty_state(icon: str, title: str, description: str):
+        with ui.column().classes('w-full items-center justify-center').style(f'padding: {DS.SPACING_3XL} {DS.SPACING_XL};'):
+            with ui.column().classes('items-center justify-center').style(f'''
+                width: 56px;
+                height: 56px;
+                background: {DS.SURFACE_100};
+                border-radius: {DS.RADIUS_LG};
+                margin-bottom: {DS.SPACING_LG};
+            '''):
+                ui.icon(icon, size='28px').style(f'color: {DS.TEXT_DISABLED};')
+            ui.label(title).classes('text-base').style(f'''
+                color: {DS.TEXT_PRIMARY};
+                font-weight: 600;
+                margin-bottom: {DS.SPACING_XS};
+            ''')
+            ui.label(description).classes('text-sm text-center').style(f'''
+                color: {DS.TEXT_SECONDARY};
+                max-width: 360px;
+                line-height: 1.5;
+            ''')
 
 
 # ============================================================================
-
 # TOPBAR NAVIGATION COMPONENT - PREMIUM
-
 # ============================================================================
 
-
-
 class TopbarNavigation:
+    @staticmethod
+    def create(cliente_nome: str, user_email: str, current_page: str = 'home', breadcrumb: Optional[List[Dict]] = None):
+        """
+        Topbar premium com branding, breadcrumb e user menu
+        current_page: 'home' ou 'dashboard'
+        breadcrumb: lista de dicts com 'label' e 'onClick' (opcional)
+        """
+        with ui.row().classes('w-full items-center justify-between').style(f'''
+            padding: 0 {DS.SPACING_2XL};
+            background: {DS.SURFACE};
+            border-bottom: 1px solid {DS.BORDER};
+            height: 64px;
+            position: fixed;
+            top: 0;
+            left: 0;
+            right: 0;
+            z-index: 1000;
+            backdrop-filter: blur(8px);
+            background: rgba(255, 255, 255, 0.95);
+        '''):
+            # Left: Branding + Breadcrumb
+            with ui.row().classes('items-center').style(f'gap: {DS.SPACING_XL};'):
+                # Branding (sempre presente)
+                branding = ui.row().classes('items-center cursor-pointer').style(f'gap: {DS.SPACING_MD};')
+                with branding:
+                    with ui.column().classes('items-center justify-center').style(f'''
+                        width: 32px;
+                        height: 32px;
+                        background: linear-gradient(135deg, {DS.PRIMARY} 0%, {DS.PRIMARY_HOVER} 100%);
+                        border-radius: {DS.RADIUS_MD};
+                        box-shadow: {DS.SHADOW_XS};
+                    '''):
+                        ui.icon('analytics', size='18px', color='white')
+                    ui.label('CX Data').classes('text-sm').style(f'''
+                        color: {DS.TEXT_PRIMARY};
+                        font-weight: 700;
+                        letter-spacing: -0.01em;
+                    ''')
+                branding.on('click', lambda: ui.navigate.to('/'))
+
+                # Separator
+                if breadcrumb:
+                    ui.separator().classes('h-6').style(f'background: {DS.BORDER}; opacity: 0.5;')
+
+                    # Breadcrumb (contextual)
+                    with ui.row().classes('items-center').style(f'gap: {DS.SPACING_SM};'):
+                        for i, item in enumerate(breadcrumb):
+                            is_last = i == len(breadcrumb) - 1
+                            label = ui.label(item['label']).classes('text-sm').style(f'''
+                                color: {DS.TEXT_PRIMARY if is_last else DS.TEXT_SECONDARY};
+                                font-weight: {600 if is_last else 500};
+                                transition: color {DS.TRANSITION_FAST};
+                                cursor: {"default" if is_last or 'onClick' not in item else "pointer"};
+                            ''')
+                            if 'onClick' in item and not is_last:
+                                label.on('click', item['onClick'])
+                                label.on('mouseenter', lambda e: e.sender.style(f'color: {DS.TEXT_PRIMARY};'))
+                                label.on('mouseleave', lambda e: e.sender.style(f'color: {DS.TEXT_SECONDARY};'))
+
+                            if not is_last:
+                                ui.icon('chevron_right', size='16px').style(f'color: {DS.TEXT_DISABLED};')
+
+            # Right: User Menu Premium
+            with ui.row().classes('items-center').style(f'gap: {DS.SPACING_MD};'):
+                # Paleta de comandos: HTML + JS estático, tudo no browser (só a lista vem do servidor, uma vez)
+                ui.add_head_html(f'<script defer src="{URL_PALETA_JS}"></script>')
+                ui.html(f'''<button class="cx-paleta-gatilho" type="button" onclick="cxAbrirPaleta()">
+                    {WorkspaceGrid.icon('search', '16px', DS.TEXT_TERTIARY)} Buscar workspace <kbd>Ctrl K</kbd>
+                </button>''', sanitize=False)
+
+                # Avatar + Info
+                user_menu = ui.row().classes('items-center cursor-pointer').style(f'''
+                    gap: {DS.SPACING_MD};
+                    padding: {DS.SPACING_SM} {DS.SPACING_MD};
+                    border-radius: {DS.RADIUS_MD};
+                    transition: background {DS.TRANSITION_FAST};
+                ''')
+
+                with user_menu:
+                    # Info (name + email)
+                    with ui.column().classes('items-end').style(f'gap: {DS.SPACING_XS};'):
+                        ui.label(cliente_nome.split()[0]).classes('text-sm').style(f'''
+                            color: {DS.TEXT_PRIMARY};
+                            font-weight: 600;
+                            line-height: 1;
+                        ''')
+                        ui.label(user_email).classes('text-xs').style(f'''
+                            color: {DS.TEXT_TERTIARY};
+                            line-height: 1;
+                        ''')
+
+                    # Avatar
+                    iniciais = ''.join([palavra[0].upper() for palavra in cliente_nome.split()[:2]])
+                    with ui.column().classes('items-center justify-center').style(f'''
+                        width: 36px;
+                        height: 36px;
+                        background: linear-gradient(135deg, {DS.PRIMARY_LIGHT} 0%, {DS.PRIMARY_ULTRA_LIGHT} 100%);
+                        border: 1.5px solid {DS.BORDER};
+                        border-radius: {DS.RADIUS_FULL};
+                        color: {DS.PRIMARY};
+                        font-size: 12px;
+                        font-weight: 700;
+                    '''):
+                        ui.label(iniciais)
+
+                    # Dropdown icon
+                    ui.icon('expand_more', size='18px').style(f'color: {DS.TEXT_TERTIARY};')
+
+                # Hover effect
+                user_menu.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER};'))
+                user_menu.on('mouseleave', lambda e: e.sender.style(f'background: transparent;'))
+
+                # Menu dropdown (via NiceGUI menu)
+                with user_menu:
+                    with ui.menu().props('offset-y').style(f'''
+                        background: {DS.SURFACE_ELEVATED};
+                        border: 1px solid {DS.BORDER};
+                        border-radius: {DS.RADIUS_LG};
+                        box-shadow: {DS.SHADOW_LG};
+                        padding: {DS.SPACING_SM};
+                        min-width: 200px;
+                    '''):
+                        # Menu items
+                        with ui.column().classes('w-full').style(f'gap: {DS.SPACING_XS};'):
+                            # Settings (disabled visually)
+                            settings_item = ui.row().classes('w-full items-center cursor-not-allowed').style(f'''
+                                gap: {DS.SPACING_MD};
+                                padding: {DS.SPACING_SM} {DS.SPACING_MD};
+                                border-radius: {DS.RADIUS_SM};
+                                opacity: 0.5;
+                            ''')
+                            with settings_item:
+                                ui.icon('settings', size='18px').style(f'color: {DS.TEXT_TERTIARY};')
+                                ui.label('Configurações').classes('text-sm').style(f'color: {DS.TEXT_SECONDARY};')
+
+                            ui.separator().style(f'background: {DS.BORDER}; margin: {DS.SPACING_SM} 0;')
+
+                            # Logout
+                            def logout_action():
+                                AppState.atual().logout()
+                                ui.navigate.to('/login')
+
+                            logout_item = ui.row().classes('w-full items-center cursor-pointer').style(f'''
+                                gap: {DS.SPACING_MD};
+                                padding: {DS.SPACING_SM} {DS.SPACING_MD};
+                                border-radius: {DS.RADIUS_SM};
+                                transition: background {DS.TRANSITION_FAST};
+                            ''')
+                            with logout_item:
+                                ui.icon('logout', size='18px').style(f'color: {DS.TEXT_SECONDARY};')
+                                ui.label('Sair').classes('text-sm').style(f'color: {DS.TEXT_SECONDARY}; font-weight: 500;')
+
+                            logout_item.on('click', logout_action)
+                            logout_item.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER};'))
+                            logout_item.on('mouseleave', lambda e: e.sender.style(f'background: transparent;'))
 
-@staticmethod
 
-def create(cliente_nome: str, user_email: str, current_page: str = 'home', breadcrumb: Optional[List[Dict]] = None):
-
-"""
+# ============================================================================
+# UI COMPONENTS - PREMIUM
+# ============================================================================
 
-Topbar premium com branding, breadcrumb e user menu
+class UIComponents:
+    @staticmethod
+    def input_field(label: str, password: bool = False, placeholder: str = '', icon: Optional[str] = None):
+        with ui.column().classes('w-full').style(f'gap: {DS.SPACING_SM};'):
+            ui.label(label).classes('text-sm').style(f'''
+                color: {DS.TEXT_SECONDARY};
+                font-weight: 500;
+            ''')
+            with ui.row().classes('w-full items-center relative'):
+                if icon:
+                    ui.icon(icon, size='18px').classes('absolute z-10').style(f'''
+                        left: 14px;
+                        color: {DS.TEXT_TERTIARY};
+                        pointer-events: none;
+                    ''')
+                input_elem = ui.input(placeholder=placeholder, password=password).classes('w-full').props('outlined borderless').style(f'''
+                    background: {DS.SURFACE};
+                    border: 1.5px solid {DS.BORDER};
+                    border-radius: {DS.RADIUS_MD};
+                    padding-left: {"44px" if icon else "14px"};
+                    transition: all {DS.TRANSITION_FAST};
+                    height: 44px;
+                    font-size: 14px;
+                ''')
+                input_elem.on('focus', lambda e: e.sender.style(f'''
+                    border-color: {DS.BORDER_FOCUS};
+                    box-shadow: {DS.SHADOW_FOCUS};
+                '''))
+                input_elem.on('blur', lambda e: e.sender.style(f'''
+                    border-color: {DS.BORDER};
+                    box-shadow: none;
+                '''))
+                return input_elem
+
+    @staticmethod
+    def primary_button(text: str, on_click=None, full_width: bool = False, icon: Optional[str] = None):
+        btn = ui.button(text, on_click=on_click).props('no-caps flat').style(f'''
+            background: {DS.PRIMARY};
+            color: {DS.TEXT_INVERSE};
+            border-radius: {DS.RADIUS_MD};
+            padding: 0 20px;
+            font-weight: 600;
+            font-size: 14px;
+            height: 44px;
+            box-shadow: {DS.SHADOW_XS};
+            transition: all {DS.TRANSITION_FAST};
+            {"width: 100%;" if full_width else ""}
+        ''')
+        if icon: btn.props(f'icon={icon}')
+        btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.PRIMARY_HOVER}; box-shadow: {DS.SHADOW_SM};'))
+        btn.on('mouseleave', lambda e: e.sender.style(f'background: {DS.PRIMARY}; box-shadow: {DS.SHADOW_XS};'))
+        return btn
+
+    @staticmethod
+    def ghost_button(text: str, on_click=None, icon: Optional[str] = None):
+        btn = ui.button(text, on_click=on_click).props('no-caps flat').style(f'''
+            background: transparent;
+            color: {DS.TEXT_SECONDARY};
+            border: 1.5px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_MD};
+            padding: 0 16px;
+            height: 36px;
+            font-weight: 500;
+            font-size: 13px;
+            transition: all {DS.TRANSITION_FAST};
+        ''')
+        if icon: btn.props(f'icon={icon}')
+        btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER}; border-color: {DS.BORDER_HOVER}; color: {DS.TEXT_PRIMARY};'))
+        btn.on('mouseleave', lambda e: e.sender.style(f'background: transparent; border-color: {DS.BORDER}; color: {DS.TEXT_SECONDARY};'))
+        return btn
+
+    @staticmethod
+    def icon_button(icon: str, on_click=None, tooltip: str = ''):
+        btn = ui.button(icon=icon, on_click=on_click).props('flat round dense').style(f'''
+            color: {DS.TEXT_SECONDARY};
+            transition: all {DS.TRANSITION_FAST};
+        ''')
+        if tooltip: btn.tooltip(tooltip)
+        btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER}; color: {DS.TEXT_PRIMARY};'))
+        btn.on('mouseleave', lambda e: e.sender.style(f'background: transparent; color: {DS.TEXT_SECONDARY};'))
+        return btn
 
-current_page: 'home' ou 'dashboard'
 
-breadcrumb: lista de dicts com 'label' e 'onClick' (opcional)
+# ============================================================================
+# SKELETON LOADER - REFINED
+# ============================================================================
 
-"""
+class SkeletonLoader:
+    @staticmethod
+    def create(height: str = '100%'):
+        # Gradiente e @keyframes shimmer vêm do CSS global (.cx-skeleton)
+        ui.element('div').classes('cx-skeleton').style(f'height: {height};')
 
-with ui.row().classes('w-full items-center justify-between').style(f'''
 
-padding: 0 {DS.SPACING_2XL};
+# ============================================================================
+# WORKSPACE GRID - FRAGMENTO HTML COMPARTILHADO
+# ============================================================================
 
-background: {DS.SURFACE};
+class WorkspaceGrid:
+    """
+    Grid de workspaces renderizado como um único fragmento HTML.
+    O resultado só depende de (cliente_id, perfil), por isso é cacheado e
+    reaproveitado entre usuários; hover e navegação ficam no browser (CSS + href).
+    """
+
+    @staticmethod
+    def icon(name: str, size: str, color: str) -> str:
+        return (f'<i class="q-icon notranslate material-icons" aria-hidden="true" role="img" '
+                f'style="font-size: {size}; color: {color};">{name}</i>')
+
+    @staticmethod
+    def card(idx: int, dash_id: int, nome: str, tipo: str) -> str:
+        """Só os dados do card vão inline; o visual é da classe cx-workspace-card (estilos globais)"""
+        return (
+            f'<a class="cx-workspace-card nicegui-column cursor-pointer" href="/dashboard/{dash_id}" data-dash-id="{dash_id}" '
+            f'style="animation-delay: {min(idx, CARD_STAGGER_MAX) * 0.04:.2f}s">'
+            f'<div class="cx-workspace-topo nicegui-row items-start justify-between w-full">'
+            f'<div class="cx-workspace-icone nicegui-column items-center justify-center">{_ICONE_CARD}</div>{_ICONE_MAIS}</div>'
+            f'<div class="cx-workspace-corpo nicegui-column">'
+            f'<div class="cx-workspace-nome text-base">{html.escape(nome)}</div>'
+            f'<div class="cx-workspace-tipo text-xs">{html.escape(tipo.capitalize())} · Dashboard</div></div>'
+            f'<div class="cx-workspace-rodape nicegui-row w-full items-center justify-between">'
+            f'<div class="text-xs">Abrir workspace</div>{_ICONE_ABRIR}</div></a>'
+        )
+
+    @staticmethod
+    def render_html(workspaces: Tuple[Tuple[int, str, str], ...]) -> str:
+        """Recebe tuplas (id, nome, tipo); retorna '' quando não há dashboards (a página mostra o empty state)"""
+        if not workspaces:
+            return ''
+        total = len(workspaces)
+        cards = ''.join(WorkspaceGrid.card(idx, *ws) for idx, ws in enumerate(workspaces))
+        return f'''
+            <div class="nicegui-row w-full items-center justify-between" style="margin-bottom: {DS.SPACING_XL};">
+                <div class="text-sm" style="color: {DS.TEXT_PRIMARY}; font-weight: 600;">Todos os workspaces</div>
+                <div class="cx-workspace-total text-xs" style="
+                    color: {DS.TEXT_TERTIARY};
+                    background: {DS.SURFACE_100};
+                    padding: 4px 12px;
+                    border-radius: {DS.RADIUS_FULL};
+                    font-weight: 500;
+                ">{total} {"workspace" if total == 1 else "workspaces"}</div>
+            </div>
+            <div class="cx-workspace-grid w-full" style="
+                display: grid;
+                grid-template-columns: repeat(auto-fill, minmax(340px, 1fr));
+                gap: {DS.SPACING_XL};
+            ">{cards}</div>
+        '''
+
+
+# A entrada escalonada para no 20º card: com 1000 cards o último não pode esperar 40s
+CARD_STAGGER_MAX = 20
+# Ícones do card sem style: tamanho e cor vêm de .cx-workspace-card nos estilos globais
+_ICONE_CARD, _ICONE_MAIS, _ICONE_ABRIR = (f'<i class="q-icon notranslate material-icons" aria-hidden="true" role="img">{nome}</i>'
+                                          for nome in ('bar_chart', 'more_horiz', 'arrow_forward'))
 
-border-bottom: 1px solid {DS.BORDER};
 
-height: 64px;
+# ============================================================================
+# PAINEL - VÁRIOS DASHBOARDS LADO A LADO
+# ============================================================================
 
-position: fixed;
+SPLIT_VIEW_MAX = int(os.getenv('CX_SPLIT_VIEW_MAX', 12))
+SPLIT_VIEW_SUSPEND_SECONDS = float(os.getenv('CX_SPLIT_VIEW_SUSPEND_SECONDS', 30))
+
+class PainelGrid:
+    """
+    Grid do painel como um único fragmento HTML. Os iframes saem sem src (só
+    data-cx-src): quem carrega e suspende é cxAtivarIframesPorVisibilidade, no
+    browser, conforme cada célula entra ou sai da tela.
+    """
+
+    @staticmethod
+    def celula(dash_id: int, nome: str, link: str) -> str:
+        return f'''
+            <div class="cx-painel-celula nicegui-column" data-dash-id="{dash_id}" style="
+                background: {DS.SURFACE_ELEVATED};
+                border: 1px solid {DS.BORDER};
+                border-radius: {DS.RADIUS_LG};
+                box-shadow: {DS.SHADOW_SM};
+                overflow: hidden;
+                height: calc(50vh - 56px);
+                min-height: 320px;
+                gap: 0;
+            ">
+                <div class="nicegui-row w-full items-center justify-between" style="
+                    padding: {DS.SPACING_SM} {DS.SPACING_LG};
+                    border-bottom: 1px solid {DS.BORDER_LIGHT};
+                ">
+                    <div class="text-sm" style="color: {DS.TEXT_PRIMARY}; font-weight: 600;">{html.escape(nome)}</div>
+                    <a class="text-xs" href="/dashboard/{dash_id}" style="color: {DS.PRIMARY}; font-weight: 600; text-decoration: none;">Abrir sozinho</a>
+                </div>
+                <iframe data-cx-src="{html.escape(link, quote=True)}" style="
+                    flex: 1;
+                    width: 100%;
+                    border: none;
+                    background: {DS.SURFACE};
+                " allowfullscreen></iframe>
+            </div>
+        '''
+
+    @staticmethod
+    def render_html(dashboards: List[Tuple[int, str, str]]) -> str:
+        """Recebe tuplas (id, nome, link do iframe) na ordem da URL"""
+        celulas = ''.join(PainelGrid.celula(*dash) for dash in dashboards)
+        return f'''
+            <div class="cx-painel-grid w-full" style="
+                display: grid;
+                grid-template-columns: repeat(auto-fill, minmax(560px, 1fr));
+                gap: {DS.SPACING_LG};
+            ">{celulas}</div>
+        '''
 
-top: 0;
 
-left: 0;
+# ============================================================================
+# PASTAS - HOME EM ÁRVORE COM EXPANSÃO SOB DEMANDA
+# ============================================================================
 
-right: 0;
+class PastasGrid:
+    """
+    Home de cliente com pastas. Cada nível é um fragmento HTML: subpastas como
+    <details> fechados (o corpo vem vazio) seguidas do grid de cards do nível.
+    Abrir uma pasta busca /api/pastas/{id} (script pastas.js), então o primeiro
+    render só tem a raiz, qualquer que seja a profundidade da árvore.
+    """
+
+    @staticmethod
+    def pasta(pasta_id: int, nome: str, total: int) -> str:
+        return f'''
+            <details class="cx-pasta" data-pasta-id="{pasta_id}">
+                <summary class="cx-pasta-titulo">
+                    {WorkspaceGrid.icon('folder', '20px', DS.PRIMARY)}
+                    <span class="cx-pasta-nome">{html.escape(nome)}</span>
+                    <span class="cx-pasta-total">{total}</span>
+                </summary>
+                <div class="cx-pasta-conteudo"></div>
+            </details>
+        '''
+
+    @staticmethod
+    def render_html(subpastas: tuple, dashboards: tuple) -> str:
+        """Um nível: subpastas (id, nome, total) e dashboards (id, nome, tipo) que estão direto nele"""
+        pastas = ''.join(PastasGrid.pasta(*p) for p in subpastas)
+        cards = ''.join(WorkspaceGrid.card(idx, *ws) for idx, ws in enumerate(dashboards))
+        return (f'<div class="cx-pastas-lista">{pastas}</div>' if pastas else '') + (f'''
+            <div class="cx-workspace-grid w-full" style="
+                display: grid;
+                grid-template-columns: repeat(auto-fill, minmax(340px, 1fr));
+                gap: {DS.SPACING_XL};
+            ">{cards}</div>''' if cards else '')
+
+    @staticmethod
+    def render_raiz(total: int, nivel: str) -> str:
+        return f'''
+            <div class="nicegui-row w-full items-center justify-between" style="margin-bottom: {DS.SPACING_XL};">
+                <div class="text-sm" style="color: {DS.TEXT_PRIMARY}; font-weight: 600;">Todos os workspaces</div>
+                <div class="cx-workspace-total text-xs" style="
+                    color: {DS.TEXT_TERTIARY};
+                    background: {DS.SURFACE_100};
+                    padding: 4px 12px;
+                    border-radius: {DS.RADIUS_FULL};
+                    font-weight: 500;
+                ">{total} {"workspace" if total == 1 else "workspaces"}</div>
+            </div>
+            <div class="cx-pastas w-full">{nivel}</div>
+        '''
 
-z-index: 1000;
 
-backdrop-filter: blur(8px);
+# ============================================================================
+# OBSERVABILIDADE - TRACING
+# ============================================================================
 
-background: rgba(255, 255, 255, 0.95);
+# 0 desliga o tracing por completo (decorators devolvem a função original)
+TRACE_SAMPLE_RATE = float(os.getenv('CX_TRACE_SAMPLE_RATE', 0))
+TRACE_EXPORTER = os.getenv('CX_TRACE_EXPORTER', 'file')  # 'file' (JSONL) ou 'otlp' (OTLP/HTTP JSON)
+TRACE_FILE = os.getenv('CX_TRACE_FILE', 'traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.getenv('CX_TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_FLUSH_INTERVAL = float(os.getenv('CX_TRACE_FLUSH_INTERVAL', 2))
+TRACE_BUFFER_MAX = int(os.getenv('CX_TRACE_BUFFER_MAX', 50000))
+TRACE_FLUSH_MAX_DEFER = int(os.getenv('CX_TRACE_FLUSH_MAX_DEFER', 10))
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'nome', 'inicio_ns', 'fim_ns', 'atributos', 'erro')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], nome: str, atributos: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.nome = nome
+        self.atributos = atributos
+        self.erro: Optional[str] = None
+        self.inicio_ns = time.time_ns()
+        self.fim_ns: Optional[int] = None
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+                'nome': self.nome, 'inicio_ns': self.inicio_ns, 'fim_ns': self.fim_ns,
+                'duracao_ms': round((self.fim_ns - self.inicio_ns) / 1e6, 3),
+                'atributos': self.atributos, 'erro': self.erro}
+
+    def para_otlp(self) -> Dict[str, Any]:
+        return {
+            'traceId': self.trace_id, 'spanId': self.span_id, 'parentSpanId': self.parent_id or '',
+            'name': self.nome, 'kind': 1,
+            'startTimeUnixNano': str(self.inicio_ns), 'endTimeUnixNano': str(self.fim_ns),
+            'attributes': [{'key': k, 'value': {'stringValue': str(v)}} for k, v in self.atributos.items()],
+            'status': {'code': 2, 'message': self.erro} if self.erro else {'code': 0},
+        }
+
+
+class ExportadorSpans:
+    """Bufferiza spans em memória e descarrega em lote numa thread própria (arquivo JSONL ou OTLP/HTTP)"""
+    def __init__(self):
+        self._fila: deque = deque(maxlen=TRACE_BUFFER_MAX)
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    def enviar(self, span: Span):
+        self._fila.append(span)
+        if not self._iniciado:
+            self._iniciado = True
+            threading.Thread(target=self._loop, name='cx-exportador-spans', daemon=True).start()
+            atexit.register(self.descarregar)
+
+    def _loop(self):
+        adiamentos = 0
+        while True:
+            time.sleep(TRACE_FLUSH_INTERVAL)
+            # Loop sobrecarregado: o flush (serialização disputa o GIL) é adiado,
+            # até a fila chegar à metade ou por no máximo TRACE_FLUSH_MAX_DEFER ciclos
+            if (MonitorLagLoop.deve_adiar() and adiamentos < TRACE_FLUSH_MAX_DEFER
+                    and len(self._fila) < TRACE_BUFFER_MAX // 2):
+                adiamentos += 1
+                MonitorLagLoop.adiados += 1
+                continue
+            adiamentos = 0
+            try:
+                self.descarregar()
+            except Exception as e:
+                print(f"AVISO: falha ao exportar spans ({e}).")
+
+    def descarregar(self):
+        with self._lock:
+            lote = []
+            while self._fila:
+                lote.append(self._fila.popleft())
+            if not lote:
+                return
+            if TRACE_EXPORTER == 'otlp':
+                corpo = json.dumps({'resourceSpans': [{
+                    'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'cxdata'}}]},
+                    'scopeSpans': [{'scope': {'name': 'cxdata'}, 'spans': [s.para_otlp() for s in lote]}],
+                }]}).encode()
+                req = urllib.request.Request(TRACE_OTLP_ENDPOINT, data=corpo, headers={'Content-Type': 'application/json'})
+                urllib.request.urlopen(req, timeout=5).close()
+            else:
+                with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(s.para_dict(), default=str) + '\n' for s in lote)
+
+
+class Tracer:
+    """
+    Spans com trace id por conexão (client NiceGUI). A amostragem é decidida
+    por trace; fora de um trace amostrado, span() devolve um no-op.
+    """
+    habilitado = TRACE_SAMPLE_RATE > 0
+    exportador = ExportadorSpans()
+    _atual: ContextVar[Optional[Span]] = ContextVar('cx_span_atual', default=None)
+
+    @staticmethod
+    def amostrado(trace_id: str) -> bool:
+        return int(trace_id[:8], 16) < TRACE_SAMPLE_RATE * 0x100000000
+
+    @classmethod
+    def iniciar(cls, nome: str, trace_id: Optional[str] = None, **atributos) -> Optional[Span]:
+        """Sem trace_id cria um filho do span atual (ou nada, se não houver span ativo)"""
+        pai = cls._atual.get()
+        if trace_id is None:
+            if pai is None:
+                return None
+            return Span(pai.trace_id, pai.span_id, nome, atributos)
+        if not cls.amostrado(trace_id):
+            return None
+        return Span(trace_id, pai.span_id if pai is not None and pai.trace_id == trace_id else None, nome, atributos)
+
+    @classmethod
+    def finalizar(cls, span: Optional[Span], erro: Optional[BaseException] = None):
+        if span is None:
+            return
+        span.fim_ns = time.time_ns()
+        if erro is not None:
+            span.erro = f'{type(erro).__name__}: {erro}'
+        cls.exportador.enviar(span)
+
+    @classmethod
+    @contextmanager
+    def span(cls, nome: str, trace_id: Optional[str] = None, **atributos):
+        span = cls.iniciar(nome, trace_id, **atributos) if cls.habilitado else None
+        if span is None:
+            yield None
+            return
+        token = cls._atual.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            cls.finalizar(span, e)
+            raise
+        else:
+            cls.finalizar(span)
+        finally:
+            cls._atual.reset(token)
+
+
+def _trace_id_da_conexao() -> str:
+    """Trace id estável por client NiceGUI (o id do client já é um uuid4)"""
+    slot_stack = Slot.get_stack()
+    if slot_stack:
+        return uuid.UUID(slot_stack[-1].parent.client.id).hex
+    return uuid.uuid4().hex
+
+def rastreado(nome: str, raiz: bool = False):
+    """
+    Envolve a função em um span. raiz=True (páginas e event handlers) abre o
+    trace da conexão atual; nos demais casos o span só existe dentro de um
+    trace já amostrado. Com o tracing desligado devolve a própria função.
+    """
+    def decorador(func):
+        if not Tracer.habilitado:
+            return func
+
+        def abrir_span():
+            if not raiz:
+                return Tracer.span(nome)
+            trace_id = _trace_id_da_conexao()
+            return Tracer.span(nome, trace_id=trace_id, **{'client.id': str(uuid.UUID(trace_id))})
+
+        def medir_websocket(span: Optional[Span]):
+            # Tempo entre o fim do build e o websocket do client conectar
+            slot_stack = Slot.get_stack()
+            if span is None or not slot_stack:
+                return
+            client = slot_stack[-1].parent.client
+            if client.has_socket_connection:
+                return
+            conexao = Span(span.trace_id, span.span_id, 'websocket.connect', {'pagina': nome})
+            conectado = []
+            def ao_conectar():
+                if not conectado:
+                    conectado.append(True)
+                    Tracer.finalizar(conexao)
+            client.on_connect(ao_conectar)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with abrir_span() as span:
+                    resultado = await func(*args, **kwargs)
+                    if raiz and nome.startswith('page_'):
+                        medir_websocket(span)
+                    return resultado
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with abrir_span() as span:
+                    resultado = func(*args, **kwargs)
+                    if raiz and nome.startswith('page_'):
+                        medir_websocket(span)
+                    return resultado
+        return wrapper
+    return decorador
+
+if Tracer.habilitado:
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _sql_inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('cx_spans_sql', []).append(
+            Tracer.iniciar('sql', **{'db.system': conn.dialect.name, 'db.statement': statement[:1000]})
+        )
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _sql_fim(conn, cursor, statement, parameters, context, executemany):
+        pilha = conn.info.get('cx_spans_sql')
+        if pilha:
+            Tracer.finalizar(pilha.pop())
+
+    @event.listens_for(Engine, 'handle_error')
+    def _sql_erro(contexto):
+        pilha = contexto.connection.info.get('cx_spans_sql') if contexto.connection is not None else None
+        if pilha:
+            Tracer.finalizar(pilha.pop(), contexto.original_exception)
 
-'''):
 
-# Left: Branding + Breadcrumb
+# ============================================================================
+# OBSERVABILIDADE - PROFILER SOB DEMANDA
+# ============================================================================
 
-with ui.row().classes('items-center').style(f'gap: {DS.SPACING_XL};'):
+PROFILE_DIR = Path(os.getenv('CX_PROFILE_DIR', 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('CX_PROFILE_MAX_FILES', 50))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('CX_PROFILE_SAMPLE_INTERVAL', 0.001))
+
+class AmostradorPilhas(threading.Thread):
+    """
+    Amostra a pilha de uma thread em intervalo fixo; gera o formato "collapsed" dos
+    flamegraphs. Só amostra com `medindo` ligado (os trechos da função capturada).
+    """
+    def __init__(self, thread_id: int):
+        super().__init__(name='cx-amostrador-pilhas', daemon=True)
+        self.thread_id = thread_id
+        self.amostras: Counter = Counter()
+        self.medindo = threading.Event()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(PROFILE_SAMPLE_INTERVAL):
+            if not self.medindo.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                pilha.append(f'{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})')
+                frame = frame.f_back
+            if pilha:
+                self.amostras[';'.join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{pilha} {n}\n' for pilha, n in self.amostras.most_common())
+
+
+class Captura:
+    """cProfile + amostrador de uma captura, ligados só enquanto a função capturada está rodando"""
+    def __init__(self):
+        self.perfil = cProfile.Profile()
+        self.amostrador = AmostradorPilhas(threading.get_ident())
+
+    def ligar(self):
+        self.perfil.enable()
+        self.amostrador.medindo.set()
+
+    def desligar(self):
+        self.amostrador.medindo.clear()
+        self.perfil.disable()
+
+    async def aguardar(self, corrotina):
+        """
+        Roda a corrotina passo a passo, medindo só os trechos síncronos dela: durante
+        um await o loop roda as corrotinas dos outros clients, que ficam de fora
+        """
+        return await self._passos(corrotina)
+
+    @types.coroutine
+    def _passos(self, corrotina):
+        valor, erro = None, None
+        while True:
+            self.ligar()
+            try:
+                pedido = corrotina.send(valor) if erro is None else corrotina.throw(erro)
+            except StopIteration as fim:
+                return fim.value
+            finally:
+                self.desligar()
+            try:
+                valor, erro = (yield pedido), None
+            except BaseException as e:
+                valor, erro = None, e
+
+
+class ProfilerSobDemanda:
+    """
+    Admin arma N capturas para um usuário (email) ou para o próprio cliente; os
+    próximos builds de página / event handlers dele rodam sob cProfile + amostrador
+    de pilhas. Tudo é do cliente do admin: o alvo só casa com usuários dele e as
+    capturas salvas levam o id do cliente no nome. Uma captura por vez no processo
+    (o cProfile é global); com outra rodando, a request segue sem ser capturada.
+    Sem nada armado o custo por request é checar um dict vazio.
+    """
+    _lock = threading.Lock()
+    _capturando = threading.Lock()
+    armados: Dict[Tuple[int, str, str], int] = {}  # (cliente_id, 'email' | 'cliente', valor) -> capturas restantes
+
+    @classmethod
+    def armar(cls, cliente_id: int, tipo: str, valor: str, quantidade: int):
+        with cls._lock:
+            cls.armados[(cliente_id, tipo, valor)] = quantidade
+
+    @classmethod
+    def desarmar(cls, cliente_id: int, tipo: str, valor: str):
+        with cls._lock:
+            cls.armados.pop((cliente_id, tipo, valor), None)
+
+    @classmethod
+    def armados_do_cliente(cls, cliente_id: int) -> Dict[Tuple[str, str], int]:
+        return {(tipo, valor): restantes for (cid, tipo, valor), restantes in list(cls.armados.items())
+                if cid == cliente_id}
+
+    @classmethod
+    def consumir(cls) -> Optional[Tuple[int, str, str]]:
+        """Retorna o alvo armado que casa com o usuário atual (e desconta uma captura)"""
+        user = AppState.atual().get_user_completo()
+        if user is None:
+            return None
+        with cls._lock:
+            for alvo in ((user.cliente_id, 'email', user.email), (user.cliente_id, 'cliente', str(user.cliente_id))):
+                if alvo in cls.armados:
+                    cls.armados[alvo] -= 1
+                    if cls.armados[alvo] <= 0:
+                        del cls.armados[alvo]
+                    return alvo
+        return None
+
+    @classmethod
+    @contextmanager
+    def iniciar(cls):
+        """Captura para o usuário atual, se houver alvo armado para ele e nenhuma outra captura rodando"""
+        if not cls._capturando.acquire(blocking=False):
+            yield None
+            return
+        try:
+            alvo = cls.consumir()
+            yield (alvo, Captura()) if alvo else None
+        finally:
+            cls._capturando.release()
+
+    @staticmethod
+    def _prefixo(cliente_id: int) -> str:
+        return f'c{cliente_id}_'
+
+    @classmethod
+    def salvar(cls, nome: str, alvo: Tuple[int, str, str], captura: Captura):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        cliente_id, tipo, valor = alvo
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', f'{tipo}-{valor}')
+        base = PROFILE_DIR / f'{cls._prefixo(cliente_id)}{datetime.now():%Y%m%d-%H%M%S-%f}_{nome}_{slug}'
+        captura.perfil.dump_stats(f'{base}.prof')
+        Path(f'{base}.collapsed').write_text(captura.amostrador.collapsed(), encoding='utf-8')
+        # Diretório limitado: mantém só as capturas mais recentes
+        capturas = sorted(PROFILE_DIR.glob('*.prof'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for antiga in capturas[PROFILE_MAX_FILES:]:
+            antiga.unlink(missing_ok=True)
+            antiga.with_suffix('.collapsed').unlink(missing_ok=True)
+
+    @classmethod
+    def listar(cls, cliente_id: int) -> List[Dict[str, Any]]:
+        if not PROFILE_DIR.exists():
+            return []
+        capturas = sorted(PROFILE_DIR.glob(f'{cls._prefixo(cliente_id)}*.prof'), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{'nome': p.stem, 'tamanho': p.stat().st_size, 'criado_em': datetime.fromtimestamp(p.stat().st_mtime)}
+                for p in capturas]
+
+    @classmethod
+    def arquivo(cls, cliente_id: int, nome: str) -> Optional[Path]:
+        """Caminho de uma captura salva do cliente (None se não existe ou é de outro cliente)"""
+        caminho = PROFILE_DIR / Path(nome).name
+        if (not caminho.name.startswith(cls._prefixo(cliente_id)) or caminho.suffix not in ('.prof', '.collapsed')
+                or not caminho.is_file()):
+            return None
+        return caminho
+
+    @classmethod
+    @contextmanager
+    def capturar(cls, nome: str, alvo: Tuple[int, str, str], captura: Captura):
+        captura.amostrador.start()
+        try:
+            yield captura
+        finally:
+            captura.amostrador.parar()
+            try:
+                cls.salvar(nome, alvo, captura)
+            except Exception as e:
+                print(f"AVISO: falha ao salvar profile de {nome} ({e}).")
+
+
+def perfilavel(nome: str):
+    """Permite que o ProfilerSobDemanda capture a função (páginas e event handlers)"""
+    def decorador(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not ProfilerSobDemanda.armados:
+                    return await func(*args, **kwargs)
+                with ProfilerSobDemanda.iniciar() as armado:
+                    if armado is None:
+                        return await func(*args, **kwargs)
+                    with ProfilerSobDemanda.capturar(nome, *armado) as captura:
+                        return await captura.aguardar(func(*args, **kwargs))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not ProfilerSobDemanda.armados:
+                    return func(*args, **kwargs)
+                with ProfilerSobDemanda.iniciar() as armado:
+                    if armado is None:
+                        return func(*args, **kwargs)
+                    with ProfilerSobDemanda.capturar(nome, *armado) as captura:
+                        captura.ligar()
+                        try:
+                            return func(*args, **kwargs)
+                        finally:
+                            captura.desligar()
+        return wrapper
+    return decorador
 
-# Branding (sempre presente)
 
-branding = ui.row().classes('items-center cursor-pointer').style(f'gap: {DS.SPACING_MD};')
+# ============================================================================
+# OBSERVABILIDADE - MEMÓRIA POR CLIENT
+# ============================================================================
 
-with branding:
+MEMORY_SAMPLE_TTL = float(os.getenv('CX_MEMORY_SAMPLE_TTL', 30))
+
+# O que a medição não atravessa: objetos compartilhados entre clients (ou o próprio
+# client / outros elementos, que são contados separadamente)
+_MEMORIA_NAO_ATRAVESSAR = (Client, ui.element, Slot, types.ModuleType, type, types.CodeType,
+                           asyncio.AbstractEventLoop, InstanceState, Session, Engine)
+
+class MemoriaClientes:
+    """
+    Contagem de elementos e estimativa de memória de cada client conectado,
+    agregadas por rota. A estimativa soma o __dict__ de cada elemento (props,
+    classes, style, listeners) e o que as closures dos handlers capturam
+    (ex.: objetos ORM); strings compartilhadas entre clients (ex.: o grid em
+    cache) entram em cada um, então é um teto. Medir percorre todos os
+    elementos: o resultado fica em cache por MEMORY_SAMPLE_TTL. Cada página
+    logada associa o seu client ao cliente (tenant) do usuário, para que um
+    admin só veja os clients do próprio cliente.
+    """
+    _medido_em: float = 0.0
+    _medicao: List[Dict[str, Any]] = []
+    _clientes: Dict[str, int] = {}  # client_id -> cliente_id do usuário da página
+
+    @classmethod
+    def associar(cls, cliente_id: int):
+        client = ui.context.client
+        cls._clientes[client.id] = cliente_id
+        client.on_delete(lambda: cls._clientes.pop(client.id, None))
+
+    @staticmethod
+    def _tamanho(raiz: Any, vistos: set) -> int:
+        total = 0
+        pilha = [raiz]
+        while pilha:
+            obj = pilha.pop()
+            if id(obj) in vistos or isinstance(obj, _MEMORIA_NAO_ATRAVESSAR):
+                continue
+            vistos.add(id(obj))
+            total += sys.getsizeof(obj, 0)
+            if isinstance(obj, dict):
+                pilha.extend(obj.keys())
+                pilha.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+                pilha.extend(obj)
+            elif isinstance(obj, types.FunctionType):
+                for celula in obj.__closure__ or ():
+                    try:
+                        pilha.append(celula.cell_contents)
+                    except ValueError:  # célula ainda vazia
+                        pass
+                pilha.extend(obj.__defaults__ or ())
+            elif isinstance(obj, types.MethodType):
+                pilha.append(obj.__func__)
+            elif isinstance(obj, functools.partial):
+                pilha.extend((obj.func, obj.args, obj.keywords))
+            elif hasattr(obj, '__dict__'):
+                pilha.append(vars(obj))
+        return total
+
+    @classmethod
+    def medir_client(cls, client: Client) -> Dict[str, Any]:
+        vistos: set = set()
+        total = 0
+        for elemento in list(client.elements.values()):
+            total += sys.getsizeof(elemento, 0) + cls._tamanho(vars(elemento), vistos)
+        return {
+            'client_id': client.id,
+            'cliente_id': cls._clientes.get(client.id),
+            'rota': client.page.path,
+            'elementos': len(client.elements),
+            'bytes_estimados': total,
+            'idade_s': round(time.time() - client.created, 1),
+        }
+
+    @classmethod
+    def medir(cls, forcar: bool = False) -> List[Dict[str, Any]]:
+        if forcar or time.monotonic() - cls._medido_em > MEMORY_SAMPLE_TTL:
+            cls._medicao = [cls.medir_client(c) for c in list(Client.instances.values()) if not c.is_deleted]
+            cls._medido_em = time.monotonic()
+        return cls._medicao
+
+    @classmethod
+    def por_rota(cls, forcar: bool = False, cliente_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        rotas: Dict[str, Dict[str, Any]] = {}
+        for medida in cls.medir(forcar):
+            if cliente_id is not None and medida['cliente_id'] != cliente_id:
+                continue
+            rota = rotas.setdefault(medida['rota'], {'clients': 0, 'elementos': 0, 'bytes_estimados': 0})
+            rota['clients'] += 1
+            rota['elementos'] += medida['elementos']
+            rota['bytes_estimados'] += medida['bytes_estimados']
+        for rota in rotas.values():
+            rota['elementos_por_client'] = round(rota['elementos'] / rota['clients'], 1)
+            rota['bytes_por_client'] = round(rota['bytes_estimados'] / rota['clients'])
+        return rotas
+
+    @classmethod
+    def prometheus(cls) -> str:
+        linhas = []
+        rotas = cls.por_rota()
+        for metrica, campo in (('clients', 'clients'), ('client_elements', 'elementos'),
+                               ('client_memory_bytes_estimate', 'bytes_estimados')):
+            linhas.append(f'# TYPE cx_{metrica} gauge')
+            linhas += [f'cx_{metrica}{{rota="{r}"}} {v[campo]}' for r, v in sorted(rotas.items())]
+        return '\n'.join(linhas) + '\n'
 
-with ui.column().classes('items-center justify-center').style(f'''
 
-width: 32px;
+# ============================================================================
+# DATABASE SETUP
+# ============================================================================
 
-height: 32px;
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    print("AVISO: DATABASE_URL não encontrada.")
+    DATABASE_URL = "sqlite:///exemplo.db"
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+# SQLite em arquivo (ver "SQLITE - MODO DE PRODUÇÃO"): conexão é barata e, em WAL,
+# leitores não se bloqueiam; o pool padrão (5 + 10) vira o gargalo antes do banco
+SQLITE_TUNING = os.getenv('CX_SQLITE_TUNING', '1') != '0'
+opcoes_pool = {}
+if SQLITE_TUNING and DATABASE_URL.startswith('sqlite') and ':memory:' not in DATABASE_URL and DATABASE_URL != 'sqlite://':
+    opcoes_pool = {'pool_size': int(os.getenv('CX_SQLITE_POOL_SIZE', 32)),
+                   'max_overflow': int(os.getenv('CX_SQLITE_POOL_OVERFLOW', 32))}
+
+engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True, **opcoes_pool)
+# Leituras que não escrevem nada: no SQLite não entram na fila de escrita
+engine_leitura = engine.execution_options(cx_somente_leitura=True)
+SessionLocal = sessionmaker(bind=engine)
+SessionLeitura = sessionmaker(bind=engine_leitura)
+Base = declarative_base()
 
-background: linear-gradient(135deg, {DS.PRIMARY} 0%, {DS.PRIMARY_HOVER} 100%);
 
-border-radius: {DS.RADIUS_MD};
+# ============================================================================
+# SQLITE - MODO DE PRODUÇÃO (WAL, PRAGMAS & FILA DE ESCRITA)
+# ============================================================================
 
-box-shadow: {DS.SHADOW_XS};
+# Instalações pequenas rodam em SQLite. Com os padrões (journal de rollback, sem
+# fila) leitor e escritor se bloqueiam e logins simultâneos dão "database is locked".
+# CX_SQLITE_TUNING=0 volta ao comportamento antigo (só para comparação/benchmark).
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('CX_SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_SYNCHRONOUS = os.getenv('CX_SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_CACHE_MB = int(os.getenv('CX_SQLITE_CACHE_MB', 64))
+SQLITE_MMAP_MB = int(os.getenv('CX_SQLITE_MMAP_MB', 256))
+SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv('CX_SQLITE_WRITE_QUEUE_TIMEOUT', 30))
+# Na thread do event loop a espera trava o servidor inteiro: lá a fila desiste
+# logo, e escritas vindas de handlers async devem ir por run.io_bound
+SQLITE_WRITE_QUEUE_LOOP_TIMEOUT = float(os.getenv('CX_SQLITE_WRITE_QUEUE_LOOP_TIMEOUT', 0.25))
+
+class FilaEscritaSQLite:
+    """
+    Um escritor por vez, em ordem de chegada (FIFO), dentro do processo.
+    No SQLite só uma transação escreve de cada vez; sem a fila as threads
+    disputam o lock do arquivo no busy handler (polling com sleep, sem ordem).
+    Com a fila a transação de escrita já abre com BEGIN IMMEDIATE, então nunca
+    precisa promover um snapshot de leitura (o que falha na hora em WAL se
+    outro escritor commitou no meio). O busy_timeout continua valendo para
+    escritores de outros processos (scripts, segundo worker).
+    """
+    _cond = threading.Condition()
+    _fila: deque = deque()
+    _dono: Optional[int] = None
+    escritas = 0
+    esperas = 0
+    timeouts = 0
+    espera_total_s = 0.0
+    espera_max_s = 0.0
+
+    @staticmethod
+    def _limite_espera() -> float:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return SQLITE_WRITE_QUEUE_TIMEOUT
+        return min(SQLITE_WRITE_QUEUE_TIMEOUT, SQLITE_WRITE_QUEUE_LOOP_TIMEOUT)
+
+    @classmethod
+    def entrar(cls, info: dict):
+        eu = threading.get_ident()
+        inicio = time.perf_counter()
+        limite = cls._limite_espera()
+        with cls._cond:
+            if cls._dono == eu:
+                raise RuntimeError('Escrita aninhada no SQLite: esta thread já tem uma transação de escrita aberta '
+                                   '(reuse a mesma sessão/conexão).')
+            vez = object()
+            cls._fila.append(vez)
+            obtida = False
+            try:
+                obtida = cls._cond.wait_for(lambda: cls._dono is None and cls._fila[0] is vez, limite)
+            finally:
+                cls._fila.remove(vez)
+                if not obtida:
+                    cls._cond.notify_all()  # quem estava atrás de mim pode ser o primeiro agora
+            if not obtida:
+                cls.timeouts += 1
+                raise TimeoutError(f'Fila de escrita do SQLite: {limite:g}s sem conseguir escrever'
+                                   + (' (thread do event loop: use run.io_bound).' if limite < SQLITE_WRITE_QUEUE_TIMEOUT else '.'))
+            cls._dono = eu
+            info['cx_escrita'] = True
+            espera = time.perf_counter() - inicio
+            cls.escritas += 1
+            cls.espera_total_s += espera
+            cls.espera_max_s = max(cls.espera_max_s, espera)
+            if espera > 0.001:
+                cls.esperas += 1
+
+    @classmethod
+    def sair(cls, info: dict):
+        if info.pop('cx_escrita', False):
+            with cls._cond:
+                cls._dono = None
+                cls._cond.notify_all()
+
+    @classmethod
+    def prometheus(cls) -> str:
+        if engine.dialect.name != 'sqlite' or not SQLITE_TUNING:
+            return ''
+        return (
+            '# TYPE cx_sqlite_writes_total counter\n'
+            f'cx_sqlite_writes_total {cls.escritas}\n'
+            '# TYPE cx_sqlite_write_waits_total counter\n'
+            f'cx_sqlite_write_waits_total {cls.esperas}\n'
+            '# TYPE cx_sqlite_write_wait_seconds_total counter\n'
+            f'cx_sqlite_write_wait_seconds_total {cls.espera_total_s:.6f}\n'
+            '# TYPE cx_sqlite_write_wait_max_seconds gauge\n'
+            f'cx_sqlite_write_wait_max_seconds {cls.espera_max_s:.6f}\n'
+            '# TYPE cx_sqlite_write_timeouts_total counter\n'
+            f'cx_sqlite_write_timeouts_total {cls.timeouts}\n'
+            '# TYPE cx_sqlite_write_queue gauge\n'
+            f'cx_sqlite_write_queue {len(cls._fila)}\n'
+        )
+
+def configurar_sqlite(motor: Engine, fila_escrita: bool):
+    """
+    Pragmas em toda conexão nova e transações controladas por nós (o driver
+    sqlite3 do Python abre BEGIN por conta própria e atrasa o lock). Escritas
+    passam pela FilaEscritaSQLite quando fila_escrita=True (primário).
+    """
+    if motor.url.database in (None, '', ':memory:'):
+        return  # base em memória: sem arquivo, sem WAL, sem outro processo
+
+    @event.listens_for(motor, 'connect')
+    def _pragmas(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None  # BEGIN/COMMIT ficam com os eventos abaixo
+        cursor = dbapi_connection.cursor()
+        for pragma in ('journal_mode = WAL',  # leitores não bloqueiam o escritor e vice-versa
+                       f'synchronous = {SQLITE_SYNCHRONOUS}',  # NORMAL em WAL: só o último commit em risco numa queda de energia
+                       f'busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}',
+                       f'cache_size = -{SQLITE_CACHE_MB * 1024}',  # negativo = KiB
+                       f'mmap_size = {SQLITE_MMAP_MB * 1024 * 1024}',
+                       'temp_store = MEMORY'):
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+    @event.listens_for(motor, 'begin')
+    def _abrir_transacao(conn):
+        if not fila_escrita or conn.get_execution_options().get('cx_somente_leitura'):
+            conn.exec_driver_sql('BEGIN')
+            return
+        FilaEscritaSQLite.entrar(conn.info)
+        try:
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        except Exception:
+            FilaEscritaSQLite.sair(conn.info)
+            raise
+
+    if not fila_escrita:
+        return
+
+    # Os eventos de commit/rollback rodam antes do driver: fazemos a operação aqui
+    # para liberar a fila só depois dela (a chamada seguinte do SQLAlchemy vira no-op)
+    @event.listens_for(motor, 'commit')
+    def _commit(conn):
+        if conn.info.get('cx_escrita'):
+            try:
+                conn.connection.dbapi_connection.commit()
+            finally:
+                FilaEscritaSQLite.sair(conn.info)
+
+    @event.listens_for(motor, 'rollback')
+    def _rollback(conn):
+        if conn.info.get('cx_escrita'):
+            try:
+                conn.connection.dbapi_connection.rollback()
+            finally:
+                FilaEscritaSQLite.sair(conn.info)
+
+    @event.listens_for(motor, 'checkin')
+    def _devolvida(dbapi_connection, connection_record):
+        FilaEscritaSQLite.sair(connection_record.info)  # rede de segurança: conexão voltou ao pool com a vez
+
+if engine.dialect.name == 'sqlite' and SQLITE_TUNING:
+    configurar_sqlite(engine, fila_escrita=True)
 
-'''):
 
-ui.icon('analytics', size='18px', color='white')
+# ============================================================================
+# READ REPLICAS - ROTEAMENTO DE LEITURAS
+# ============================================================================
 
-ui.label('CX Data').classes('text-sm').style(f'''
+# Lista opcional separada por vírgula, ex.: "sqlite:///replica1.db,postgresql://replica2/cx"
+DATABASE_REPLICA_URLS = [
+    u.strip().replace("postgres://", "postgresql://", 1)
+    for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip()
+]
+REPLICA_MAX_LAG = float(os.getenv('CX_REPLICA_MAX_LAG', 5))
+# Uma réplica no rodízio pode estar até REPLICA_MAX_LAG atrasada: janela menor que
+# isso deixaria o cache versionado guardar dados velhos sob a versão nova
+READ_AFTER_WRITE_WINDOW = float(os.getenv('CX_READ_AFTER_WRITE_WINDOW', REPLICA_MAX_LAG))
+if READ_AFTER_WRITE_WINDOW < REPLICA_MAX_LAG:
+    print(f"AVISO: CX_READ_AFTER_WRITE_WINDOW ({READ_AFTER_WRITE_WINDOW:g}s) menor que CX_REPLICA_MAX_LAG; usando {REPLICA_MAX_LAG:g}s.")
+    READ_AFTER_WRITE_WINDOW = REPLICA_MAX_LAG
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, echo=False, pool_pre_ping=True)
+        if self.engine.dialect.name == 'sqlite' and SQLITE_TUNING:
+            configurar_sqlite(self.engine, fila_escrita=False)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.saudavel = True
+        self.lag: Optional[float] = None
+        self.erro: Optional[str] = None
+        event.listen(self.session_factory, 'before_flush', self._bloquear_escrita)
+
+    @staticmethod
+    def _bloquear_escrita(session, flush_context, instances):
+        raise RuntimeError('Sessão de réplica é somente leitura; use SessionLocal para escrever.')
+
+    def verificar(self):
+        """Ping + lag de replicação (Postgres); réplica atrasada ou fora do ar sai do rodízio"""
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == 'postgresql':
+                    self.lag = float(conn.execute(text('''
+                        SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+                    ''')).scalar() or 0)
+                else:
+                    conn.execute(text('SELECT 1'))
+                    self.lag = 0.0
+            self.erro = None
+            self.saudavel = self.lag <= REPLICA_MAX_LAG
+        except Exception as e:
+            self.erro = f'{type(e).__name__}: {e}'
+            self.saudavel = False
+
+
+class RoteadorLeitura:
+    """
+    Distribui sessões somente-leitura em round-robin entre as réplicas saudáveis.
+    Escritas sempre vão para o primário, e logo após uma escrita commitada as
+    leituras ficam presas ao primário por READ_AFTER_WRITE_WINDOW segundos.
+    """
+    replicas: List[Replica] = [Replica(url) for url in DATABASE_REPLICA_URLS]
+    _lock = threading.Lock()
+    _proxima = 0
+    _ultima_escrita = 0.0
+
+    @classmethod
+    def registrar_escrita(cls):
+        cls._ultima_escrita = time.monotonic()
+
+    @classmethod
+    def escolher(cls) -> Optional[Replica]:
+        if not cls.replicas or time.monotonic() - cls._ultima_escrita < READ_AFTER_WRITE_WINDOW:
+            return None
+        with cls._lock:
+            for _ in range(len(cls.replicas)):
+                replica = cls.replicas[cls._proxima % len(cls.replicas)]
+                cls._proxima += 1
+                if replica.saudavel:
+                    return replica
+        return None
+
+    @classmethod
+    def verificar_replicas(cls):
+        for replica in cls.replicas:
+            replica.verificar()
+
+
+def executar_leitura(consulta: Callable[[Any], Any], primario: bool = False) -> Any:
+    """
+    Executa `consulta(db)` numa sessão somente-leitura. Se a réplica escolhida
+    falhar, ela sai do rodízio até o próximo health check e a consulta é
+    refeita no primário.
+    """
+    replica = None if primario else RoteadorLeitura.escolher()
+    if replica is not None:
+        db = replica.session_factory()
+        try:
+            return consulta(db)
+        except DBAPIError as e:
+            replica.saudavel, replica.erro = False, f'{type(e).__name__}: {e}'
+        finally: db.close()
+    db = SessionLeitura()
+    try: return consulta(db)
+    finally: db.close()
 
-color: {DS.TEXT_PRIMARY};
 
-font-weight: 700;
+# ============================================================================
+# MODELS
+# ============================================================================
 
-letter-spacing: -0.01em;
+class Cliente(Base):
+    __tablename__ = 'clientes'
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(200), nullable=False)
+    users = relationship('User', back_populates='cliente')
+    dashboards = relationship('Dashboard', back_populates='cliente')
 
-''')
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    email = Column(String(200), unique=True, nullable=False)
+    password_hash = Column(String(64), nullable=False)
+    cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
+    perfil = Column(String(50), nullable=False)
+    cliente = relationship('Cliente', back_populates='users')
 
-branding.on('click', lambda: ui.navigate.to('/'))
+class Dashboard(Base):
+    __tablename__ = 'dashboards'
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
+    nome = Column(String(200), nullable=False)
+    tipo = Column(String(50), nullable=False)
+    link_embed = Column(Text, nullable=False)
+    pasta_id = Column(Integer, ForeignKey('pastas_dashboards.id'), nullable=True, index=True)  # None = raiz
+    cliente = relationship('Cliente', back_populates='dashboards')
+    permissoes = relationship('DashboardPermissao', back_populates='dashboard')
+
+class PastaDashboard(Base):
+    """
+    Pasta de dashboards do cliente. Hierarquia em caminho materializado: caminho
+    são os ids da raiz até a própria pasta ('3/17/42/'), então ancestrais saem do
+    próprio texto e a subárvore é um prefixo (LIKE '3/17/%', usa o índice).
+    """
+    __tablename__ = 'pastas_dashboards'
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
+    nome = Column(String(200), nullable=False)
+    caminho = Column(String(500), nullable=False, default='')
+    profundidade = Column(Integer, nullable=False, default=1)  # 1 = pasta na raiz
+    __table_args__ = (Index('ix_pastas_dashboards_cliente_caminho', 'cliente_id', 'caminho'),)
 
+class DashboardPermissao(Base):
+    __tablename__ = 'dashboard_permissoes'
+    id = Column(Integer, primary_key=True)
+    dashboard_id = Column(Integer, ForeignKey('dashboards.id'), nullable=False)
+    perfil = Column(String(50), nullable=False)
+    dashboard = relationship('Dashboard', back_populates='permissoes')
+
+class VersaoCliente(Base):
+    """Carimbo de versão por cliente (cliente_id 0 = global), mantido pelas escritas feitas via SessionLocal"""
+    __tablename__ = 'versoes_dados'
+    cliente_id = Column(Integer, primary_key=True, autoincrement=False)
+    versao = Column(Integer, nullable=False, default=0)
+    marca_global = Column(Integer, nullable=False, default=0, index=True)
+
+class TemaCliente(Base):
+    """Tokens de tema do cliente (JSON com as chaves de TEMA_PADRAO que ele sobrescreve)"""
+    __tablename__ = 'temas_clientes'
+    cliente_id = Column(Integer, ForeignKey('clientes.id'), primary_key=True, autoincrement=False)
+    tokens = Column(Text, nullable=False, default='{}')
 
-# Separator
 
-if breadcrumb:
+# ============================================================================
+# CACHE - VERSÕES DE DADOS & FRAGMENTOS RENDERIZADOS
+# ============================================================================
 
-ui.separator().classes('h-6').style(f'background: {DS.BORDER}; opacity: 0.5;')
+class VersaoDados:
+    """
+    Versão global + versão por cliente dos dados do portal.
+    Espelha em memória a tabela versoes_dados: toda escrita commitada em um
+    cliente (neste ou em outro processo) move a versão dele, o que invalida
+    implicitamente qualquer cache chaveado por ela.
+    """
+    _lock = threading.Lock()
+    _global = 0
+    _clientes: Dict[int, int] = {}
+    _marca_global = 0  # última versão global lida do banco
+    # Chamados (de qualquer thread) com o cliente_id que mudou, ou None para "todos"
+    ouvintes: List[Callable[[Optional[int]], None]] = []
+
+    @classmethod
+    def atual(cls, cliente_id: int) -> Tuple[int, int]:
+        return cls._global, cls._clientes.get(cliente_id, 0)
+
+    @classmethod
+    def definir(cls, cliente_id: int, versao: int):
+        with cls._lock:
+            mudou = cls._clientes.get(cliente_id) != versao
+            cls._clientes[cliente_id] = versao
+        if mudou:
+            cls._notificar(cliente_id)
+
+    @classmethod
+    def incrementar(cls, cliente_id: Optional[int] = None):
+        """Sem cliente_id incrementa a versão global (invalida todos os clientes)"""
+        with cls._lock:
+            if cliente_id is None:
+                cls._global += 1
+            else:
+                cls._clientes[cliente_id] = cls._clientes.get(cliente_id, 0) + 1
+        cls._notificar(cliente_id)
+
+    @classmethod
+    def _notificar(cls, cliente_id: Optional[int]):
+        for ouvinte in cls.ouvintes:
+            ouvinte(cliente_id)
+
+
+class _ConstrucaoEmAndamento:
+    """Um build de CacheVersionado em curso; quem chega depois espera em `pronta`"""
+    __slots__ = ('dono', 'pronta', 'valor', 'erro')
+
+    def __init__(self):
+        self.dono = threading.get_ident()
+        self.pronta = threading.Event()
+        self.valor: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class CacheVersionado:
+    """
+    Cache LRU em memória compartilhado entre usuários e clients NiceGUI.
+    Cada entrada guarda a versão do cliente com que foi construída; uma
+    versão diferente na leitura é tratada como miss e a entrada é refeita.
+    Misses simultâneos da mesma chave (e versão) constroem uma vez só: o
+    primeiro constrói e os demais esperam o resultado (ou o erro) dele.
+    """
+    def __init__(self, max_itens: int = 4096):
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+        self._itens: 'OrderedDict[tuple, Tuple[Tuple[int, int], Any]]' = OrderedDict()
+        self._em_construcao: Dict[tuple, _ConstrucaoEmAndamento] = {}
+
+    def obter(self, cliente_id: int, chave: tuple, construir: Callable[[], Any]) -> Any:
+        versao = VersaoDados.atual(cliente_id)
+        chave_completa = (cliente_id,) + chave
+        with self._lock:
+            item = self._itens.get(chave_completa)
+            if item is not None and item[0] == versao:
+                self._itens.move_to_end(chave_completa)
+                return item[1]
+            construcao = self._em_construcao.get((chave_completa, versao))
+            if construcao is None:
+                construcao = self._em_construcao[(chave_completa, versao)] = _ConstrucaoEmAndamento()
+                dono = True
+            else:
+                dono = False
+
+        if not dono:
+            if construcao.dono == threading.get_ident():
+                return construir()  # construir() que pede a própria chave: esperar seria deadlock
+            construcao.pronta.wait()
+            if construcao.erro is not None:
+                raise construcao.erro
+            return construcao.valor
+
+        try:
+            valor = construir()
+        except BaseException as e:
+            construcao.erro = e
+            raise
+        else:
+            construcao.valor = valor
+            with self._lock:
+                self._itens[chave_completa] = (versao, valor)
+                self._itens.move_to_end(chave_completa)
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+            return valor
+        finally:
+            with self._lock:
+                del self._em_construcao[(chave_completa, versao)]
+            construcao.pronta.set()
+
+    def invalidar(self, cliente_id: Optional[int] = None):
+        with self._lock:
+            if cliente_id is None:
+                self._itens.clear()
+            else:
+                for chave in [c for c in self._itens if c[0] == cliente_id]:
+                    del self._itens[chave]
+
+
+cache_renderizacao = CacheVersionado(max_itens=int(os.getenv('CX_RENDER_CACHE_MAX', 4096)))
+cache_permissoes = CacheVersionado(max_itens=int(os.getenv('CX_PERMISSION_CACHE_MAX', 8192)))
+
+
+def _cliente_do_objeto(session, obj) -> Optional[int]:
+    if isinstance(obj, Cliente):
+        return obj.id
+    if isinstance(obj, (User, Dashboard, TemaCliente, PastaDashboard)):
+        return obj.cliente_id
+    if isinstance(obj, DashboardPermissao):
+        # Evita lazy load dentro do flush: usa o relacionamento só se já estiver carregado
+        dashboard = obj.__dict__.get('dashboard')
+        if dashboard is not None:
+            return dashboard.cliente_id
+        return session.connection().execute(
+            select(Dashboard.cliente_id).where(Dashboard.id == obj.dashboard_id)
+        ).scalar()
+    return None
+
+def carimbar_versoes(conn, clientes: set) -> Dict[int, int]:
+    """
+    Incrementa, na transação corrente, a versão global e a de cada cliente
+    alterado; retorna as novas versões dos clientes. A linha global é sempre
+    travada primeiro, o que serializa os carimbos e evita deadlocks.
+    """
+    tabela = VersaoCliente.__table__
+    if conn.execute(tabela.update().where(tabela.c.cliente_id == 0).values(versao=tabela.c.versao + 1)).rowcount == 0:
+        conn.execute(tabela.insert().values(cliente_id=0, versao=1, marca_global=0))
+    marca = conn.execute(select(tabela.c.versao).where(tabela.c.cliente_id == 0)).scalar()
+
+    existentes = set(conn.execute(select(tabela.c.cliente_id).where(tabela.c.cliente_id.in_(clientes))).scalars())
+    if existentes:
+        conn.execute(tabela.update().where(tabela.c.cliente_id.in_(existentes)).values(versao=tabela.c.versao + 1, marca_global=marca))
+    for cliente_id in clientes - existentes:
+        conn.execute(tabela.insert().values(cliente_id=cliente_id, versao=1, marca_global=marca))
+
+    if conn.dialect.name == 'postgresql':
+        # NOTIFY é transacional: os outros processos só são acordados no commit
+        conn.execute(text('NOTIFY cx_versoes'))
+    return dict(conn.execute(select(tabela.c.cliente_id, tabela.c.versao).where(tabela.c.cliente_id.in_(clientes))).all())
+
+@event.listens_for(SessionLocal, 'after_flush')
+def _registrar_clientes_alterados(session, flush_context):
+    alterados = session.info.setdefault('clientes_alterados', set())
+    novos = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        cliente_id = _cliente_do_objeto(session, obj)
+        if cliente_id is not None and cliente_id not in alterados:
+            novos.add(cliente_id)
+    if novos:
+        alterados |= novos
+        session.info.setdefault('versoes_novas', {}).update(carimbar_versoes(session.connection(), novos))
+
+@event.listens_for(SessionLocal, 'after_commit')
+def _publicar_versoes(session):
+    session.info.pop('clientes_alterados', None)
+    versoes = session.info.pop('versoes_novas', {})
+    if versoes:
+        RoteadorLeitura.registrar_escrita()
+    for cliente_id, versao in versoes.items():
+        VersaoDados.definir(cliente_id, versao)
+
+@event.listens_for(SessionLocal, 'after_rollback')
+def _descartar_versoes(session):
+    session.info.pop('clientes_alterados', None)
+    session.info.pop('versoes_novas', None)
+
+def publicar_versoes(versoes: Dict[int, int]):
+    """Depois do commit de uma escrita Core (fora da SessionLocal): caches e home ao vivo deste processo na hora"""
+    for cliente_id, versao in versoes.items():
+        VersaoDados.definir(cliente_id, versao)
+    if versoes:
+        RoteadorLeitura.registrar_escrita()
 
 
-# Breadcrumb (contextual)
+# ============================================================================
+# AUTH & LOGIC
+# ============================================================================
 
-with ui.row().classes('items-center').style(f'gap: {DS.SPACING_SM};'):
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
 
-for i, item in enumerate(breadcrumb):
+@rastreado('autenticar_usuario')
+def autenticar_usuario(email: str, password: str) -> Optional[User]:
+    return executar_leitura(lambda db: db.query(User).filter(User.email == email, User.password_hash == hash_password(password)).first())
 
-is_last = i == len(breadcrumb) - 1
+@rastreado('obter_dashboards_autorizados')
+def obter_dashboards_autorizados(cliente_id: int, perfil: str) -> List[Dashboard]:
+    return executar_leitura(lambda db: db.query(Dashboard).join(DashboardPermissao).filter(Dashboard.cliente_id == cliente_id, DashboardPermissao.perfil == perfil).distinct().all())
+
+def obter_ids_autorizados(cliente_id: int, perfil: str) -> frozenset:
+    """Ids dos dashboards que (cliente_id, perfil) pode abrir, pré-computados por versão do cliente"""
+    def carregar(db):
+        linhas = db.query(Dashboard.id).join(DashboardPermissao).filter(Dashboard.cliente_id == cliente_id, DashboardPermissao.perfil == perfil).distinct()
+        return frozenset(dash_id for (dash_id,) in linhas)
+    return cache_permissoes.obter(cliente_id, ('ids_autorizados', perfil), lambda: executar_leitura(carregar))
+
+def obter_nome_cliente(cliente_id: int) -> Optional[str]:
+    return cache_renderizacao.obter(
+        cliente_id, ('cliente_nome',),
+        lambda: executar_leitura(lambda db: db.query(Cliente.nome).filter(Cliente.id == cliente_id).scalar())
+    )
+
+def obter_dashboard(cliente_id: int, dash_id: int) -> Optional[Dashboard]:
+    return executar_leitura(lambda db: db.query(Dashboard).filter(Dashboard.id == dash_id, Dashboard.cliente_id == cliente_id).first())
+
+def obter_dashboards(cliente_id: int, ids: List[int]) -> Dict[int, Dashboard]:
+    """Vários dashboards do cliente numa consulta só (painel)"""
+    if not ids:
+        return {}
+    return executar_leitura(lambda db: {d.id: d for d in db.query(Dashboard).filter(Dashboard.cliente_id == cliente_id, Dashboard.id.in_(ids))})
+
+def _dashboards_autorizados(cliente_id: int, perfil: str) -> Tuple[Tuple[int, str, str, Optional[int]], ...]:
+    """(id, nome, tipo, pasta_id) dos dashboards autorizados: a consulta única de onde saem workspaces e pastas"""
+    return cache_renderizacao.obter(
+        cliente_id, ('autorizados', perfil),
+        lambda: tuple((d.id, d.nome, d.tipo, d.pasta_id) for d in obter_dashboards_autorizados(cliente_id, perfil))
+    )
+
+def obter_workspaces(cliente_id: int, perfil: str) -> Tuple[Tuple[int, str, str], ...]:
+    """Snapshot imutável (id, nome, tipo) dos dashboards autorizados, por (cliente_id, perfil, versão)"""
+    return cache_renderizacao.obter(
+        cliente_id, ('workspaces', perfil),
+        lambda: tuple(ws[:3] for ws in _dashboards_autorizados(cliente_id, perfil))
+    )
+
+def usa_pastas(cliente_id: int, perfil: str) -> bool:
+    """Algum dashboard autorizado está em pasta? Se não, a home é o grid plano de sempre (sem consultar pastas)"""
+    return cache_permissoes.obter(
+        cliente_id, ('usa_pastas', perfil),
+        lambda: any(ws[3] is not None for ws in _dashboards_autorizados(cliente_id, perfil))
+    )
+
+def obter_pastas(cliente_id: int) -> Dict[int, Tuple[str, str]]:
+    """id -> (nome, caminho) de todas as pastas do cliente; uma consulta por versão, igual para todos os perfis"""
+    def carregar(db):
+        return {pasta_id: (nome, caminho) for pasta_id, nome, caminho in
+                db.query(PastaDashboard.id, PastaDashboard.nome, PastaDashboard.caminho).filter(PastaDashboard.cliente_id == cliente_id)}
+    return cache_renderizacao.obter(cliente_id, ('pastas',), lambda: executar_leitura(carregar))
+
+def obter_arvore_pastas(cliente_id: int, perfil: str) -> Dict[Optional[int], Tuple[tuple, tuple]]:
+    """
+    Níveis visíveis para (cliente_id, perfil): pasta (None = raiz) -> (subpastas
+    (id, nome, total), dashboards (id, nome, tipo) direto nela). Autorização por
+    nível: a pasta só existe aqui se tiver algum dashboard autorizado na sua
+    subárvore; os ancestrais vêm do caminho materializado, sem consulta recursiva.
+    """
+    def construir():
+        pastas = obter_pastas(cliente_id)
+        totais: Counter = Counter()
+        filhos: Dict[Optional[int], set] = {None: set()}
+        diretos: Dict[Optional[int], list] = {}
+        for dash_id, nome, tipo, pasta_id in _dashboards_autorizados(cliente_id, perfil):
+            if pasta_id not in pastas:
+                pasta_id = None  # pasta de outro cliente ou apagada: o dashboard cai na raiz
+            diretos.setdefault(pasta_id, []).append((dash_id, nome, tipo))
+            pai = None
+            for ancestral in (int(i) for i in pastas[pasta_id][1].split('/') if i) if pasta_id is not None else ():
+                totais[ancestral] += 1
+                filhos.setdefault(pai, set()).add(ancestral)
+                pai = ancestral
+        return {
+            pasta: (tuple(sorted(((f, pastas[f][0], totais[f]) for f in filhos.get(pasta, ())), key=lambda p: (p[1].lower(), p[0]))),
+                    tuple(diretos.get(pasta, ())))
+            for pasta in filhos.keys() | diretos.keys()
+        }
+    return cache_permissoes.obter(cliente_id, ('arvore_pastas', perfil), construir)
+
+def obter_html_pasta(cliente_id: int, perfil: str, pasta_id: Optional[int]) -> Optional[str]:
+    """Fragmento de um nível (subpastas fechadas + cards), ou None se a pasta não é visível para o perfil"""
+    arvore = obter_arvore_pastas(cliente_id, perfil)
+    if pasta_id not in arvore:
+        return None
+    return cache_renderizacao.obter(cliente_id, ('pasta_html', perfil, pasta_id), lambda: PastasGrid.render_html(*arvore[pasta_id]))
+
+def obter_grid_workspaces(cliente_id: int, perfil: str) -> str:
+    """Fragmento HTML do grid da home, construído uma vez por (cliente_id, perfil, versão)"""
+    def construir():
+        workspaces = obter_workspaces(cliente_id, perfil)
+        if usa_pastas(cliente_id, perfil):
+            # Só a raiz: pastas fechadas, conteúdo buscado ao abrir (/api/pastas/{id})
+            return PastasGrid.render_raiz(len(workspaces), obter_html_pasta(cliente_id, perfil, None))
+        return WorkspaceGrid.render_html(workspaces)
+    return cache_renderizacao.obter(cliente_id, ('grid', perfil), construir)
+
+SESSION_TOUCH_INTERVAL = float(os.getenv('CX_SESSION_TOUCH_INTERVAL', 300))
 
-label = ui.label(item['label']).classes('text-sm').style(f'''
+class AppState:
+    """
+    Sessão do usuário sobre app.storage.user, que é persistido em JSON: lá ficam só
+    'user_email' e 'visto_em' (último acesso, base da expiração por inatividade).
+    Visitante sem login não grava nada, então não cria arquivo de sessão.
+    """
+    def __init__(self, dados: Optional[dict] = None): self.dados = {} if dados is None else dados
+    @classmethod
+    def atual(cls) -> 'AppState':
+        state = cls(app.storage.user)
+        # 'visto_em' com resolução de SESSION_TOUCH_INTERVAL: não regrava o arquivo a cada página
+        if state.user_email and time.time() - state.dados.get('visto_em', 0) > SESSION_TOUCH_INTERVAL:
+            state.dados['visto_em'] = time.time()
+        return state
+    @property
+    def user_email(self) -> Optional[str]: return self.dados.get('user_email')
+    def login(self, user: User): self.dados.update(user_email=user.email, visto_em=time.time())
+    def logout(self): self.dados.clear()  # storage vazio = arquivo de sessão apagado
+    def get_user_completo(self) -> Optional[User]:
+        if not self.user_email: return None
+        return executar_leitura(lambda db: db.query(User).filter(User.email == self.user_email).first())
+
+PERFIL_ADMIN = 'admin'
+
+def obter_admin_logado() -> Optional[User]:
+    """Usuário da sessão atual, se ele tiver perfil admin (páginas e rotas HTTP administrativas)"""
+    user = AppState.atual().get_user_completo()
+    return user if user is not None and user.perfil == PERFIL_ADMIN else None
+
+@app.get('/api/workspaces', include_in_schema=False)
+def api_workspaces(request: Request):
+    """(id, nome, tipo) dos workspaces do usuário logado, para a paleta de comandos; ETag pela versão do cliente"""
+    user = AppState.atual().get_user_completo()
+    if user is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=401)
+    versao = '-'.join(map(str, VersaoDados.atual(user.cliente_id)))
+    etag = f'"{user.cliente_id}-{hashlib.sha256(user.perfil.encode()).hexdigest()[:8]}-{versao}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+    return JSONResponse(obter_workspaces(user.cliente_id, user.perfil),
+                        headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+@app.get('/api/pastas/{pasta_id}', include_in_schema=False)
+def api_pasta(pasta_id: int, request: Request):
+    """Fragmento HTML de uma pasta (subpastas + cards), buscado quando o usuário a abre na home"""
+    user = AppState.atual().get_user_completo()
+    if user is None:
+        return PlainTextResponse('não autorizado', status_code=401)
+    fragmento = obter_html_pasta(user.cliente_id, user.perfil, pasta_id)
+    if fragmento is None:
+        return PlainTextResponse('não encontrada', status_code=404)
+    versao = '-'.join(map(str, VersaoDados.atual(user.cliente_id)))
+    etag = f'"{user.cliente_id}-{hashlib.sha256(user.perfil.encode()).hexdigest()[:8]}-{versao}-{pasta_id}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+    return HTMLResponse(fragmento, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
 
-color: {DS.TEXT_PRIMARY if is_last else DS.TEXT_SECONDARY};
 
-font-weight: {600 if is_last else 500};
+# ============================================================================
+# LIVE UPDATES - PUB/SUB DE WORKSPACES
+# ============================================================================
 
-transition: color {DS.TRANSITION_FAST};
+PUSH_BATCH_WINDOW = float(os.getenv('CX_PUSH_BATCH_WINDOW', 0.3))
+
+class CanalWorkspaces:
+    """
+    Pub/sub interno: home pages conectadas assinam (cliente_id, perfil) e,
+    quando os dados do cliente mudam, recebem só o diff dos cards, aplicado
+    no browser. Mudanças dentro de PUSH_BATCH_WINDOW são agrupadas; o diff é
+    calculado e serializado uma vez por grupo de clients com a mesma base.
+    """
+    _lock = threading.Lock()
+    # (cliente_id, perfil) -> {client_id: snapshot que aquele client está exibindo}
+    _assinaturas: Dict[Tuple[int, str], Dict[str, tuple]] = {}
+    _pendentes: set = set()
+    _agendado = False
+
+    @classmethod
+    def assinar(cls, client: Client, cliente_id: int, perfil: str, base: tuple):
+        chave = (cliente_id, perfil)
+        with cls._lock:
+            cls._assinaturas.setdefault(chave, {})[client.id] = base
+        client.on_delete(lambda: cls._cancelar(chave, client.id))
+
+    @classmethod
+    def _cancelar(cls, chave: Tuple[int, str], client_id: str):
+        with cls._lock:
+            assinantes = cls._assinaturas.get(chave, {})
+            assinantes.pop(client_id, None)
+            if not assinantes:
+                cls._assinaturas.pop(chave, None)
+
+    @classmethod
+    def publicar(cls, cliente_id: Optional[int]):
+        """Ouvinte de VersaoDados; pode ser chamado de threads de I/O"""
+        with cls._lock:
+            if not any(cliente_id is None or c == cliente_id for c, _ in cls._assinaturas):
+                return
+            cls._pendentes.add(cliente_id)
+            agendar, cls._agendado = not cls._agendado, True
+        if agendar and core.loop is not None:
+            core.loop.call_soon_threadsafe(lambda: background_tasks.create(cls._despachar(), name='canal_workspaces'))
+
+    @staticmethod
+    def diff(base: tuple, novo: tuple) -> Dict[str, Any]:
+        antigos = {ws[0]: ws for ws in base}
+        novos = {ws[0]: ws for ws in novo}
+        # Troca de tipo muda o card inteiro: vira remoção + inclusão
+        trocados = {i for i in antigos.keys() & novos.keys() if antigos[i][2] != novos[i][2]}
+        return {
+            'recarregar': not base or not novo,  # empty state <-> grid: recarrega a página
+            'removidos': [i for i in antigos if i not in novos or i in trocados],
+            'renomeados': {i: ws[1] for i, ws in novos.items() if i in antigos and i not in trocados and antigos[i][1] != ws[1]},
+            'adicionados': [WorkspaceGrid.card(0, *ws) for ws in novo if ws[0] not in antigos or ws[0] in trocados],
+            'total': len(novo),
+        }
+
+    @classmethod
+    async def _despachar(cls):
+        await asyncio.sleep(PUSH_BATCH_WINDOW)
+        with cls._lock:
+            pendentes, cls._pendentes, cls._agendado = cls._pendentes, set(), False
+            chaves = [k for k in cls._assinaturas if None in pendentes or k[0] in pendentes]
+
+        for cliente_id, perfil in chaves:
+            novo = await run.io_bound(obter_workspaces, cliente_id, perfil)
+            with cls._lock:
+                assinantes = dict(cls._assinaturas.get((cliente_id, perfil), {}))
+            grupos: Dict[int, Tuple[tuple, List[str]]] = {}
+            for client_id, base in assinantes.items():
+                grupos.setdefault(id(base), (base, []))[1].append(client_id)
+
+            for base, client_ids in grupos.values():
+                if base == novo:
+                    continue
+                script = f'cxAplicarDiffWorkspaces({json.dumps(cls.diff(base, novo))})'
+                for client_id in client_ids:
+                    client = Client.instances.get(client_id)
+                    if client is not None:
+                        client.run_javascript(script)
+                with cls._lock:
+                    atuais = cls._assinaturas.get((cliente_id, perfil), {})
+                    for client_id in client_ids:
+                        if client_id in atuais:
+                            atuais[client_id] = novo
+
+VersaoDados.ouvintes.append(CanalWorkspaces.publicar)
 
-cursor: {"default" if is_last or 'onClick' not in item else "pointer"};
 
-''')
+# ============================================================================
+# TEMAS POR CLIENTE - CSS COMPILADO COM FINGERPRINT
+# ============================================================================
 
-if 'onClick' in item and not is_last:
+_VALOR_TOKEN_VALIDO = re.compile(r'''[\w\s#%.,()'"+-]+''')  # sem ; { } < > \ : nada de sair da declaração
+
+class TemasClientes:
+    """
+    Compila os tokens do TemaCliente em um CSS só de custom properties,
+    servido em /tema/{cliente_id}/{hash}.css com cache imutável. Fica no
+    cache de renderização (invalidado pela versão do cliente); cliente sem
+    tema não ganha <link> nenhum e usa o :root padrão.
+    """
+    @staticmethod
+    def _compilar(cliente_id: int) -> Optional[Tuple[str, str]]:
+        tema = executar_leitura(lambda db: db.get(TemaCliente, cliente_id))
+        if tema is None:
+            return None
+        try:
+            tokens = json.loads(tema.tokens or '{}')
+        except ValueError:
+            print(f"AVISO: tema do cliente {cliente_id} não é JSON válido; usando o padrão.")
+            return None
+        validos = {nome: str(valor).strip() for nome, valor in tokens.items()
+                   if nome in TEMA_PADRAO and _VALOR_TOKEN_VALIDO.fullmatch(str(valor).strip())}
+        if not validos:
+            return None
+        css = ':root{' + ';'.join(f'--cx-{nome}:{valor}' for nome, valor in sorted(validos.items())) + '}'
+        return css, hashlib.sha256(css.encode()).hexdigest()[:12]
+
+    @classmethod
+    def obter(cls, cliente_id: int) -> Optional[Tuple[str, str]]:
+        """(css, hash) do tema do cliente, ou None sem tema"""
+        return cache_renderizacao.obter(cliente_id, ('tema_css',), lambda: cls._compilar(cliente_id))
+
+    @classmethod
+    def aplicar(cls, cliente_id: int):
+        """Referencia o CSS do tema no head da página atual"""
+        tema = cls.obter(cliente_id)
+        if tema is not None:
+            ui.add_head_html(f'<link rel="stylesheet" href="/tema/{cliente_id}/{tema[1]}.css">')
+
+    @staticmethod
+    def definir(cliente_id: int, tokens: Dict[str, str]):
+        db = SessionLocal()
+        try:
+            tema = db.get(TemaCliente, cliente_id) or TemaCliente(cliente_id=cliente_id)
+            tema.tokens = json.dumps({k: v for k, v in tokens.items() if k in TEMA_PADRAO})
+            db.add(tema)
+            db.commit()
+        finally:
+            db.close()
+
+@app.get('/tema/{cliente_id}/{arquivo}', include_in_schema=False)
+def tema_css(cliente_id: int, arquivo: str):
+    tema = TemasClientes.obter(cliente_id)
+    if tema is None:
+        return Response(status_code=404)
+    css, versao = tema
+    if arquivo == f'{versao}.css':
+        cabecalhos = {'Cache-Control': 'public, max-age=31536000, immutable', 'ETag': f'"{versao}"'}
+    else:
+        # Hash antigo (página aberta antes da troca de tema): entrega o atual sem cache
+        cabecalhos = {'Cache-Control': 'no-cache'}
+    return Response(css, media_type='text/css', headers=cabecalhos)
 
-label.on('click', item['onClick'])
 
-label.on('mouseenter', lambda e: e.sender.style(f'color: {DS.TEXT_PRIMARY};'))
+# ============================================================================
+# EXPORTAÇÃO & IMPORTAÇÃO DE CLIENTE - NDJSON EM STREAMING
+# ============================================================================
 
-label.on('mouseleave', lambda e: e.sender.style(f'color: {DS.TEXT_SECONDARY};'))
+EXPORT_CHUNK_ROWS = int(os.getenv('CX_EXPORT_CHUNK_ROWS', 1000))
+FORMATO_EXPORTACAO = 2  # 2: pastas_dashboards + dashboards.pasta_id
+FORMATOS_IMPORTAVEIS = (1, 2)
+
+def _consultas_exportacao(cliente_id: int) -> List[Tuple[str, Any]]:
+    """(tabela, SELECT) na ordem em que o import precisa das linhas"""
+    clientes, temas, users = Cliente.__table__, TemaCliente.__table__, User.__table__
+    dashboards, permissoes, pastas = Dashboard.__table__, DashboardPermissao.__table__, PastaDashboard.__table__
+    return [
+        ('clientes', select(clientes).where(clientes.c.id == cliente_id)),
+        ('temas_clientes', select(temas).where(temas.c.cliente_id == cliente_id)),
+        ('users', select(users).where(users.c.cliente_id == cliente_id).order_by(users.c.id)),
+        # Pais antes dos filhos: o import remonta o caminho com os ids novos
+        ('pastas_dashboards', select(pastas).where(pastas.c.cliente_id == cliente_id).order_by(pastas.c.profundidade, pastas.c.id)),
+        ('dashboards', select(dashboards).where(dashboards.c.cliente_id == cliente_id).order_by(dashboards.c.id)),
+        ('dashboard_permissoes', select(permissoes).join(dashboards, dashboards.c.id == permissoes.c.dashboard_id)
+                                 .where(dashboards.c.cliente_id == cliente_id).order_by(permissoes.c.id)),
+    ]
+
+def exportar_cliente(cliente_id: int) -> Iterator[str]:
+    """
+    Linhas NDJSON (cabeçalho + uma linha por registro) de um cliente, em memória
+    constante: cursor do lado do servidor (stream_results) lido em lotes de
+    EXPORT_CHUNK_ROWS. No Postgres tudo sai de uma transação REPEATABLE READ,
+    então o snapshot é consistente entre tabelas (no SQLite em WAL a transação
+    de leitura dá o mesmo, sem travar escritores). Sempre do primário.
+    """
+    opcoes = {'stream_results': True, 'yield_per': EXPORT_CHUNK_ROWS}
+    if engine.dialect.name == 'postgresql':
+        opcoes['isolation_level'] = 'REPEATABLE READ'
+    with engine_leitura.connect().execution_options(**opcoes) as conn:
+        with conn.begin():
+            yield json.dumps({'formato': FORMATO_EXPORTACAO, 'cliente_id': cliente_id,
+                              'exportado_em': datetime.now().isoformat()}) + '\n'
+            for tabela, consulta in _consultas_exportacao(cliente_id):
+                for lote in conn.execute(consulta).mappings().partitions():
+                    yield ''.join(json.dumps({'tabela': tabela, 'linha': dict(linha)}, default=str) + '\n' for linha in lote)
+
+def exportar_cliente_gzip(cliente_id: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for pedaco in exportar_cliente(cliente_id):
+        comprimido = compressor.compress(pedaco.encode())
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+def importar_cliente(linhas: Iterable[str]) -> Dict[str, Any]:
+    """
+    Importa um export NDJSON como um cliente NOVO (ids novos, remapeados), numa
+    transação só: erro no meio (ex.: email já existente) não deixa nada pela
+    metade. Lê e insere em lotes; só os mapas id antigo -> novo de pastas e
+    dashboards ficam em memória (inteiros), porque quem aponta para eles chega depois.
+    """
+    linhas = iter(linhas)
+    cabecalho = json.loads(next(linhas))
+    if cabecalho.get('formato') not in FORMATOS_IMPORTAVEIS:
+        raise ValueError(f"Formato de export não suportado: {cabecalho.get('formato')!r}")
+
+    tabelas = {m.__tablename__: m.__table__ for m in (Cliente, TemaCliente, User, PastaDashboard, Dashboard, DashboardPermissao)}
+    totais: Counter = Counter()
+    novo_cliente_id: Optional[int] = None
+    pastas_novas: Dict[int, int] = {}
+    dashboards_novos: Dict[int, int] = {}
+    lote: List[Dict[str, Any]] = []
+    tabela_lote: Optional[str] = None
+
+    def descarregar(conn):
+        nonlocal novo_cliente_id
+        if not lote:
+            return
+        tabela = tabelas[tabela_lote]
+        if tabela_lote == 'clientes':
+            novo_cliente_id = conn.execute(tabela.insert().values(nome=lote[0]['nome']).returning(tabela.c.id)).scalar()
+        elif tabela_lote == 'pastas_dashboards':
+            ids_antigos = [linha.pop('id') for linha in lote]
+            for linha in lote:
+                linha['cliente_id'] = novo_cliente_id
+            novos = conn.execute(tabela.insert().returning(tabela.c.id, sort_by_parameter_order=True), lote).scalars().all()
+            pastas_novas.update(zip(ids_antigos, novos))
+            # Ancestrais vieram em lotes anteriores ou neste mesmo: todos já têm id novo
+            conn.execute(tabela.update().where(tabela.c.id == bindparam('b_id')).values(caminho=bindparam('b_caminho')), [
+                {'b_id': novo, 'b_caminho': ''.join(f'{pastas_novas[int(i)]}/' for i in linha['caminho'].split('/') if i)}
+                for novo, linha in zip(novos, lote)
+            ])
+        elif tabela_lote == 'dashboards':
+            ids_antigos = [linha.pop('id') for linha in lote]
+            for linha in lote:
+                linha['cliente_id'] = novo_cliente_id
+                if linha.get('pasta_id') is not None:
+                    linha['pasta_id'] = pastas_novas[linha['pasta_id']]
+            novos = conn.execute(tabela.insert().returning(tabela.c.id, sort_by_parameter_order=True), lote).scalars().all()
+            dashboards_novos.update(zip(ids_antigos, novos))
+        else:
+            for linha in lote:
+                linha.pop('id', None)
+                if tabela_lote == 'dashboard_permissoes':
+                    linha['dashboard_id'] = dashboards_novos[linha['dashboard_id']]
+                else:
+                    linha['cliente_id'] = novo_cliente_id
+            conn.execute(tabela.insert(), lote)
+        totais[tabela_lote] += len(lote)
+        lote.clear()
+
+    with engine.begin() as conn:
+        for texto in linhas:
+            if not texto.strip():
+                continue
+            registro = json.loads(texto)
+            if registro['tabela'] != tabela_lote or len(lote) >= EXPORT_CHUNK_ROWS:
+                descarregar(conn)
+                tabela_lote = registro['tabela']
+            if tabela_lote not in tabelas:
+                raise ValueError(f'Tabela desconhecida no export: {tabela_lote!r}')
+            lote.append(registro['linha'])
+        descarregar(conn)
+        if novo_cliente_id is None:
+            raise ValueError('Export sem a linha do cliente.')
+        carimbar_versoes(conn, {novo_cliente_id})
+    return {'cliente_id': novo_cliente_id, **totais}
+
+@app.get('/admin/exportar', include_in_schema=False)
+def exportar_cliente_http(compactar: bool = Query(False, alias='gzip')):
+    """Backup do próprio cliente do admin logado, em streaming (?gzip=true compacta)"""
+    admin = obter_admin_logado()
+    if admin is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=403)
+    nome = f'cliente-{admin.cliente_id}-{datetime.now():%Y%m%d-%H%M%S}.ndjson'
+    if compactar:
+        return StreamingResponse(exportar_cliente_gzip(admin.cliente_id), media_type='application/gzip',
+                                 headers={'Content-Disposition': f'attachment; filename="{nome}.gz"'})
+    return StreamingResponse(exportar_cliente(admin.cliente_id), media_type='application/x-ndjson',
+                             headers={'Content-Disposition': f'attachment; filename="{nome}"'})
 
 
-if not is_last:
+# ============================================================================
+# PERMISSÕES - MATRIZ DASHBOARDS × PERFIS
+# ============================================================================
 
-ui.icon('chevron_right', size='16px').style(f'color: {DS.TEXT_DISABLED};')
+PERMISSOES_MAX_ALTERACOES = int(os.getenv('CX_PERMISSION_MAX_CHANGES', 50000))
+PERMISSOES_LOTE = 500  # pares (dashboard, perfil) por IN/INSERT: fica longe do limite de parâmetros do SQLite
+
+def carregar_matriz_permissoes(cliente_id: int) -> Dict[str, Any]:
+    """
+    Matriz do cliente numa consulta só: dashboards com as permissões (outer join)
+    UNION os perfis dos usuários, para aparecer coluna de perfil ainda sem nenhum
+    dashboard. Compacta para o browser: cada dashboard leva os índices dos perfis.
+    """
+    dashboards, permissoes, users = Dashboard.__table__, DashboardPermissao.__table__, User.__table__
+    consulta = union_all(
+        select(dashboards.c.id, dashboards.c.nome, dashboards.c.tipo, permissoes.c.perfil)
+        .select_from(dashboards.outerjoin(permissoes, permissoes.c.dashboard_id == dashboards.c.id))
+        .where(dashboards.c.cliente_id == cliente_id),
+        select(cast(null(), Integer), cast(null(), String), cast(null(), String), users.c.perfil)
+        .where(users.c.cliente_id == cliente_id).distinct(),
+    )
+    linhas = executar_leitura(lambda db: db.execute(consulta).all(), primario=True)
+
+    perfis = sorted({perfil for *_, perfil in linhas if perfil} | {PERFIL_ADMIN})
+    indice = {perfil: i for i, perfil in enumerate(perfis)}
+    por_dashboard: Dict[int, list] = {}
+    for dash_id, nome, tipo, perfil in linhas:
+        if dash_id is None:
+            continue
+        linha = por_dashboard.setdefault(dash_id, [dash_id, nome, tipo, []])
+        if perfil is not None and indice[perfil] not in linha[3]:
+            linha[3].append(indice[perfil])
+    return {
+        'perfis': perfis,
+        'dashboards': sorted(por_dashboard.values(), key=lambda d: (d[1].lower(), d[0])),
+        'versao': VersaoDados.atual(cliente_id)[1],
+    }
+
+def aplicar_permissoes(cliente_id: int, conceder: Iterable[Tuple[int, str]], revogar: Iterable[Tuple[int, str]]) -> Dict[str, int]:
+    """
+    Aplica só as células alteradas, numa transação: DELETE e INSERT em lote
+    (executemany), um carimbo de versão no fim. Cada célula é idempotente
+    (conceder o que já existe ou revogar o que não existe não faz nada), então
+    dois admins editando ao mesmo tempo não se atropelam além da própria célula.
+    """
+    conceder = {(int(d), str(p).strip()) for d, p in conceder}
+    revogar = {(int(d), str(p).strip()) for d, p in revogar}
+    if len(conceder) + len(revogar) > PERMISSOES_MAX_ALTERACOES:
+        raise ValueError(f'Alterações demais num envio só (máximo {PERMISSOES_MAX_ALTERACOES}).')
+    if conceder & revogar:
+        raise ValueError('A mesma célula não pode ser concedida e revogada no mesmo envio.')
+    if any(not 0 < len(p) <= 50 for _, p in conceder | revogar):
+        raise ValueError('Perfil vazio ou com mais de 50 caracteres.')
+
+    dashboards, permissoes = Dashboard.__table__, DashboardPermissao.__table__
+    lotes = lambda pares: (pares[i:i + PERMISSOES_LOTE] for i in range(0, len(pares), PERMISSOES_LOTE))
+    revogadas, novas, versoes = 0, [], {}
+    with engine.begin() as conn:
+        ids = sorted({d for d, _ in conceder | revogar})
+        validos = set()
+        for lote in lotes(ids):
+            validos.update(conn.execute(select(dashboards.c.id).where(dashboards.c.cliente_id == cliente_id,
+                                                                       dashboards.c.id.in_(lote))).scalars())
+        if len(validos) != len(ids):
+            raise ValueError(f'Dashboards inexistentes ou de outro cliente: {sorted(set(ids) - validos)[:10]}')
+
+        for lote in lotes(sorted(revogar)):
+            revogadas += conn.execute(delete(permissoes).where(
+                tuple_(permissoes.c.dashboard_id, permissoes.c.perfil).in_(lote))).rowcount
+        existentes = set()
+        for lote in lotes(sorted(conceder)):
+            existentes.update(map(tuple, conn.execute(select(permissoes.c.dashboard_id, permissoes.c.perfil).where(
+                tuple_(permissoes.c.dashboard_id, permissoes.c.perfil).in_(lote)))))
+        novas = [{'dashboard_id': d, 'perfil': p} for d, p in sorted(conceder - existentes)]
+        for lote in lotes(novas):
+            conn.execute(permissoes.insert(), lote)
+
+        if revogadas or novas:
+            versoes = carimbar_versoes(conn, {cliente_id})
+    publicar_versoes(versoes)
+    return {'concedidas': len(novas), 'revogadas': revogadas}
+
+@app.get('/admin/permissoes/matriz', include_in_schema=False)
+def matriz_permissoes():
+    admin = obter_admin_logado()
+    if admin is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=403)
+    return JSONResponse(carregar_matriz_permissoes(admin.cliente_id), headers={'Cache-Control': 'no-store'})
+
+@app.post('/admin/permissoes/matriz', include_in_schema=False)
+async def salvar_permissoes(request: Request):
+    """Recebe só o diff do browser: {"conceder": [[dash_id, perfil], ...], "revogar": [...]}"""
+    admin = obter_admin_logado()
+    if admin is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=403)
+    try:
+        corpo = await request.json()
+        resultado = await run.io_bound(aplicar_permissoes, admin.cliente_id,
+                                       corpo.get('conceder', []), corpo.get('revogar', []))
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({'erro': str(e) or 'corpo inválido'}, status_code=400)
+    return JSONResponse(resultado)
 
 
-# Right: User Menu Premium
+# ============================================================================
+# PASTAS - ESCRITAS NO CAMINHO MATERIALIZADO
+# ============================================================================
 
-with ui.row().classes('items-center').style(f'gap: {DS.SPACING_MD};'):
+def _pasta_do_cliente(conn, cliente_id: int, pasta_id: int) -> Tuple[str, int]:
+    pastas = PastaDashboard.__table__
+    linha = conn.execute(select(pastas.c.caminho, pastas.c.profundidade)
+                         .where(pastas.c.id == pasta_id, pastas.c.cliente_id == cliente_id)).first()
+    if linha is None:
+        raise ValueError(f'Pasta {pasta_id} não existe neste cliente.')
+    return linha.caminho, linha.profundidade
+
+def criar_pasta(cliente_id: int, nome: str, pai_id: Optional[int] = None) -> int:
+    """Cria a pasta (na raiz ou dentro de pai_id) e devolve o id; o caminho precisa do id, daí o UPDATE logo depois"""
+    pastas = PastaDashboard.__table__
+    with engine.begin() as conn:
+        caminho_pai, profundidade_pai = _pasta_do_cliente(conn, cliente_id, pai_id) if pai_id is not None else ('', 0)
+        pasta_id = conn.execute(pastas.insert().values(cliente_id=cliente_id, nome=nome, caminho='',
+                                                       profundidade=profundidade_pai + 1).returning(pastas.c.id)).scalar()
+        conn.execute(pastas.update().where(pastas.c.id == pasta_id).values(caminho=f'{caminho_pai}{pasta_id}/'))
+        versoes = carimbar_versoes(conn, {cliente_id})
+    publicar_versoes(versoes)
+    return pasta_id
+
+def mover_pasta(cliente_id: int, pasta_id: int, novo_pai_id: Optional[int]):
+    """Move a subárvore inteira com um UPDATE só: troca o prefixo do caminho de todos os descendentes"""
+    pastas = PastaDashboard.__table__
+    with engine.begin() as conn:
+        caminho, profundidade = _pasta_do_cliente(conn, cliente_id, pasta_id)
+        caminho_pai, profundidade_pai = _pasta_do_cliente(conn, cliente_id, novo_pai_id) if novo_pai_id is not None else ('', 0)
+        if caminho_pai.startswith(caminho):
+            raise ValueError('Uma pasta não pode ir para dentro dela mesma.')
+        novo_caminho = f'{caminho_pai}{pasta_id}/'
+        conn.execute(pastas.update()
+                     .where(pastas.c.cliente_id == cliente_id, pastas.c.caminho.startswith(caminho, autoescape=True))
+                     .values(caminho=novo_caminho + func.substr(pastas.c.caminho, len(caminho) + 1),
+                             profundidade=pastas.c.profundidade + (profundidade_pai + 1 - profundidade)))
+        versoes = carimbar_versoes(conn, {cliente_id})
+    publicar_versoes(versoes)
+
+def mover_dashboards(cliente_id: int, dash_ids: Iterable[int], pasta_id: Optional[int]) -> int:
+    """Coloca os dashboards na pasta (None = raiz); ids de outro cliente são ignorados pelo WHERE"""
+    dashboards = Dashboard.__table__
+    with engine.begin() as conn:
+        if pasta_id is not None:
+            _pasta_do_cliente(conn, cliente_id, pasta_id)
+        movidos = conn.execute(dashboards.update()
+                               .where(dashboards.c.cliente_id == cliente_id, dashboards.c.id.in_(list(dash_ids)))
+                               .values(pasta_id=pasta_id)).rowcount
+        versoes = carimbar_versoes(conn, {cliente_id}) if movidos else {}
+    publicar_versoes(versoes)
+    return movidos
 
-# Avatar + Info
 
-user_menu = ui.row().classes('items-center cursor-pointer').style(f'''
+# ============================================================================
+# EMBEDS - PROXY REVERSO COM CACHE DE ASSETS
+# ============================================================================
 
-gap: {DS.SPACING_MD};
+EMBED_PROXY = os.getenv('CX_EMBED_PROXY', '0') == '1'
+# Sem CX_EMBED_PROXY_SECRET cada processo sorteia o seu: com vários workers, defina
+EMBED_PROXY_SECRET = (os.getenv('CX_EMBED_PROXY_SECRET') or secrets.token_hex(16)).encode()
+EMBED_PROXY_TIMEOUT = float(os.getenv('CX_EMBED_PROXY_TIMEOUT', 30))
+EMBED_CACHE_DIR = Path(os.getenv('CX_EMBED_CACHE_DIR', '.cx-embed-cache'))
+EMBED_CACHE_MAX_BYTES = int(float(os.getenv('CX_EMBED_CACHE_MAX_MB', 512)) * 1024 * 1024)
+EMBED_CACHE_MAX_ITEM_BYTES = int(float(os.getenv('CX_EMBED_CACHE_MAX_ITEM_MB', 32)) * 1024 * 1024)
+EMBED_CACHE_DEFAULT_TTL = float(os.getenv('CX_EMBED_CACHE_DEFAULT_TTL', 24 * 3600))  # asset sem max-age
+
+class ProxyEmbed:
+    """
+    Com CX_EMBED_PROXY=1 o link_embed vira /embed/{origem assinada}/{caminho} e o
+    iframe passa pelo portal: assets estáticos do fornecedor de BI ficam em disco
+    (LRU limitado por tamanho, revalidação com ETag/Last-Modified quando vencem)
+    e o resto é repassado em streaming, sem tocar. A origem vai no próprio path
+    com HMAC, então não é proxy aberto e qualquer processo valida sem estado.
+
+    No HTML do fornecedor, caminhos absolutos (/...) e assets de outras origens
+    são reescritos para o proxy; URLs montadas por JavaScript vão direto. Cookies
+    não passam em nenhum sentido. O conteúdo do fornecedor passa a rodar na
+    origem do portal: só ative para fornecedores confiáveis.
+    """
+    EXTENSOES_ESTATICAS = {'.js', '.mjs', '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+                           '.woff', '.woff2', '.ttf', '.otf', '.eot', '.map', '.wasm'}
+    CABECALHOS_PEDIDO = ('accept', 'accept-language', 'user-agent', 'content-type', 'range',
+                         'if-none-match', 'if-modified-since')
+    CABECALHOS_RESPOSTA = ('content-type', 'content-encoding', 'content-length', 'cache-control', 'etag',
+                           'last-modified', 'expires', 'content-range', 'accept-ranges', 'content-disposition', 'vary')
+    _ATRIBUTO_URL = re.compile(r'''((src|href|action)\s*=\s*["'])(https?://[^/"'\s]+)?(/(?!/)[^"'\s]*)''', re.IGNORECASE)
+
+    _http: Optional[httpx.AsyncClient] = None
+    _indice: Optional['OrderedDict[str, dict]'] = None  # chave -> meta, do menos ao mais recente
+    _bytes = 0
+    acertos = revalidados = baixados = repassados = despejados = 0
+    bytes_do_cache = 0
+
+    # ---- URLs -------------------------------------------------------------
+
+    @staticmethod
+    def _assinatura(origem: str) -> str:
+        return hmac.new(EMBED_PROXY_SECRET, origem.encode(), hashlib.sha256).hexdigest()[:16]
+
+    @classmethod
+    def _prefixo(cls, origem: str) -> str:
+        codificada = base64.urlsafe_b64encode(origem.encode()).decode().rstrip('=')
+        return f'/embed/{codificada}.{cls._assinatura(origem)}'
+
+    @classmethod
+    def _origem(cls, token: str) -> Optional[str]:
+        codificada, _, assinatura = token.rpartition('.')
+        try:
+            origem = base64.urlsafe_b64decode(codificada + '=' * (-len(codificada) % 4)).decode()
+        except (ValueError, UnicodeDecodeError):
+            return None
+        return origem if hmac.compare_digest(assinatura, cls._assinatura(origem)) else None
+
+    @classmethod
+    def reescrever(cls, url: str) -> str:
+        """link_embed -> URL pelo proxy (o próprio link, com o proxy desligado)"""
+        partes = urllib.parse.urlsplit(url)
+        if not EMBED_PROXY or partes.scheme not in ('http', 'https') or not partes.netloc:
+            return url
+        return (cls._prefixo(f'{partes.scheme}://{partes.netloc}') + (partes.path or '/')
+                + (f'?{partes.query}' if partes.query else '') + (f'#{partes.fragment}' if partes.fragment else ''))
+
+    @classmethod
+    def _reescrever_html(cls, texto: str, origem: str) -> str:
+        def trocar(m: re.Match) -> str:
+            atributo, outra_origem, caminho = m.group(2).lower(), m.group(3), m.group(4)
+            # Link absoluto que não é asset (ex.: login do fornecedor) continua direto
+            if outra_origem and atributo != 'src' and Path(caminho.split('?')[0]).suffix.lower() not in cls.EXTENSOES_ESTATICAS:
+                return m.group(0)
+            return m.group(1) + cls._prefixo(outra_origem or origem) + caminho
+        return cls._ATRIBUTO_URL.sub(trocar, texto)
+
+    @classmethod
+    def _reescrever_location(cls, location: str, origem: str) -> str:
+        if location.startswith('/') and not location.startswith('//'):
+            return cls._prefixo(origem) + location
+        partes = urllib.parse.urlsplit(location)
+        return cls.reescrever(location) if f'{partes.scheme}://{partes.netloc}' == origem else location
+
+    # ---- Cache em disco -----------------------------------------------------
+
+    @staticmethod
+    def _carregar_indice() -> 'OrderedDict[str, dict]':
+        EMBED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        itens = []
+        for arquivo in EMBED_CACHE_DIR.glob('*.json'):
+            try:
+                meta = json.loads(arquivo.read_text(encoding='utf-8'))
+                meta['tamanho'] = arquivo.with_suffix('.bin').stat().st_size
+                itens.append((meta['usado_em'], arquivo.stem, meta))
+            except (OSError, ValueError, KeyError):
+                arquivo.unlink(missing_ok=True)
+        return OrderedDict((chave, meta) for _, chave, meta in sorted(itens, key=lambda item: item[0]))
+
+    @staticmethod
+    def _gravar(chave: str, meta: dict, corpo: Optional[bytes] = None):
+        """Em thread. Corpo antes do meta: meta no disco = entrada completa"""
+        if corpo is not None:
+            temporario = EMBED_CACHE_DIR / f'{chave}.{secrets.token_hex(4)}.tmp'
+            temporario.write_bytes(corpo)
+            temporario.replace(EMBED_CACHE_DIR / f'{chave}.bin')
+        (EMBED_CACHE_DIR / f'{chave}.json').write_text(json.dumps(meta), encoding='utf-8')
+
+    @staticmethod
+    def _apagar(chaves: List[str]):
+        for chave in chaves:
+            (EMBED_CACHE_DIR / f'{chave}.json').unlink(missing_ok=True)
+            (EMBED_CACHE_DIR / f'{chave}.bin').unlink(missing_ok=True)
+
+    @classmethod
+    async def _guardar(cls, chave: str, meta: dict, corpo: bytes):
+        meta['tamanho'] = len(corpo)
+        await run.io_bound(cls._gravar, chave, meta, corpo)
+        antigo = cls._indice.pop(chave, None)
+        cls._bytes += len(corpo) - (antigo['tamanho'] if antigo else 0)
+        cls._indice[chave] = meta
+        despejadas = []
+        while cls._bytes > EMBED_CACHE_MAX_BYTES and cls._indice:
+            velha, meta_velha = cls._indice.popitem(last=False)
+            cls._bytes -= meta_velha['tamanho']
+            despejadas.append(velha)
+        if despejadas:
+            cls.despejados += len(despejadas)
+            await run.io_bound(cls._apagar, despejadas)
+
+    @staticmethod
+    def _validade(cache_control: str) -> float:
+        cache_control = cache_control.lower()
+        if 'immutable' in cache_control:
+            return float('inf')
+        if 'no-cache' in cache_control:
+            return 0.0
+        achado = re.search(r'max-age=(\d+)', cache_control)
+        return float(achado.group(1)) if achado else EMBED_CACHE_DEFAULT_TTL
+
+    @classmethod
+    def _cacheavel(cls, caminho: str, resposta: httpx.Response) -> bool:
+        cache_control = resposta.headers.get('cache-control', '').lower()
+        if resposta.status_code != 200 or 'set-cookie' in resposta.headers or 'no-store' in cache_control or 'private' in cache_control:
+            return False
+        return 'immutable' in cache_control or Path(caminho).suffix.lower() in cls.EXTENSOES_ESTATICAS
+
+    @classmethod
+    def _do_disco(cls, request: Request, chave: str, meta: dict) -> Optional[Response]:
+        arquivo = EMBED_CACHE_DIR / f'{chave}.bin'
+        if not arquivo.exists():  # despejado por outro processo que usa o mesmo diretório
+            cls._bytes -= cls._indice.pop(chave)['tamanho']
+            return None
+        cabecalhos = meta['cabecalhos']
+        if cabecalhos.get('etag') and cabecalhos['etag'] in request.headers.get('if-none-match', ''):
+            return Response(status_code=304, headers={k: v for k, v in cabecalhos.items() if k in ('etag', 'cache-control')})
+        cls.bytes_do_cache += meta['tamanho']
+        return FileResponse(arquivo, headers=cabecalhos)
+
+    # ---- Requisição ---------------------------------------------------------
+
+    @classmethod
+    async def _repassar(cls, resposta: httpx.Response, chave: Optional[str], meta: Optional[dict]):
+        """Corpo do fornecedor em streaming; se for cacheável, guarda ao terminar (cliente que desiste no meio não grava)"""
+        pedacos: Optional[List[bytes]] = [] if chave else None
+        tamanho = 0
+        try:
+            async for pedaco in resposta.aiter_raw():
+                yield pedaco
+                if pedacos is not None:
+                    tamanho += len(pedaco)
+                    if tamanho > EMBED_CACHE_MAX_ITEM_BYTES:
+                        pedacos = None
+                    else:
+                        pedacos.append(pedaco)
+        finally:
+            await resposta.aclose()
+        if pedacos is not None:
+            await cls._guardar(chave, meta, b''.join(pedacos))
+
+    @classmethod
+    async def _responder(cls, resposta: httpx.Response, origem: str, caminho: str, chave: Optional[str]) -> Response:
+        cabecalhos = {k: v for k, v in resposta.headers.items() if k in cls.CABECALHOS_RESPOSTA}
+        if 'location' in resposta.headers:
+            cabecalhos['location'] = cls._reescrever_location(resposta.headers['location'], origem)
+
+        if cabecalhos.get('content-type', '').startswith('text/html'):
+            try:
+                await resposta.aread()
+            finally:
+                await resposta.aclose()
+            for cabecalho in ('content-encoding', 'content-length', 'etag'):
+                cabecalhos.pop(cabecalho, None)
+            cabecalhos['content-type'] = 'text/html; charset=utf-8'
+            cls.repassados += 1
+            return Response(cls._reescrever_html(resposta.text, origem), status_code=resposta.status_code, headers=cabecalhos)
+
+        meta = None
+        if chave is not None and cls._cacheavel(caminho, resposta):
+            meta = {'cabecalhos': {k: v for k, v in cabecalhos.items() if k != 'content-length'},
+                    'armazenado_em': time.time(), 'usado_em': time.time()}
+            cls.baixados += 1
+        else:
+            chave = None
+            cls.repassados += 1
+        return StreamingResponse(cls._repassar(resposta, chave, meta), status_code=resposta.status_code, headers=cabecalhos)
+
+    @classmethod
+    async def atender(cls, request: Request, token: str, caminho: str) -> Response:
+        origem = cls._origem(token) if EMBED_PROXY else None
+        if origem is None:
+            return PlainTextResponse('não encontrado', status_code=404)
+        if not AppState.atual().user_email:
+            return PlainTextResponse('não autorizado', status_code=403)
+        if cls._http is None:
+            cls._http = httpx.AsyncClient(timeout=EMBED_PROXY_TIMEOUT, follow_redirects=False)
+
+        url = f'{origem}/{caminho}' + (f'?{request.url.query}' if request.url.query else '')
+        cabecalhos = {k: v for k, v in request.headers.items() if k in cls.CABECALHOS_PEDIDO}
+        cabecalhos['accept-encoding'] = 'gzip'  # o que vai para o cache tem que servir a qualquer navegador
+        chave = None
+        try:
+            if request.method == 'GET' and 'range' not in cabecalhos:
+                if cls._indice is None:
+                    cls._indice = await run.io_bound(cls._carregar_indice)
+                    cls._bytes = sum(meta['tamanho'] for meta in cls._indice.values())
+                chave = hashlib.sha256(url.encode()).hexdigest()
+                meta = cls._indice.get(chave)
+                if meta is not None:
+                    cls._indice.move_to_end(chave)
+                    meta['usado_em'] = time.time()
+                    validade = cls._validade(meta['cabecalhos'].get('cache-control', ''))
+                    if time.time() - meta['armazenado_em'] < validade and (resposta := cls._do_disco(request, chave, meta)):
+                        cls.acertos += 1
+                        return resposta
+                    if chave in cls._indice:
+                        # Vencido: pergunta ao fornecedor com os validadores guardados
+                        condicional = {k: v for k, v in cabecalhos.items() if not k.startswith('if-')}
+                        if 'etag' in meta['cabecalhos']:
+                            condicional['if-none-match'] = meta['cabecalhos']['etag']
+                        if 'last-modified' in meta['cabecalhos']:
+                            condicional['if-modified-since'] = meta['cabecalhos']['last-modified']
+                        resposta = await cls._http.send(cls._http.build_request('GET', url, headers=condicional), stream=True)
+                        if resposta.status_code != 304:
+                            return await cls._responder(resposta, origem, caminho, chave)
+                        await resposta.aclose()
+                        if 'cache-control' in resposta.headers:
+                            meta['cabecalhos']['cache-control'] = resposta.headers['cache-control']
+                        meta['armazenado_em'] = time.time()
+                        await run.io_bound(cls._gravar, chave, meta)
+                        if (resposta := cls._do_disco(request, chave, meta)):
+                            cls.revalidados += 1
+                            return resposta
+
+            corpo = request.stream() if request.method == 'POST' else None
+            resposta = await cls._http.send(cls._http.build_request(request.method, url, headers=cabecalhos, content=corpo),
+                                            stream=True)
+            return await cls._responder(resposta, origem, caminho, chave)
+        except httpx.HTTPError as e:
+            print(f"AVISO: proxy de embed falhou em {origem} ({type(e).__name__}: {e}).")
+            return PlainTextResponse('fornecedor do dashboard indisponível', status_code=502)
+
+    @classmethod
+    async def fechar(cls):
+        if cls._http is not None:
+            await cls._http.aclose()
+
+    @classmethod
+    def prometheus(cls) -> str:
+        return '\n'.join([
+            '# TYPE cx_embed_proxy_requests_total counter',
+            f'cx_embed_proxy_requests_total{{resultado="hit"}} {cls.acertos}',
+            f'cx_embed_proxy_requests_total{{resultado="revalidado"}} {cls.revalidados}',
+            f'cx_embed_proxy_requests_total{{resultado="miss"}} {cls.baixados}',
+            f'cx_embed_proxy_requests_total{{resultado="repassado"}} {cls.repassados}',
+            '# TYPE cx_embed_cache_served_bytes_total counter',
+            f'cx_embed_cache_served_bytes_total {cls.bytes_do_cache}',
+            '# TYPE cx_embed_cache_bytes gauge',
+            f'cx_embed_cache_bytes {cls._bytes}',
+            '# TYPE cx_embed_cache_evictions_total counter',
+            f'cx_embed_cache_evictions_total {cls.despejados}',
+        ]) + '\n'
+
+@app.api_route('/embed/{token}/{caminho:path}', methods=['GET', 'HEAD', 'POST'], include_in_schema=False)
+async def proxy_embed(request: Request, token: str, caminho: str):
+    return await ProxyEmbed.atender(request, token, caminho)
+
+app.on_shutdown(ProxyEmbed.fechar)
 
-padding: {DS.SPACING_SM} {DS.SPACING_MD};
 
-border-radius: {DS.RADIUS_MD};
+# ============================================================================
+# PAGES
+# ============================================================================
 
-transition: background {DS.TRANSITION_FAST};
+@ui.page('/login')
+@rastreado('page_login', raiz=True)
+@perfilavel('page_login')
+def page_login():
+    state = AppState.atual()
+    if state.user_email: ui.navigate.to('/'); return
+    if (sobrecarga := resposta_sobrecarga()): return sobrecarga
+
+    with ui.column().classes('w-full h-screen items-center justify-center').style(f'''
+        background: linear-gradient(135deg, {DS.SURFACE_50} 0%, {DS.PRIMARY_ULTRA_LIGHT} 100%);
+    '''):
+        # Subtle grid pattern (.cx-login-grid no CSS global)
+        ui.element('div').classes('cx-login-grid')
+
+        with ui.column().classes('w-full max-w-md px-8 relative z-10').style(f'gap: {DS.SPACING_2XL};'):
+            # Branding
+            with ui.column().classes('items-center').style(f'gap: {DS.SPACING_MD};'):
+                with ui.column().classes('items-center justify-center').style(f'''
+                    width: 48px;
+                    height: 48px;
+                    background: {DS.PRIMARY};
+                    border-radius: {DS.RADIUS_LG};
+                    box-shadow: {DS.SHADOW_MD};
+                '''):
+                    ui.icon('analytics', size='24px', color='white')
+                ui.label('CX Data').classes('text-2xl').style(f'''
+                    color: {DS.TEXT_PRIMARY};
+                    font-weight: 700;
+                    letter-spacing: -0.02em;
+                ''')
+                ui.label('Analytics Platform').classes('text-xs').style(f'''
+                    color: {DS.TEXT_TERTIARY};
+                    font-weight: 500;
+                    letter-spacing: 0.05em;
+                    text-transform: uppercase;
+                ''')
+
+            # Login Card
+            with ui.column().classes('w-full').style(f'''
+                gap: {DS.SPACING_XL};
+                background: {DS.SURFACE_ELEVATED};
+                border: 1px solid {DS.BORDER_LIGHT};
+                border-radius: {DS.RADIUS_XL};
+                padding: {DS.SPACING_3XL};
+                box-shadow: {DS.SHADOW_LG};
+            '''):
+                ui.label('Acesse sua conta').classes('text-lg').style(f'''
+                    color: {DS.TEXT_PRIMARY};
+                    font-weight: 600;
+                    letter-spacing: -0.01em;
+                ''')
+
+                email = UIComponents.input_field('Email', icon='mail', placeholder='seu@email.com')
+                senha = UIComponents.input_field('Senha', password=True, icon='lock', placeholder='••••••••')
+
+                erro_label = ui.label('').classes('text-sm hidden').style(f'color: #dc2626;')
+
+                @rastreado('try_login', raiz=True)
+                @perfilavel('try_login')
+                def try_login():
+                    user = autenticar_usuario(email.value.strip(), senha.value)
+                    if user:
+                        state.login(user)
+                        ui.navigate.to('/')
+                    else:
+                        erro_label.text = 'Credenciais inválidas. Verifique e tente novamente.'
+                        erro_label.classes(remove='hidden')
+
+                UIComponents.primary_button('Acessar plataforma', on_click=try_login, full_width=True, icon='arrow_forward')
+                senha.on('keydown.enter', try_login)
 
-''')
 
+@ui.page('/')
+@rastreado('page_home', raiz=True)
+@perfilavel('page_home')
+async def page_home():
+    state = AppState.atual()
+    if not state.user_email: return resposta_sobrecarga() or ui.navigate.to('/login')
+    user = state.get_user_completo()
+    if not user: state.logout(); ui.navigate.to('/login'); return
+    if not await AdmissaoClientes.admitir(user.cliente_id): return resposta_limite_cliente()
+    TemasClientes.aplicar(user.cliente_id)
+    MemoriaClientes.associar(user.cliente_id)
+
+    cliente_nome = obter_nome_cliente(user.cliente_id)
+    workspaces = obter_workspaces(user.cliente_id, user.perfil)
+    grid_html = obter_grid_workspaces(user.cliente_id, user.perfil)
+    if usa_pastas(user.cliente_id, user.perfil):
+        ui.add_head_html(f'<script defer src="{URL_PASTAS_JS}"></script>')
+    if (css_status := SondaEmbeds.css_por_cliente.get(user.cliente_id)):
+        ui.add_css(css_status)
+    CanalWorkspaces.assinar(ui.context.client, user.cliente_id, user.perfil, workspaces)
+
+    with ui.column().classes('w-full h-screen').style(f'''
+        background: {DS.SURFACE_50};
+        margin: 0;
+        padding: 0;
+        font-family: {DS.FONT};
+    '''):
+        # Topbar Navigation
+        TopbarNavigation.create(
+            cliente_nome=cliente_nome,
+            user_email=user.email,
+            current_page='home'
+        )
+
+        # Main Content (com padding-top para compensar topbar fixa)
+        with ui.column().classes('w-full').style(f'''
+            padding-top: 64px;
+            min-height: 100vh;
+        '''):
+            # Page Header
+            with ui.column().classes('w-full').style(f'''
+                padding: {DS.SPACING_3XL} {DS.SPACING_2XL} {DS.SPACING_XL} {DS.SPACING_2XL};
+                background: {DS.SURFACE};
+                border-bottom: 1px solid {DS.BORDER_LIGHT};
+            '''):
+                with LayoutComponents.page_container(padding='0'):
+                    with ui.column().style(f'gap: {DS.SPACING_SM};'):
+                        ui.label('Seus Workspaces').classes('text-2xl').style(f'''
+                            color: {DS.TEXT_PRIMARY};
+                            font-weight: 700;
+                            letter-spacing: -0.02em;
+                        ''')
+                        ui.label(f'Bem-vindo de volta, {cliente_nome.split()[0]}').classes('text-sm').style(f'''
+                            color: {DS.TEXT_SECONDARY};
+                        ''')
+
+            # Workspace Grid (fragmento compartilhado por cliente/perfil)
+            with LayoutComponents.page_container(padding=f'{DS.SPACING_2XL}'):
+                if grid_html:
+                    ui.html(grid_html, sanitize=False).classes('w-full')
+                else:
+                    with ui.column().classes('w-full').style(f'padding: {DS.SPACING_3XL} 0;'):
+                        LayoutComponents.empty_state(
+                            icon='analytics',
+                            title='Nenhum workspace disponível',
+                            description='Você ainda não tem workspaces atribuídos. Entre em contato com seu administrador.'
+                        )
 
-with user_menu:
 
-# Info (name + email)
+@ui.page('/dashboard/{dash_id}')
+@rastreado('page_dashboard', raiz=True)
+@perfilavel('page_dashboard')
+async def page_dashboard(dash_id: int):
+    state = AppState.atual()
+    if not state.user_email: return resposta_sobrecarga() or ui.navigate.to('/login')
+    user = state.get_user_completo()
+    if not user: ui.navigate.to('/login'); return
+    if not await AdmissaoClientes.admitir(user.cliente_id): return resposta_limite_cliente()
+    TemasClientes.aplicar(user.cliente_id)
+    MemoriaClientes.associar(user.cliente_id)
+
+    # Autorização: teste O(1) no conjunto pré-computado do (cliente, perfil);
+    # ids de outros clientes ou sem permissão nem chegam a consultar o banco
+    dash = None
+    if dash_id in obter_ids_autorizados(user.cliente_id, user.perfil):
+        dash = obter_dashboard(user.cliente_id, dash_id)
+    cliente_nome = obter_nome_cliente(user.cliente_id)
+
+    if not dash:
+        with ui.column().classes('w-full h-screen items-center justify-center'):
+            LayoutComponents.empty_state(
+                icon='error_outline',
+                title='Workspace não encontrado',
+                description='O workspace solicitado não existe ou você não tem permissão para acessá-lo.'
+            )
+        return
+
+    with ui.column().classes('w-full h-screen').style(f'''
+        background: {DS.SURFACE_50};
+        margin: 0;
+        padding: 0;
+        overflow: hidden;
+    '''):
+        # Topbar Navigation com Breadcrumb
+        TopbarNavigation.create(
+            cliente_nome=cliente_nome,
+            user_email=user.email,
+            current_page='dashboard',
+            breadcrumb=[
+                {'label': 'Workspaces', 'onClick': lambda: ui.navigate.to('/')},
+                {'label': dash.nome}
+            ]
+        )
+
+        # Embed Container (com padding-top para compensar topbar fixa)
+        content_area = ui.column().classes('w-full flex-grow relative').style(f'''
+            padding: 0;
+            margin: 0;
+            overflow: hidden;
+            margin-top: 64px;
+        ''')
+
+        # Última sonda do link (SondaEmbeds): fornecedor fora do ar vira aviso, não um skeleton eterno
+        aviso_html = ''
+        sonda = SondaEmbeds.resultados.get(dash.link_embed)
+        if sonda is not None and sonda[0] == 'fora':
+            aviso_html = f'''
+                    <div style="position: absolute; top: 0; left: 0; right: 0; z-index: 1; padding: {DS.SPACING_SM} {DS.SPACING_LG};
+                                font-size: 13px; color: #b91c1c; background: #fee2e2;">
+                        Este dashboard não respondeu na última verificação ({datetime.fromtimestamp(sonda[1]):%H:%M}).
+                        O fornecedor pode estar fora do ar.
+                    </div>'''
+
+        with content_area:
+            # Loading Skeleton
+            with ui.column().classes('w-full h-full absolute top-0 left-0 z-0 items-center justify-center').style(f'''
+                background: {DS.SURFACE};
+                padding: {DS.SPACING_2XL};
+            '''):
+                with ui.column().classes('w-full h-full').style(f'''
+                    max-width: 1400px;
+                    margin: 0 auto;
+                '''):
+                    SkeletonLoader.create('100%')
+
+            # Embed with Premium Wrapper
+            ui.html(f'''
+                <div style="
+                    position: absolute;
+                    top: {DS.SPACING_XL};
+                    left: {DS.SPACING_XL};
+                    right: {DS.SPACING_XL};
+                    bottom: {DS.SPACING_XL};
+                    z-index: 10;
+                    background: {DS.SURFACE_ELEVATED};
+                    border-radius: {DS.RADIUS_LG};
+                    border: 1px solid {DS.BORDER};
+                    box-shadow: {DS.SHADOW_MD};
+                    overflow: hidden;
+                ">{aviso_html}
+                    <iframe
+                        src="{ProxyEmbed.reescrever(dash.link_embed)}"
+                        style="
+                            width: 100%;
+                            height: 100%;
+                            border: none;
+                            background: transparent;
+                        "
+                        allowfullscreen>
+                    </iframe>
+                </div>
+            ''', sanitize=False)
+
+
+@ui.page('/painel')
+@rastreado('page_painel', raiz=True)
+@perfilavel('page_painel')
+async def page_painel(ids: str = ''):
+    """Vários dashboards numa tela só; a seleção fica na URL (/painel?ids=3,1,7) para compartilhar"""
+    state = AppState.atual()
+    if not state.user_email: return resposta_sobrecarga() or ui.navigate.to('/login')
+    user = state.get_user_completo()
+    if not user: ui.navigate.to('/login'); return
+    if not await AdmissaoClientes.admitir(user.cliente_id): return resposta_limite_cliente()
+    TemasClientes.aplicar(user.cliente_id)
+    MemoriaClientes.associar(user.cliente_id)
+
+    # Mesma autorização da página do dashboard: ids fora do conjunto somem em silêncio
+    autorizados = obter_ids_autorizados(user.cliente_id, user.perfil)
+    pedidos = list(dict.fromkeys(int(i) for i in ids.split(',') if i.strip().isdigit()))
+    escolhidos = [i for i in pedidos if i in autorizados][:SPLIT_VIEW_MAX]
+    dashboards = obter_dashboards(user.cliente_id, escolhidos)
+    escolhidos = [i for i in escolhidos if i in dashboards]
+    cliente_nome = obter_nome_cliente(user.cliente_id)
+
+    with ui.column().classes('w-full').style(f'''
+        background: {DS.SURFACE_50};
+        min-height: 100vh;
+        font-family: {DS.FONT};
+    '''):
+        TopbarNavigation.create(
+            cliente_nome=cliente_nome,
+            user_email=user.email,
+            current_page='painel',
+            breadcrumb=[
+                {'label': 'Workspaces', 'onClick': lambda: ui.navigate.to('/')},
+                {'label': f'Painel ({len(escolhidos)})'}
+            ]
+        )
+
+        with ui.column().classes('w-full').style(f'padding: 88px {DS.SPACING_2XL} {DS.SPACING_2XL}; gap: {DS.SPACING_LG};'):
+            with ui.row().classes('w-full items-end').style(f'gap: {DS.SPACING_LG};'):
+                selecao = ui.select({ws_id: nome for ws_id, nome, _ in obter_workspaces(user.cliente_id, user.perfil)},
+                                    value=escolhidos, multiple=True, with_input=True,
+                                    label=f'Dashboards do painel (até {SPLIT_VIEW_MAX})') \
+                    .props('outlined dense use-chips').classes('flex-grow')
+                UIComponents.primary_button(
+                    'Atualizar painel', icon='grid_view',
+                    on_click=lambda: ui.navigate.to(f"/painel?ids={','.join(map(str, (selecao.value or [])[:SPLIT_VIEW_MAX]))}")
+                )
+
+            if escolhidos:
+                ui.html(PainelGrid.render_html([(i, dashboards[i].nome, ProxyEmbed.reescrever(dashboards[i].link_embed))
+                                                for i in escolhidos]), sanitize=False).classes('w-full')
+                ui.run_javascript(f'cxAtivarIframesPorVisibilidade({int(SPLIT_VIEW_SUSPEND_SECONDS * 1000)})')
+            else:
+                LayoutComponents.empty_state(
+                    icon='grid_view',
+                    title='Monte seu painel',
+                    description='Escolha os dashboards acima para acompanhá-los lado a lado; o link desta página guarda a seleção.'
+                )
+
+
+@ui.page('/admin/permissoes')
+def page_admin_permissoes():
+    """Matriz dashboards × perfis do cliente do admin; a edição inteira acontece no browser"""
+    admin = obter_admin_logado()
+    if not admin: ui.navigate.to('/'); return
+    TemasClientes.aplicar(admin.cliente_id)
+    MemoriaClientes.associar(admin.cliente_id)
+    ui.add_head_html(f'<script defer src="{URL_PERMISSOES_JS}"></script>')
+
+    with ui.column().classes('w-full min-h-screen').style(f'''
+        background: {DS.SURFACE_50};
+        font-family: {DS.FONT};
+    '''):
+        TopbarNavigation.create(
+            cliente_nome=obter_nome_cliente(admin.cliente_id),
+            user_email=admin.email,
+            current_page='admin',
+            breadcrumb=[
+                {'label': 'Workspaces', 'onClick': lambda: ui.navigate.to('/')},
+                {'label': 'Permissões'}
+            ]
+        )
+
+        with LayoutComponents.page_container().style('padding-top: 112px;'):
+            LayoutComponents.page_header(
+                'Permissões',
+                'Quais perfis abrem cada dashboard. Clique nas células (ou no nome do perfil para a coluna inteira) e salve tudo de uma vez.'
+            )
+            ui.html('<div class="cx-matriz" id="cx-matriz"></div>', sanitize=False).classes('w-full')
+            ui.run_javascript('cxMatrizPermissoes(document.getElementById("cx-matriz"))')
+
+
+@ui.page('/admin/profiler')
+def page_admin_profiler():
+    admin = obter_admin_logado()
+    if not admin: ui.navigate.to('/'); return
+    TemasClientes.aplicar(admin.cliente_id)
+    MemoriaClientes.associar(admin.cliente_id)
+
+    with ui.column().classes('w-full min-h-screen').style(f'''
+        background: {DS.SURFACE_50};
+        font-family: {DS.FONT};
+    '''):
+        TopbarNavigation.create(
+            cliente_nome=obter_nome_cliente(admin.cliente_id),
+            user_email=admin.email,
+            current_page='admin',
+            breadcrumb=[
+                {'label': 'Workspaces', 'onClick': lambda: ui.navigate.to('/')},
+                {'label': 'Profiler'}
+            ]
+        )
+
+        with LayoutComponents.page_container().style('padding-top: 112px;'):
+            LayoutComponents.page_header(
+                'Profiler sob demanda',
+                'Captura os próximos builds de página e event handlers de um usuário ou de todo o cliente (cProfile + flamegraph).'
+            )
+
+            # Armar captura
+            with ui.row().classes('w-full items-end').style(f'gap: {DS.SPACING_LG}; margin-bottom: {DS.SPACING_2XL};'):
+                tipo = ui.select({'email': 'Usuário (email)', 'cliente': 'Todo o cliente'}, value='email').props('outlined dense').classes('w-48')
+                with ui.column().classes('flex-grow'):
+                    valor = UIComponents.input_field('Alvo', placeholder='usuario@cliente.com', icon='person_search')
+                    valor.bind_enabled_from(tipo, 'value', backward=lambda t: t == 'email')
+                quantidade = ui.number('Capturas', value=5, min=1, max=100, precision=0).props('outlined dense').classes('w-32')
+
+                def armar():
+                    if tipo.value == 'cliente':
+                        alvo = str(admin.cliente_id)
+                    else:
+                        alvo = valor.value.strip()
+                        dono = executar_leitura(lambda db: db.query(User.cliente_id).filter(User.email == alvo).scalar())
+                        if dono != admin.cliente_id:
+                            ui.notify('Usuário não encontrado neste cliente.', type='warning')
+                            return
+                    ProfilerSobDemanda.armar(admin.cliente_id, tipo.value, alvo, int(quantidade.value or 1))
+                    lista_armados.refresh()
+
+                UIComponents.primary_button('Armar', on_click=armar, icon='radio_button_checked')
+
+            @ui.refreshable
+            def lista_armados():
+                armados = ProfilerSobDemanda.armados_do_cliente(admin.cliente_id)
+                LayoutComponents.section_header('Capturas armadas', str(len(armados)))
+                for (alvo_tipo, alvo_valor), restantes in armados.items():
+                    with ui.row().classes('w-full items-center justify-between').style(f'''
+                        padding: {DS.SPACING_SM} {DS.SPACING_LG};
+                        background: {DS.SURFACE};
+                        border: 1px solid {DS.BORDER_LIGHT};
+                        border-radius: {DS.RADIUS_MD};
+                    '''):
+                        ui.label(f'{alvo_tipo}: {alvo_valor} · {restantes} restantes').classes('text-sm').style(f'color: {DS.TEXT_PRIMARY};')
+                        UIComponents.ghost_button('Desarmar', icon='close', on_click=lambda t=alvo_tipo, v=alvo_valor: (ProfilerSobDemanda.desarmar(admin.cliente_id, t, v), lista_armados.refresh()))
+
+            @ui.refreshable
+            def lista_capturas():
+                capturas = ProfilerSobDemanda.listar(admin.cliente_id)
+                with ui.row().classes('w-full items-center justify-between').style(f'margin-top: {DS.SPACING_2XL};'):
+                    LayoutComponents.section_header('Capturas salvas', f'{len(capturas)} / {PROFILE_MAX_FILES}')
+                    UIComponents.icon_button('refresh', on_click=lista_capturas.refresh, tooltip='Atualizar')
+                if not capturas:
+                    LayoutComponents.empty_state('speed', 'Nenhuma captura ainda', 'Arme uma captura e peça para o usuário recarregar a página.')
+                for captura in capturas:
+                    with ui.row().classes('w-full items-center justify-between').style(f'''
+                        padding: {DS.SPACING_SM} {DS.SPACING_LG};
+                        background: {DS.SURFACE};
+                        border: 1px solid {DS.BORDER_LIGHT};
+                        border-radius: {DS.RADIUS_MD};
+                    '''):
+                        with ui.column().style('gap: 2px;'):
+                            ui.label(captura['nome']).classes('text-sm').style(f'color: {DS.TEXT_PRIMARY}; font-weight: 500;')
+                            ui.label(f"{captura['criado_em']:%d/%m/%Y %H:%M:%S} · {captura['tamanho'] / 1024:.1f} KB").classes('text-xs').style(f'color: {DS.TEXT_TERTIARY};')
+                        with ui.row().style(f'gap: {DS.SPACING_MD};'):
+                            ui.link('.prof', f"/admin/profiler/arquivos/{captura['nome']}.prof").classes('text-sm')
+                            ui.link('.collapsed', f"/admin/profiler/arquivos/{captura['nome']}.collapsed").classes('text-sm')
+
+            lista_armados()
+            lista_capturas()
+
+
+@app.get('/admin/profiler/arquivos/{arquivo}', include_in_schema=False)
+def baixar_profile(arquivo: str):
+    admin = obter_admin_logado()
+    if admin is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=403)
+    caminho = ProfilerSobDemanda.arquivo(admin.cliente_id, arquivo)
+    if caminho is None:
+        return JSONResponse({'erro': 'não encontrado'}, status_code=404)
+    return FileResponse(caminho, filename=caminho.name)
+
+
+@app.get('/admin/memoria', include_in_schema=False)
+def memoria_clients(atualizar: bool = False):
+    """Clients conectados do cliente do admin (os de outros clientes e os anônimos ficam de fora)"""
+    admin = obter_admin_logado()
+    if admin is None:
+        return JSONResponse({'erro': 'não autorizado'}, status_code=403)
+    clients = sorted((m for m in MemoriaClientes.medir(forcar=atualizar) if m['cliente_id'] == admin.cliente_id),
+                     key=lambda m: m['bytes_estimados'], reverse=True)
+    return JSONResponse({'rotas': MemoriaClientes.por_rota(cliente_id=admin.cliente_id), 'clients': clients})
 
-with ui.column().classes('items-end').style(f'gap: {DS.SPACING_XS};'):
 
-ui.label(cliente_nome.split()[0]).classes('text-sm').style(f'''
+# ============================================================================
+# AGENDADOR DE TAREFAS EM BACKGROUND
+# ============================================================================
 
-color: {DS.TEXT_PRIMARY};
+JOBS_RETRY_BASE = float(os.getenv('CX_JOBS_RETRY_BASE', 1))
+JOBS_RETRY_MAX = float(os.getenv('CX_JOBS_RETRY_MAX', 60))
+JOBS_SHUTDOWN_TIMEOUT = float(os.getenv('CX_JOBS_SHUTDOWN_TIMEOUT', 5))
+
+class Tarefa:
+    """Uma tarefa registrada no Agendador e as estatísticas das suas execuções"""
+    BUCKETS_S = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+    def __init__(self, nome: str, funcao: Callable, intervalo: Optional[float], atraso: float,
+                 bloqueante: bool, concorrencia: int, tentativas: int):
+        self.nome, self.funcao, self.intervalo, self.atraso = nome, funcao, intervalo, atraso
+        self.bloqueante, self.concorrencia, self.tentativas = bloqueante, concorrencia, tentativas
+        self.acordar: Optional[asyncio.Event] = None
+        self.pendente = False
+        self.em_execucao = 0
+        self.sucessos = self.falhas = self.retentativas = self.agrupadas = 0
+        self.ultimo_erro: Optional[str] = None
+        self.buckets = [0] * len(self.BUCKETS_S)
+        self.soma_s = 0.0
+
+    def registrar(self, duracao_s: float):
+        self.soma_s += duracao_s
+        indice = bisect.bisect_left(self.BUCKETS_S, duracao_s)
+        if indice < len(self.buckets):
+            self.buckets[indice] += 1
+
+class Agendador:
+    """
+    Tarefas periódicas e adiadas do app, presas ao ciclo de vida do NiceGUI
+    (começam no startup, param no shutdown esperando as que estão rodando).
+    Tarefa bloqueante roda no pool de threads (run.io_bound); as demais, no loop.
+    Concorrência por tarefa: disparo com a tarefa no limite não enfileira, marca
+    uma nova execução para quando a atual terminar (várias viram uma só).
+    Falhas são retentadas com backoff exponencial e jitter.
+    """
+    tarefas: Dict[str, Tarefa] = {}
+    _lacos: List[asyncio.Task] = []
+    _execucoes: set = set()
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _parando = False
+
+    @classmethod
+    def a_cada(cls, nome: str, intervalo: float, funcao: Callable, *, atraso: float = 0.0, bloqueante: bool = False,
+               concorrencia: int = 1, tentativas: int = 0) -> Tarefa:
+        """Tarefa periódica: a primeira execução após 'atraso', depois a cada 'intervalo' segundos"""
+        tarefa = cls.tarefas[nome] = Tarefa(nome, funcao, intervalo, atraso, bloqueante, concorrencia, tentativas)
+        if cls._loop is not None:
+            cls._iniciar_tarefa(tarefa)
+        return tarefa
+
+    @classmethod
+    def uma_vez(cls, nome: str, funcao: Callable, *, atraso: float = 0.0, bloqueante: bool = False,
+                tentativas: int = 0) -> Tarefa:
+        """Tarefa única, 'atraso' segundos depois do startup (ou de agora, se o app já subiu)"""
+        tarefa = cls.tarefas[nome] = Tarefa(nome, funcao, None, atraso, bloqueante, 1, tentativas)
+        if cls._loop is not None:
+            cls._iniciar_tarefa(tarefa)
+        return tarefa
+
+    @classmethod
+    def disparar(cls, nome: str):
+        """Executa a tarefa já, fora do intervalo. Pode ser chamado de qualquer thread"""
+        tarefa = cls.tarefas[nome]
+        if cls._loop is not None and tarefa.acordar is not None:
+            cls._loop.call_soon_threadsafe(tarefa.acordar.set)
+
+    @classmethod
+    def iniciar(cls):
+        cls._loop = asyncio.get_running_loop()
+        cls._parando = False
+        for tarefa in cls.tarefas.values():
+            cls._iniciar_tarefa(tarefa)
+
+    @classmethod
+    def _iniciar_tarefa(cls, tarefa: Tarefa):
+        tarefa.acordar = asyncio.Event()
+        if tarefa.intervalo is None:
+            cls._loop.call_later(tarefa.atraso, cls._lancar, tarefa)
+        else:
+            cls._lacos.append(background_tasks.create(cls._laco(tarefa), name=f'agendador_{tarefa.nome}'))
+
+    @classmethod
+    async def _laco(cls, tarefa: Tarefa):
+        try:
+            await asyncio.wait_for(tarefa.acordar.wait(), timeout=tarefa.atraso)
+        except asyncio.TimeoutError:
+            pass
+        while not cls._parando:
+            tarefa.acordar.clear()
+            cls._lancar(tarefa)
+            try:
+                await asyncio.wait_for(tarefa.acordar.wait(), timeout=tarefa.intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+    @classmethod
+    def _lancar(cls, tarefa: Tarefa):
+        if cls._parando:
+            return
+        if tarefa.em_execucao >= tarefa.concorrencia:
+            tarefa.pendente = True
+            tarefa.agrupadas += 1
+            return
+        tarefa.em_execucao += 1
+        execucao = cls._loop.create_task(cls._executar(tarefa), name=f'tarefa_{tarefa.nome}')
+        cls._execucoes.add(execucao)
+        execucao.add_done_callback(cls._execucoes.discard)
+
+    @classmethod
+    async def _executar(cls, tarefa: Tarefa):
+        try:
+            for tentativa in range(tarefa.tentativas + 1):
+                inicio = time.perf_counter()
+                erro = None
+                try:
+                    if tarefa.bloqueante:
+                        await run.io_bound(tarefa.funcao)
+                    else:
+                        resultado = tarefa.funcao()
+                        if asyncio.iscoroutine(resultado):
+                            await resultado
+                except Exception as e:
+                    erro = e
+                tarefa.registrar(time.perf_counter() - inicio)
+                if erro is None:
+                    tarefa.sucessos += 1
+                    return
+                tarefa.falhas += 1
+                tarefa.ultimo_erro = f'{type(erro).__name__}: {erro}'
+                if tentativa == tarefa.tentativas or cls._parando:
+                    print(f"AVISO: tarefa '{tarefa.nome}' falhou ({tarefa.ultimo_erro}).")
+                    return
+                tarefa.retentativas += 1
+                await asyncio.sleep(min(JOBS_RETRY_MAX, JOBS_RETRY_BASE * 2 ** tentativa) * random.uniform(0.5, 1.5))
+        finally:
+            tarefa.em_execucao -= 1
+            if tarefa.pendente and not cls._parando:
+                tarefa.pendente = False
+                cls._lancar(tarefa)
+
+    @classmethod
+    async def parar(cls):
+        """Shutdown: nada novo começa; quem está rodando tem JOBS_SHUTDOWN_TIMEOUT para terminar"""
+        cls._parando = True
+        for laco in cls._lacos:
+            laco.cancel()
+        cls._lacos.clear()
+        if cls._execucoes:
+            _, atrasadas = await asyncio.wait(set(cls._execucoes), timeout=JOBS_SHUTDOWN_TIMEOUT)
+            for execucao in atrasadas:
+                execucao.cancel()
+        cls._loop = None
+
+    @classmethod
+    def prometheus(cls) -> str:
+        linhas = ['# TYPE cx_job_runs_total counter']
+        for t in cls.tarefas.values():
+            linhas += [f'cx_job_runs_total{{job="{t.nome}",resultado="ok"}} {t.sucessos}',
+                       f'cx_job_runs_total{{job="{t.nome}",resultado="erro"}} {t.falhas}']
+        linhas.append('# TYPE cx_job_retries_total counter')
+        linhas += [f'cx_job_retries_total{{job="{t.nome}"}} {t.retentativas}' for t in cls.tarefas.values()]
+        linhas.append('# TYPE cx_job_coalesced_total counter')
+        linhas += [f'cx_job_coalesced_total{{job="{t.nome}"}} {t.agrupadas}' for t in cls.tarefas.values()]
+        linhas.append('# TYPE cx_job_running gauge')
+        linhas += [f'cx_job_running{{job="{t.nome}"}} {t.em_execucao}' for t in cls.tarefas.values()]
+        linhas.append('# TYPE cx_job_duration_seconds histogram')
+        for t in cls.tarefas.values():
+            acumulado = 0
+            for limite, n in zip(Tarefa.BUCKETS_S, t.buckets):
+                acumulado += n
+                linhas.append(f'cx_job_duration_seconds_bucket{{job="{t.nome}",le="{limite}"}} {acumulado}')
+            total = t.sucessos + t.falhas
+            linhas += [f'cx_job_duration_seconds_bucket{{job="{t.nome}",le="+Inf"}} {total}',
+                       f'cx_job_duration_seconds_sum{{job="{t.nome}"}} {t.soma_s:.6f}',
+                       f'cx_job_duration_seconds_count{{job="{t.nome}"}} {total}']
+        return '\n'.join(linhas) + '\n'
+
+app.on_startup(Agendador.iniciar)
+app.on_shutdown(Agendador.parar)
 
-font-weight: 600;
 
-line-height: 1;
+# ============================================================================
+# EMBEDS - SONDA DE DISPONIBILIDADE
+# ============================================================================
 
-''')
+EMBED_PROBE_INTERVAL = float(os.getenv('CX_EMBED_PROBE_INTERVAL', 300))  # 0 desliga
+EMBED_PROBE_CONCURRENCY = int(os.getenv('CX_EMBED_PROBE_CONCURRENCY', 10))
+EMBED_PROBE_TIMEOUT = float(os.getenv('CX_EMBED_PROBE_TIMEOUT', 10))
+EMBED_PROBE_SLOW_MS = float(os.getenv('CX_EMBED_PROBE_SLOW_MS', 3000))
+
+class SondaEmbeds:
+    """
+    Checa em background cada link_embed distinto (GET sem ler o corpo, com
+    concorrência limitada) e guarda estado + horário por URL. A home não espera
+    nada disso: pega o CSS de status já montado para o cliente, que liga o selo
+    dos cards 'lento' / 'fora do ar' pelas variáveis --cx-embed-status* (a regra
+    fica no CSS global, o fragmento do grid não muda).
+    """
+    ROTULOS = {'lento': ('Lento', '#b45309', '#fef3c7'), 'fora': ('Fora do ar', '#b91c1c', '#fee2e2')}
+    resultados: Dict[str, Tuple[str, float, Optional[int], float]] = {}  # url -> (estado, verificado_em, http, latência ms)
+    css_por_cliente: Dict[int, str] = {}
+    duracao_s = 0.0
+
+    @staticmethod
+    def _carregar_links() -> List[Tuple[int, int, str]]:
+        return executar_leitura(lambda db: db.query(Dashboard.id, Dashboard.cliente_id, Dashboard.link_embed).all())
+
+    @staticmethod
+    async def _checar(http: httpx.AsyncClient, url: str) -> Tuple[str, float, Optional[int], float]:
+        inicio = time.perf_counter()
+        try:
+            async with http.stream('GET', url) as resposta:
+                codigo = resposta.status_code
+        except Exception:  # timeout, DNS, conexão recusada, URL inválida
+            return 'fora', time.time(), None, (time.perf_counter() - inicio) * 1000
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        # 401/403 contam como no ar: o servidor respondeu, quem autentica é o iframe
+        if codigo >= 500 or codigo in (404, 410):
+            estado = 'fora'
+        elif latencia_ms > EMBED_PROBE_SLOW_MS:
+            estado = 'lento'
+        else:
+            estado = 'ok'
+        return estado, time.time(), codigo, latencia_ms
+
+    @classmethod
+    def _montar_css(cls, links: List[Tuple[int, int, str]]) -> Dict[int, str]:
+        marcados: Dict[int, Dict[str, List[Tuple[int, float]]]] = {}
+        for dash_id, cliente_id, url in links:
+            resultado = cls.resultados.get(url)
+            if resultado is not None and resultado[0] in cls.ROTULOS:
+                marcados.setdefault(cliente_id, {}).setdefault(resultado[0], []).append((dash_id, resultado[1]))
+        css = {}
+        for cliente_id, por_estado in marcados.items():
+            regras = []
+            for estado, dashboards in por_estado.items():
+                texto, cor, fundo = cls.ROTULOS[estado]
+                hora = datetime.fromtimestamp(max(verificado for _, verificado in dashboards)).strftime('%H:%M')
+                seletores = ','.join(f'[data-dash-id="{dash_id}"]' for dash_id, _ in dashboards)
+                regras.append(f'{seletores}{{--cx-embed-status:"{texto} · {hora}";--cx-embed-status-cor:{cor};'
+                              f'--cx-embed-status-fundo:{fundo};--cx-embed-status-display:block}}')
+            css[cliente_id] = ''.join(regras)
+        return css
+
+    @classmethod
+    async def sondar(cls):
+        inicio = time.perf_counter()
+        links = await run.io_bound(cls._carregar_links) or []
+        urls = {url for _, _, url in links}
+        semaforo = asyncio.Semaphore(EMBED_PROBE_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=EMBED_PROBE_TIMEOUT, follow_redirects=True) as http:
+            async def checar(url: str):
+                async with semaforo:
+                    cls.resultados[url] = await cls._checar(http, url)
+            await asyncio.gather(*(checar(url) for url in urls))
+        for url in set(cls.resultados) - urls:
+            del cls.resultados[url]
+        cls.css_por_cliente = cls._montar_css(links)
+        cls.duracao_s = time.perf_counter() - inicio
+
+    @classmethod
+    def prometheus(cls) -> str:
+        por_estado = Counter(resultado[0] for resultado in cls.resultados.values())
+        linhas = ['# TYPE cx_embed_probe_urls gauge']
+        linhas += [f'cx_embed_probe_urls{{estado="{estado}"}} {por_estado[estado]}' for estado in ('ok', 'lento', 'fora')]
+        linhas += ['# TYPE cx_embed_probe_duration_seconds gauge', f'cx_embed_probe_duration_seconds {cls.duracao_s:.6f}']
+        return '\n'.join(linhas) + '\n'
+
+if EMBED_PROBE_INTERVAL > 0:
+    Agendador.a_cada('sonda_embeds', EMBED_PROBE_INTERVAL, SondaEmbeds.sondar)
 
-ui.label(user_email).classes('text-xs').style(f'''
 
-color: {DS.TEXT_TERTIARY};
+# ============================================================================
+# HEALTH CHECKS - LIVENESS & READINESS
+# ============================================================================
 
-line-height: 1;
+HEALTH_CHECK_INTERVAL = float(os.getenv('CX_HEALTH_CHECK_INTERVAL', 5))
+
+class SaudeBanco:
+    """
+    Resultado do último ping ao banco, atualizado por uma task em background.
+    Os probes só leem este estado: nunca constroem UI nem abrem conexão.
+    """
+    ok: bool = False
+    verificado_em: Optional[float] = None
+    latencia_ms: Optional[float] = None
+    erro: Optional[str] = None
+
+    @classmethod
+    def verificar(cls):
+        inicio = time.perf_counter()
+        try:
+            with engine_leitura.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            cls.ok, cls.erro = True, None
+        except Exception as e:
+            cls.ok, cls.erro = False, f'{type(e).__name__}: {e}'
+        cls.latencia_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        cls.verificado_em = time.time()
+
+    @classmethod
+    def pronto(cls) -> bool:
+        # Resultado velho demais (pinger travado) também conta como indisponível
+        return (cls.ok and cls.verificado_em is not None
+                and time.time() - cls.verificado_em < 3 * HEALTH_CHECK_INTERVAL)
+
+def _pingar_banco():
+    SaudeBanco.verificar()
+    RoteadorLeitura.verificar_replicas()
+
+Agendador.a_cada('pinger_banco', HEALTH_CHECK_INTERVAL, _pingar_banco, bloqueante=True)
+
+@app.get('/healthz', include_in_schema=False)
+def healthz():
+    return JSONResponse({'status': 'ok'})
+
+@app.get('/readyz', include_in_schema=False)
+def readyz():
+    pronto = SaudeBanco.pronto()
+    return JSONResponse({
+        'status': 'ready' if pronto else 'unavailable',
+        'db': {
+            'ok': SaudeBanco.ok,
+            'verificado_em': SaudeBanco.verificado_em,
+            'latencia_ms': SaudeBanco.latencia_ms,
+            'erro': SaudeBanco.erro,
+        },
+        'replicas': [
+            {'saudavel': r.saudavel, 'lag': r.lag, 'erro': r.erro}
+            for r in RoteadorLeitura.replicas
+        ],
+    }, status_code=200 if pronto else 503)
 
-''')
 
+# ============================================================================
+# EVENT LOOP - MONITOR DE LAG & LOAD SHEDDING
+# ============================================================================
 
-# Avatar
+LOOP_LAG_INTERVAL = float(os.getenv('CX_LOOP_LAG_INTERVAL', 0.1))
+LOOP_LAG_DEFER_MS = float(os.getenv('CX_LOOP_LAG_DEFER_MS', 100))    # acima disso: adia trabalho de baixa prioridade
+LOOP_LAG_REJECT_MS = float(os.getenv('CX_LOOP_LAG_REJECT_MS', 250))  # acima disso: 503 para páginas sem login
+LOOP_LAG_RETRY_AFTER = int(os.getenv('CX_LOOP_LAG_RETRY_AFTER', 5))
+
+class MonitorLagLoop:
+    """
+    Todos os clients NiceGUI dividem um único event loop. Uma task dorme
+    LOOP_LAG_INTERVAL e mede o atraso ao acordar; o atraso vira histograma
+    (exportado em /metrics) e alimenta o load shedding. O nível usado nas
+    decisões sobe na hora com um pico e desce devagar (média móvel).
+    """
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    contagens: List[int] = [0] * (len(BUCKETS_MS) + 1)
+    soma_ms: float = 0.0
+    total: int = 0
+    nivel_ms: float = 0.0
+    maximo_ms: float = 0.0
+    rejeitados: int = 0
+    adiados: int = 0
+
+    @classmethod
+    def registrar(cls, lag_ms: float):
+        cls.contagens[bisect.bisect_left(cls.BUCKETS_MS, lag_ms)] += 1
+        cls.soma_ms += lag_ms
+        cls.total += 1
+        cls.maximo_ms = max(cls.maximo_ms, lag_ms)
+        cls.nivel_ms = lag_ms if lag_ms > cls.nivel_ms else 0.8 * cls.nivel_ms + 0.2 * lag_ms
+
+    @classmethod
+    def deve_adiar(cls) -> bool:
+        return cls.nivel_ms >= LOOP_LAG_DEFER_MS
+
+    @classmethod
+    def deve_rejeitar(cls) -> bool:
+        return cls.nivel_ms >= LOOP_LAG_REJECT_MS
+
+    @classmethod
+    def prometheus(cls) -> str:
+        linhas = [
+            '# HELP cx_event_loop_lag_seconds Atraso do event loop ao acordar de um sleep.',
+            '# TYPE cx_event_loop_lag_seconds histogram',
+        ]
+        acumulado = 0
+        for limite, n in zip(cls.BUCKETS_MS + (None,), cls.contagens):
+            acumulado += n
+            le = '+Inf' if limite is None else f'{limite / 1000:g}'
+            linhas.append(f'cx_event_loop_lag_seconds_bucket{{le="{le}"}} {acumulado}')
+        linhas += [
+            f'cx_event_loop_lag_seconds_sum {cls.soma_ms / 1000:.6f}',
+            f'cx_event_loop_lag_seconds_count {cls.total}',
+            '# TYPE cx_event_loop_lag_level_seconds gauge',
+            f'cx_event_loop_lag_level_seconds {cls.nivel_ms / 1000:.6f}',
+            '# TYPE cx_load_shed_rejected_total counter',
+            f'cx_load_shed_rejected_total {cls.rejeitados}',
+            '# TYPE cx_load_shed_deferred_total counter',
+            f'cx_load_shed_deferred_total {cls.adiados}',
+        ]
+        return '\n'.join(linhas) + '\n'
+
+async def _monitor_lag_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        MonitorLagLoop.registrar(max(0.0, loop.time() - inicio - LOOP_LAG_INTERVAL) * 1000)
+
+# Fora do Agendador de propósito: mede o atraso do próprio loop, sem nada no meio
+app.on_startup(lambda: background_tasks.create(_monitor_lag_loop(), name='monitor_lag_loop'))
+
+def pagina_aguarde(titulo: str, retry_after: int) -> str:
+    """Página estática mínima (sem NiceGUI) que se recarrega sozinha; usada nas respostas 503/429"""
+    return f'''<!doctype html>
+<html lang="pt-BR"><head><meta charset="utf-8">
+<meta http-equiv="refresh" content="{retry_after}">
+<title>CX Data</title></head>
+<body style='margin:0;height:100vh;display:flex;align-items:center;justify-content:center;background:{DS.SURFACE_50};font-family:{TEMA_PADRAO['font']};'>
+<div style="text-align:center;color:{DS.TEXT_SECONDARY};font-size:14px;">
+<div style="color:{DS.TEXT_PRIMARY};font-size:18px;font-weight:600;margin-bottom:8px;">{titulo}</div>
+Tentando novamente em {retry_after} segundos…
+</div></body></html>'''
+
+PAGINA_SOBRECARGA = pagina_aguarde('Plataforma com alta demanda', LOOP_LAG_RETRY_AFTER)
+
+def resposta_sobrecarga() -> Optional[HTMLResponse]:
+    """503 leve (sem construir UI) para páginas de visitantes sem login enquanto o loop está atrasado"""
+    if not MonitorLagLoop.deve_rejeitar():
+        return None
+    MonitorLagLoop.rejeitados += 1
+    return HTMLResponse(PAGINA_SOBRECARGA, status_code=503, headers={'Retry-After': str(LOOP_LAG_RETRY_AFTER)})
+
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    return PlainTextResponse(MonitorLagLoop.prometheus() + AdmissaoClientes.prometheus() + MemoriaClientes.prometheus()
+                             + SessoesUsuario.prometheus() + ProxyEmbed.prometheus() + Agendador.prometheus()
+                             + SondaEmbeds.prometheus() + FilaEscritaSQLite.prometheus(),
+                             media_type='text/plain; version=0.0.4')
 
-iniciais = ''.join([palavra[0].upper() for palavra in cliente_nome.split()[:2]])
 
-with ui.column().classes('items-center justify-center').style(f'''
+# ============================================================================
+# ADMISSÃO POR CLIENTE - LIMITES DE BUILDS & FILA JUSTA
+# ============================================================================
 
-width: 36px;
+# Ligada por padrão (CX_TENANT_ADMISSION=0 desliga). Os padrões cobrem o pico de
+# login da manhã de um cliente grande: algumas centenas de usuários no mesmo minuto,
+# cada um abrindo home + dashboard. A rajada absorve a primeira leva, a taxa segura
+# uns 900 builds/min e a fila espera o resto; 429 só com o cliente acima disso.
+TENANT_ADMISSION = os.getenv('CX_TENANT_ADMISSION', '1') == '1'
+TENANT_PAGE_RATE = float(os.getenv('CX_TENANT_PAGE_RATE', 900)) / 60  # builds/min por cliente (vira tokens/s)
+TENANT_PAGE_BURST = float(os.getenv('CX_TENANT_PAGE_BURST', 300))
+TENANT_QUEUE_MAX = int(os.getenv('CX_TENANT_QUEUE_MAX', 300))
+TENANT_QUEUE_TIMEOUT = float(os.getenv('CX_TENANT_QUEUE_TIMEOUT', 10))
+
+class AdmissaoClientes:
+    """
+    Controle de admissão dos builds de página por cliente_id: token bucket
+    (taxa + rajada). Quem passa do orçamento espera na fila do próprio cliente;
+    as filas são atendidas em round-robin entre clientes, então um cliente
+    barulhento (ex.: parede de TVs recarregando) só atrasa a si mesmo.
+    Fila cheia ou espera acima de TENANT_QUEUE_TIMEOUT viram 429.
+    Não há limite de builds simultâneos: depois de admitido o build roda
+    inteiro sem await, então o loop já os serializa; só a taxa é controlada.
+    """
+    _baldes: Dict[int, List[float]] = {}  # cliente_id -> [tokens, atualizado_em]
+    _filas: 'OrderedDict[int, deque]' = OrderedDict()  # só clientes com alguém esperando
+    _despacho_agendado: Optional[asyncio.TimerHandle] = None
+    admitidos: Counter = Counter()
+    enfileirados: Counter = Counter()
+    rejeitados: Counter = Counter()
+
+    @classmethod
+    def _tokens(cls, cliente_id: int) -> float:
+        agora = time.monotonic()
+        balde = cls._baldes.setdefault(cliente_id, [TENANT_PAGE_BURST, agora])
+        balde[0] = min(TENANT_PAGE_BURST, balde[0] + (agora - balde[1]) * TENANT_PAGE_RATE)
+        balde[1] = agora
+        return balde[0]
+
+    @classmethod
+    def _pode_entrar(cls, cliente_id: int) -> bool:
+        return cls._tokens(cliente_id) >= 1
+
+    @classmethod
+    def _ocupar(cls, cliente_id: int):
+        cls._baldes[cliente_id][0] -= 1
+        cls.admitidos[cliente_id] += 1
+
+    @classmethod
+    def _despachar(cls):
+        if cls._despacho_agendado is not None:
+            cls._despacho_agendado.cancel()
+            cls._despacho_agendado = None
+        atendeu = True
+        while cls._filas and atendeu:
+            atendeu = False
+            for cliente_id in list(cls._filas):
+                fila = cls._filas[cliente_id]
+                while fila and fila[0].done():  # desistiu (timeout)
+                    fila.popleft()
+                if fila and cls._pode_entrar(cliente_id):
+                    cls._ocupar(cliente_id)
+                    fila.popleft().set_result(True)
+                    atendeu = True
+                if not fila:
+                    del cls._filas[cliente_id]
+                else:
+                    cls._filas.move_to_end(cliente_id)
+        if cls._filas:
+            # Ninguém mais cabe agora: tenta de novo quando o próximo token ficar pronto
+            espera = min(max(0.0, (1 - cls._tokens(c)) / TENANT_PAGE_RATE) for c in cls._filas)
+            cls._despacho_agendado = asyncio.get_running_loop().call_later(max(espera, 0.01), cls._despachar)
+
+    @classmethod
+    async def admitir(cls, cliente_id: int) -> bool:
+        """Espera a vez do cliente; False = estrangulado (responder 429)"""
+        if not TENANT_ADMISSION:
+            return True
+        if cliente_id not in cls._filas and cls._pode_entrar(cliente_id):
+            cls._ocupar(cliente_id)
+            return True
+        fila = cls._filas.setdefault(cliente_id, deque())
+        if len(fila) >= TENANT_QUEUE_MAX:
+            cls.rejeitados[cliente_id] += 1
+            return False
+        vez = asyncio.get_running_loop().create_future()
+        fila.append(vez)
+        cls.enfileirados[cliente_id] += 1
+        if cls._despacho_agendado is None:
+            cls._despachar()
+        try:
+            await asyncio.wait({vez}, timeout=TENANT_QUEUE_TIMEOUT)
+        except asyncio.CancelledError:
+            vez.cancel()  # client foi embora na fila: _despachar pula a vez cancelada
+            raise
+        if vez.done():
+            return True
+        vez.cancel()
+        cls.rejeitados[cliente_id] += 1
+        return False
+
+    @classmethod
+    def prometheus(cls) -> str:
+        linhas = []
+        for metrica, contador in (('admitted', cls.admitidos), ('queued', cls.enfileirados), ('throttled', cls.rejeitados)):
+            linhas.append(f'# TYPE cx_tenant_page_builds_{metrica}_total counter')
+            linhas += [f'cx_tenant_page_builds_{metrica}_total{{cliente_id="{c}"}} {n}' for c, n in sorted(contador.items())]
+        return '\n'.join(linhas) + '\n'
+
+def resposta_limite_cliente() -> HTMLResponse:
+    retry_after = max(1, round(1 / TENANT_PAGE_RATE))
+    return HTMLResponse(pagina_aguarde('Muitas aberturas de página em sequência', retry_after),
+                        status_code=429, headers={'Retry-After': str(retry_after)})
 
-height: 36px;
 
-background: linear-gradient(135deg, {DS.PRIMARY_LIGHT} 0%, {DS.PRIMARY_ULTRA_LIGHT} 100%);
+# ============================================================================
+# SINCRONIZAÇÃO DE VERSÕES ENTRE PROCESSOS & WARMUP
+# ============================================================================
 
-border: 1.5px solid {DS.BORDER};
+VERSION_POLL_INTERVAL = float(os.getenv('CX_VERSION_POLL_INTERVAL', 2))
+# Com LISTEN/NOTIFY o polling vira só rede de segurança
+VERSION_POLL_INTERVAL_PG = float(os.getenv('CX_VERSION_POLL_INTERVAL_PG', 30))
+WARMUP_LIMIT = int(os.getenv('CX_WARMUP_LIMIT', 50))
+
+def sincronizar_versoes() -> int:
+    """
+    Lê o carimbo global (uma linha). Só quando ele se move busca os clientes
+    alterados desde a última leitura. Retorna quantos clientes mudaram.
+    Escrita de outro processo conta como escrita local para o RoteadorLeitura:
+    os caches reconstruídos sob a versão nova leem do primário, não de uma
+    réplica que talvez ainda não tenha a escrita.
+    """
+    with engine_leitura.connect() as conn:
+        marca = conn.execute(select(VersaoCliente.versao).where(VersaoCliente.cliente_id == 0)).scalar() or 0
+        if marca == VersaoDados._marca_global:
+            return 0
+        # Marca menor que a conhecida = banco recriado/restaurado: relê tudo
+        desde = VersaoDados._marca_global if marca > VersaoDados._marca_global else -1
+        linhas = conn.execute(
+            select(VersaoCliente.cliente_id, VersaoCliente.versao)
+            .where(VersaoCliente.marca_global > desde, VersaoCliente.cliente_id != 0)
+        ).all()
+    if any(VersaoDados._clientes.get(cliente_id) != versao for cliente_id, versao in linhas):
+        RoteadorLeitura.registrar_escrita()
+    for cliente_id, versao in linhas:
+        VersaoDados.definir(cliente_id, versao)
+    VersaoDados._marca_global = marca
+    return len(linhas)
+
+def aquecer_caches() -> int:
+    """Pré-carrega nome, permissões e grid dos pares (cliente, perfil) com mais usuários"""
+    pares = executar_leitura(lambda db: db.query(User.cliente_id, User.perfil)
+                             .group_by(User.cliente_id, User.perfil)
+                             .order_by(func.count(User.id).desc())
+                             .limit(WARMUP_LIMIT).all())
+    for cliente_id, perfil in pares:
+        obter_nome_cliente(cliente_id)
+        obter_ids_autorizados(cliente_id, perfil)
+        obter_grid_workspaces(cliente_id, perfil)
+        TemasClientes.obter(cliente_id)
+    return len(pares)
+
+def _escutar_notificacoes_pg(acordar: Callable[[], None]):
+    """Thread dedicada com LISTEN cx_versoes; reconecta sozinha se a conexão cair"""
+    while True:
+        raw = None
+        try:
+            raw = engine.raw_connection()
+            raw.detach()  # conexão em LISTEN não volta para o pool
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute('LISTEN cx_versoes')
+            acordar()  # pode ter perdido notificações enquanto reconectava
+            while True:
+                if select_io.select([conn], [], [], 60) != ([], [], []):
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        acordar()
+        except Exception as e:
+            print(f"AVISO: LISTEN cx_versoes falhou ({e}); tentando novamente em 5s.")
+            if raw is not None:
+                try:
+                    raw.close()  # desanexada do pool: fecha a conexão do driver
+                except Exception:
+                    pass
+            time.sleep(5)
+
+def _sincronizar_e_aquecer():
+    sincronizar_versoes()
+    aquecer_caches()
+
+# Com Postgres o LISTEN acorda a sincronização na hora; o intervalo vira rede de segurança
+_INTERVALO_SINCRONIZACAO = VERSION_POLL_INTERVAL_PG if engine.dialect.name == 'postgresql' else VERSION_POLL_INTERVAL
+Agendador.uma_vez('aquecer_caches', _sincronizar_e_aquecer, bloqueante=True)
+Agendador.a_cada('sincronizar_versoes', _INTERVALO_SINCRONIZACAO, sincronizar_versoes, atraso=_INTERVALO_SINCRONIZACAO,
+                 bloqueante=True, tentativas=2)
+if engine.dialect.name == 'postgresql':
+    app.on_startup(lambda: threading.Thread(target=_escutar_notificacoes_pg,
+                                            args=(lambda: Agendador.disparar('sincronizar_versoes'),),
+                                            name='cx-listen-versoes', daemon=True).start())
 
-border-radius: {DS.RADIUS_FULL};
 
-color: {DS.PRIMARY};
+# ============================================================================
+# SESSÕES - EXPIRAÇÃO POR INATIVIDADE & LIMPEZA
+# ============================================================================
 
-font-size: 12px;
+SESSION_IDLE_TTL = float(os.getenv('CX_SESSION_IDLE_TTL', 14 * 24 * 3600))
+SESSION_SWEEP_INTERVAL = float(os.getenv('CX_SESSION_SWEEP_INTERVAL', 3600))
+SESSION_SWEEP_BATCH = int(os.getenv('CX_SESSION_SWEEP_BATCH', 500))
+
+class SessoesUsuario:
+    """
+    Apaga os arquivos de app.storage.user sem acesso há SESSION_IDLE_TTL ('visto_em'
+    do AppState; sessões antigas sem ele usam o mtime do arquivo). A varredura lê
+    os arquivos em lotes numa thread e só apaga, já no loop, sessões que não estão
+    carregadas em memória — nada de disputa com uma requisição chegando.
+    Antes disso tira da memória as sessões vencidas (ou vazias, de visitante) sem
+    requisição em curso nem client conectado; o arquivo delas sai na mesma passada.
+    Depende do Storage interno do NiceGUI (_users, _active_request_sessions), por
+    isso a versão está fixada no requirements.txt; sem esses atributos não varre.
+    """
+    PREFIXO, SUFIXO = 'storage-user-', '.json'
+    vivas = 0
+    recuperadas = 0
+    bytes_recuperados = 0
+    descarregadas = 0
+    duracao_s = 0.0
+    _aviso_dado = False
+
+    @staticmethod
+    def _visto_em(arquivo: Path, mtime: float) -> float:
+        try:
+            return float(json.loads(arquivo.read_text(encoding='utf-8')).get('visto_em', mtime))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return mtime
+
+    @classmethod
+    def _expirados(cls, arquivos: List[Path], limite: float) -> List[Tuple[str, Path, int]]:
+        """(sessão, arquivo, bytes) dos arquivos do lote sem acesso desde 'limite'"""
+        expirados = []
+        for arquivo in arquivos:
+            try:
+                info = arquivo.stat()
+            except FileNotFoundError:
+                continue
+            # Gravar 'visto_em' atualiza o mtime: arquivo modificado depois do limite nem precisa ser lido
+            if info.st_mtime >= limite or cls._visto_em(arquivo, info.st_mtime) >= limite:
+                continue
+            expirados.append((arquivo.name[len(cls.PREFIXO):-len(cls.SUFIXO)], arquivo, info.st_size))
+        return expirados
+
+    @staticmethod
+    def _descarregar(carregadas: dict, em_uso: dict, limite: float) -> int:
+        """Tira de memória as sessões vencidas que ninguém está usando; retorna quantas"""
+        conectadas = {c.request.scope.get('session', {}).get('id') for c in Client.instances.values() if c.request}
+        descarregadas = 0
+        for sessao, dados in list(carregadas.items()):
+            if sessao in em_uso or sessao in conectadas:
+                continue
+            if not dados or dados.get('visto_em', 0) < limite:
+                del carregadas[sessao]
+                descarregadas += 1
+        return descarregadas
+
+    @classmethod
+    async def varrer(cls) -> int:
+        storage = core.app.storage
+        if storage.redis_url:
+            return 0  # no Redis a expiração fica com o próprio Redis
+        carregadas = getattr(storage, '_users', None)
+        em_uso = getattr(storage, '_active_request_sessions', None)
+        if carregadas is None or em_uso is None:
+            if not cls._aviso_dado:
+                print("AVISO: app.storage do NiceGUI mudou (sem _users/_active_request_sessions); "
+                      "varredura de sessões desligada.")
+                cls._aviso_dado = True
+            return 0
+        inicio = time.perf_counter()
+        limite = time.time() - SESSION_IDLE_TTL
+        cls.descarregadas += cls._descarregar(carregadas, em_uso, limite)
+        arquivos = sorted(storage.path.glob(f'{cls.PREFIXO}*{cls.SUFIXO}'))
+        removidas = 0
+        for i in range(0, len(arquivos), SESSION_SWEEP_BATCH):
+            for sessao, arquivo, tamanho in await run.io_bound(cls._expirados, arquivos[i:i + SESSION_SWEEP_BATCH], limite):
+                # Sem await entre a checagem e o unlink: a sessão não pode ser carregada no meio
+                if sessao in carregadas or sessao in em_uso:
+                    continue
+                arquivo.unlink(missing_ok=True)
+                removidas += 1
+                cls.bytes_recuperados += tamanho
+        cls.recuperadas += removidas
+        cls.vivas = len(arquivos) - removidas
+        cls.duracao_s = time.perf_counter() - inicio
+        return removidas
+
+    @classmethod
+    def prometheus(cls) -> str:
+        return '\n'.join([
+            '# TYPE cx_sessions_live gauge',
+            f'cx_sessions_live {cls.vivas}',
+            '# TYPE cx_sessions_reclaimed_total counter',
+            f'cx_sessions_reclaimed_total {cls.recuperadas}',
+            '# TYPE cx_sessions_reclaimed_bytes_total counter',
+            f'cx_sessions_reclaimed_bytes_total {cls.bytes_recuperados}',
+            '# TYPE cx_sessions_unloaded_total counter',
+            f'cx_sessions_unloaded_total {cls.descarregadas}',
+            '# TYPE cx_session_sweep_duration_seconds gauge',
+            f'cx_session_sweep_duration_seconds {cls.duracao_s:.6f}',
+        ]) + '\n'
+
+Agendador.a_cada('varredor_sessoes', SESSION_SWEEP_INTERVAL, SessoesUsuario.varrer)
 
-font-weight: 700;
 
-'''):
+# ============================================================================
+# INITIALIZATION
+# ============================================================================
 
-ui.label(iniciais)
+Base.metadata.create_all(bind=engine)
 
+def _adicionar_colunas_novas():
+    """create_all não altera tabela existente: colunas novas em tabelas antigas entram aqui (idempotente)"""
+    if 'pasta_id' not in {c['name'] for c in inspecionar(engine).get_columns('dashboards')}:
+        with engine.begin() as conn:
+            conn.execute(text('ALTER TABLE dashboards ADD COLUMN pasta_id INTEGER REFERENCES pastas_dashboards(id)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_dashboards_pasta_id ON dashboards (pasta_id)'))
+
+_adicionar_colunas_novas()
+
+def _minificar_css(css: str) -> str:
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+# Estilos globais + keyframes: um arquivo estático, minificado, com hash no nome e
+# gzip pré-calculado. O head de cada página leva só o <link>; visita repetida não baixa nada.
+ESTILOS_GLOBAIS_CSS = _minificar_css(f'''
+        /* Tokens de marca (o CSS do tema do cliente sobrescreve) */
+        :root {{
+            {''.join(f'--cx-{nome}: {valor}; ' for nome, valor in TEMA_PADRAO.items())}
+        }}
+
+        /* Global Reset */
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+
+        /* Body */
+        body {{
+            font-family: {DS.FONT};
+            background: {DS.SURFACE_50};
+            -webkit-font-smoothing: antialiased;
+            -moz-osx-font-smoothing: grayscale;
+        }}
+
+        /* Scrollbar */
+        ::-webkit-scrollbar {{
+            width: 8px;
+            height: 8px;
+        }}
+        ::-webkit-scrollbar-track {{
+            background: transparent;
+        }}
+        ::-webkit-scrollbar-thumb {{
+            background: {DS.BORDER};
+            border-radius: {DS.RADIUS_SM};
+        }}
+        ::-webkit-scrollbar-thumb:hover {{
+            background: {DS.BORDER_HOVER};
+        }}
+
+        /* Workspace Cards (hover no browser, sem round-trip) */
+        .cx-workspace-card:hover {{
+            border-color: {DS.BORDER_HOVER} !important;
+            transform: translateY(-2px);
+            box-shadow: {DS.SHADOW_MD} !important;
+        }}
+
+        /* Card do workspace (WorkspaceGrid.card): o HTML de cada card leva só os dados */
+        .cx-workspace-card {{
+            position: relative;
+            background: {DS.SURFACE_ELEVATED};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_LG};
+            overflow: hidden;
+            transition: all {DS.TRANSITION_BASE};
+            box-shadow: {DS.SHADOW_SM};
+            animation: fadeInUp 0.4s cubic-bezier(0.4, 0, 0.2, 1) forwards;
+            opacity: 0;
+            text-decoration: none;
+        }}
+        .cx-workspace-topo {{
+            padding: {DS.SPACING_XL};
+        }}
+        .cx-workspace-icone {{
+            width: 44px;
+            height: 44px;
+            background: {DS.PRIMARY_ULTRA_LIGHT};
+            border: 1px solid {DS.BORDER_LIGHT};
+            border-radius: {DS.RADIUS_MD};
+        }}
+        .cx-workspace-corpo {{
+            gap: {DS.SPACING_SM};
+            padding: 0 {DS.SPACING_XL} {DS.SPACING_XL} {DS.SPACING_XL};
+        }}
+        .cx-workspace-nome {{
+            color: {DS.TEXT_PRIMARY};
+            font-weight: 600;
+            line-height: 1.4;
+            letter-spacing: -0.01em;
+        }}
+        .cx-workspace-tipo {{
+            color: {DS.TEXT_TERTIARY};
+            font-weight: 500;
+        }}
+        .cx-workspace-rodape {{
+            padding: {DS.SPACING_MD} {DS.SPACING_XL};
+            background: {DS.SURFACE_50};
+            border-top: 1px solid {DS.BORDER_LIGHT};
+            color: {DS.PRIMARY};
+            font-weight: 600;
+        }}
+        .cx-workspace-icone .q-icon {{
+            font-size: 22px;
+            color: {DS.PRIMARY};
+        }}
+        .cx-workspace-topo > .q-icon {{
+            font-size: 20px;
+            color: {DS.TEXT_DISABLED};
+        }}
+        .cx-workspace-rodape .q-icon {{
+            font-size: 16px;
+        }}
+
+        /* Selo de status do embed: as variáveis vêm do CSS de status do cliente (SondaEmbeds) */
+        .cx-workspace-card::after {{
+            content: var(--cx-embed-status, '');
+            display: var(--cx-embed-status-display, none);
+            position: absolute;
+            top: {DS.SPACING_XL};
+            right: 56px;
+            padding: 2px 10px;
+            border-radius: {DS.RADIUS_FULL};
+            font-size: 11px;
+            font-weight: 600;
+            color: var(--cx-embed-status-cor);
+            background: var(--cx-embed-status-fundo);
+        }}
+
+        /* Pastas na home (PastasGrid) */
+        .cx-pastas-lista {{
+            display: flex;
+            flex-direction: column;
+            gap: {DS.SPACING_SM};
+            margin-bottom: {DS.SPACING_XL};
+        }}
+        .cx-pasta {{
+            background: {DS.SURFACE_ELEVATED};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_LG};
+            box-shadow: {DS.SHADOW_SM};
+        }}
+        .cx-pasta-titulo {{
+            display: flex;
+            align-items: center;
+            gap: {DS.SPACING_MD};
+            padding: {DS.SPACING_MD} {DS.SPACING_LG};
+            list-style: none;
+            cursor: pointer;
+            color: {DS.TEXT_PRIMARY};
+            font-size: 14px;
+            font-weight: 600;
+        }}
+        .cx-pasta-titulo::-webkit-details-marker {{
+            display: none;
+        }}
+        .cx-pasta[open] > .cx-pasta-titulo {{
+            border-bottom: 1px solid {DS.BORDER_LIGHT};
+        }}
+        .cx-pasta-total {{
+            margin-left: auto;
+            padding: 2px 10px;
+            border-radius: {DS.RADIUS_FULL};
+            background: {DS.SURFACE_100};
+            color: {DS.TEXT_TERTIARY};
+            font-size: 12px;
+            font-weight: 500;
+        }}
+        .cx-pasta-conteudo {{
+            padding: {DS.SPACING_LG};
+        }}
+        .cx-pasta-aviso {{
+            color: {DS.TEXT_TERTIARY};
+            font-size: 13px;
+        }}
+
+        /* Matriz de permissões (/admin/permissoes) */
+        .cx-matriz-barra {{
+            display: flex;
+            flex-wrap: wrap;
+            align-items: center;
+            gap: {DS.SPACING_MD};
+            margin-bottom: {DS.SPACING_LG};
+        }}
+        .cx-matriz-barra input {{
+            padding: 6px {DS.SPACING_MD};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_MD};
+            font: inherit;
+            font-size: 13px;
+            outline: none;
+        }}
+        .cx-matriz-barra input:focus {{
+            border-color: {DS.BORDER_FOCUS};
+        }}
+        .cx-matriz-barra button {{
+            padding: 6px {DS.SPACING_LG};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_MD};
+            background: {DS.SURFACE};
+            color: {DS.TEXT_SECONDARY};
+            font: inherit;
+            font-size: 13px;
+            font-weight: 500;
+            cursor: pointer;
+        }}
+        .cx-matriz-barra button.cx-matriz-salvar {{
+            border-color: {DS.PRIMARY};
+            background: {DS.PRIMARY};
+            color: {DS.TEXT_INVERSE};
+        }}
+        .cx-matriz-barra button:disabled {{
+            opacity: 0.5;
+            cursor: default;
+        }}
+        .cx-matriz-status {{
+            font-size: 13px;
+            color: {DS.TEXT_TERTIARY};
+        }}
+        .cx-matriz-rolagem {{
+            max-height: calc(100vh - 320px);
+            overflow: auto;
+            background: {DS.SURFACE};
+            border: 1px solid {DS.BORDER_LIGHT};
+            border-radius: {DS.RADIUS_LG};
+        }}
+        .cx-matriz-tabela {{
+            border-collapse: separate;
+            border-spacing: 0;
+            font-size: 13px;
+            color: {DS.TEXT_PRIMARY};
+        }}
+        .cx-matriz-tabela th, .cx-matriz-tabela td {{
+            padding: 6px {DS.SPACING_MD};
+            border-bottom: 1px solid {DS.BORDER_LIGHT};
+            white-space: nowrap;
+        }}
+        .cx-matriz-tabela thead th {{
+            position: sticky;
+            top: 0;
+            z-index: 2;
+            background: {DS.SURFACE_50};
+            font-weight: 600;
+            cursor: pointer;
+        }}
+        .cx-matriz-tabela th:first-child, .cx-matriz-tabela td:first-child {{
+            position: sticky;
+            left: 0;
+            z-index: 1;
+            background: {DS.SURFACE};
+            text-align: left;
+            cursor: default;
+        }}
+        .cx-matriz-tabela thead th:first-child {{
+            z-index: 3;
+            background: {DS.SURFACE_50};
+        }}
+        .cx-matriz-celula {{
+            text-align: center;
+            cursor: pointer;
+            color: {DS.PRIMARY};
+            font-weight: 700;
+        }}
+        .cx-matriz-celula:hover {{
+            background: {DS.SURFACE_HOVER};
+        }}
+        .cx-matriz-on::before {{
+            content: '✓';
+        }}
+        .cx-matriz-alterada {{
+            background: #fff7db;
+        }}
+
+        /* Paleta de comandos (Ctrl/⌘+K) */
+        .cx-paleta {{
+            display: none;
+            position: fixed;
+            inset: 0;
+            z-index: 2000;
+            align-items: flex-start;
+            justify-content: center;
+            padding-top: 12vh;
+            background: rgba(15, 23, 42, 0.35);
+        }}
+        .cx-paleta-caixa {{
+            width: min(560px, 92vw);
+            background: {DS.SURFACE_ELEVATED};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_LG};
+            box-shadow: {DS.SHADOW_LG};
+            overflow: hidden;
+        }}
+        .cx-paleta-campo {{
+            width: 100%;
+            padding: {DS.SPACING_LG} {DS.SPACING_XL};
+            border: none;
+            border-bottom: 1px solid {DS.BORDER_LIGHT};
+            outline: none;
+            background: transparent;
+            font: inherit;
+            font-size: 15px;
+            color: {DS.TEXT_PRIMARY};
+        }}
+        .cx-paleta-lista {{
+            max-height: 360px;
+            overflow-y: auto;
+            padding: {DS.SPACING_SM};
+        }}
+        .cx-paleta-item {{
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            padding: {DS.SPACING_SM} {DS.SPACING_MD};
+            border-radius: {DS.RADIUS_SM};
+            color: {DS.TEXT_PRIMARY};
+            font-size: 14px;
+            text-decoration: none;
+        }}
+        .cx-paleta-item small {{
+            color: {DS.TEXT_TERTIARY};
+            font-size: 12px;
+            text-transform: capitalize;
+        }}
+        .cx-paleta-item:hover, .cx-paleta-ativo {{
+            background: {DS.PRIMARY_ULTRA_LIGHT};
+        }}
+        .cx-paleta-vazio {{
+            padding: {DS.SPACING_LG};
+            color: {DS.TEXT_TERTIARY};
+            font-size: 13px;
+            text-align: center;
+        }}
+        .cx-paleta-gatilho {{
+            display: flex;
+            align-items: center;
+            gap: {DS.SPACING_SM};
+            padding: 6px {DS.SPACING_MD};
+            border: 1px solid {DS.BORDER};
+            border-radius: {DS.RADIUS_MD};
+            background: {DS.SURFACE};
+            color: {DS.TEXT_TERTIARY};
+            font: inherit;
+            font-size: 13px;
+            cursor: pointer;
+        }}
+        .cx-paleta-gatilho kbd {{
+            padding: 1px 6px;
+            border: 1px solid {DS.BORDER};
+            border-radius: 4px;
+            background: {DS.SURFACE_50};
+            font-family: inherit;
+            font-size: 11px;
+        }}
+
+        /* Animations */
+        @keyframes fadeInUp {{
+            from {{
+                opacity: 0;
+                transform: translateY(12px);
+            }}
+            to {{
+                opacity: 1;
+                transform: translateY(0);
+            }}
+        }}
+
+        /* Skeleton (shimmer) */
+        .cx-skeleton {{
+            width: 100%;
+            background: linear-gradient(90deg, {DS.SURFACE_100} 0%, {DS.SURFACE_200} 50%, {DS.SURFACE_100} 100%);
+            background-size: 200% 100%;
+            animation: shimmer 1.8s ease-in-out infinite;
+            border-radius: {DS.RADIUS_LG};
+        }}
+
+        /* Login - grid pattern sutil */
+        .cx-login-grid {{
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            bottom: 0;
+            background-image:
+                linear-gradient(to right, {DS.BORDER_LIGHT} 1px, transparent 1px),
+                linear-gradient(to bottom, {DS.BORDER_LIGHT} 1px, transparent 1px);
+            background-size: 32px 32px;
+            pointer-events: none;
+            opacity: 0.4;
+        }}
+
+        @keyframes shimmer {{
+            0% {{
+                background-position: -200% 0;
+            }}
+            100% {{
+                background-position: 200% 0;
+            }}
+        }}
+''')
+# Arquivos gerados no startup (CSS e JS globais, paleta, pastas, matriz): gzip calculado uma vez, hash
+# no nome e cache imutável. O head só leva o <link>/<script>; visita repetida não baixa nada.
+ARQUIVOS_ESTATICOS: Dict[str, Tuple[bytes, bytes, str]] = {}  # 'nome.hash.ext' -> (corpo, gzip, media type)
+_ESTATICO_ATUAL: Dict[Tuple[str, str], str] = {}  # (nome, ext) -> 'nome.hash.ext'
+
+def publicar_estatico(nome: str, extensao: str, conteudo: str, media_type: str) -> str:
+    corpo = conteudo.encode()
+    arquivo = f'{nome}.{hashlib.sha256(corpo).hexdigest()[:12]}.{extensao}'
+    ARQUIVOS_ESTATICOS[arquivo] = (corpo, gzip.compress(corpo, compresslevel=9), media_type)
+    _ESTATICO_ATUAL[(nome, extensao)] = arquivo
+    return f'/estilos/{arquivo}'
+
+# Funções globais chamadas pelo servidor (ui.run_javascript) depois da conexão; o
+# pastas.js vem depois no head e sobrescreve o diff da home quando há pastas
+GLOBAIS_JS = r'''
+// Aplica o diff enviado por CanalWorkspaces no grid da home
+window.cxAplicarDiffWorkspaces = function (diff) {
+    const grid = document.querySelector('.cx-workspace-grid');
+    if (diff.recarregar || !grid) { window.location.reload(); return; }
+    diff.removidos.forEach(id => grid.querySelector(`[data-dash-id="${id}"]`)?.remove());
+    Object.entries(diff.renomeados).forEach(([id, nome]) => {
+        const label = grid.querySelector(`[data-dash-id="${id}"] .cx-workspace-nome`);
+        if (label) label.textContent = nome;
+    });
+    diff.adicionados.forEach(card => grid.insertAdjacentHTML('beforeend', card));
+    const total = document.querySelector('.cx-workspace-total');
+    if (total) total.textContent = `${diff.total} ${diff.total === 1 ? 'workspace' : 'workspaces'}`;
+};
+
+// Painel: iframe só carrega quando visível e, depois de suspenderMs fora da tela,
+// volta para about:blank (para de consumir rede e CPU até reaparecer)
+window.cxAtivarIframesPorVisibilidade = function (suspenderMs) {
+    const timers = new Map();
+    const observador = new IntersectionObserver(entradas => entradas.forEach(({target: iframe, isIntersecting}) => {
+        clearTimeout(timers.get(iframe));
+        const atual = iframe.getAttribute('src');
+        if (isIntersecting) {
+            if (atual !== iframe.dataset.cxSrc) iframe.setAttribute('src', iframe.dataset.cxSrc);
+        } else if (atual && atual !== 'about:blank') {
+            timers.set(iframe, setTimeout(() => iframe.setAttribute('src', 'about:blank'), suspenderMs));
+        }
+    }), {rootMargin: '200px'});
+    document.querySelectorAll('iframe[data-cx-src]').forEach(iframe => observador.observe(iframe));
+};
+'''
+
+# Paleta de comandos (Ctrl/⌘+K): busca os workspaces do usuário uma vez, indexa no
+# browser (prefixo por palavra, fuzzy como reserva) e navega direto; digitar não
+# fala com o servidor.
+PALETA_JS = r'''
+(() => {
+    let itens = null, palavras = [], pedido = null, painel = null, campo = null, lista = null;
+    let resultados = [], selecionado = 0;
+    const normalizar = t => t.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+
+    function indexar(workspaces) {
+        itens = workspaces.map(([id, nome, tipo]) => ({id, nome, tipo, chave: normalizar(nome)}));
+        palavras = [];
+        itens.forEach((item, i) => item.chave.split(/[^a-z0-9]+/).filter(Boolean).forEach(p => palavras.push([p, i])));
+        palavras.sort((a, b) => a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0);
+    }
+
+    // Itens com alguma palavra começando por 'prefixo' (busca binária na lista ordenada)
+    function porPrefixo(prefixo) {
+        let ini = 0, fim = palavras.length;
+        while (ini < fim) {
+            const meio = (ini + fim) >> 1;
+            if (palavras[meio][0] < prefixo) ini = meio + 1; else fim = meio;
+        }
+        const achados = new Set();
+        for (let i = ini; i < palavras.length && palavras[i][0].startsWith(prefixo); i++) achados.add(palavras[i][1]);
+        return achados;
+    }
+
+    // Fuzzy: letras da busca em ordem dentro do nome; menos letras puladas = melhor
+    function pontuarFuzzy(chave, busca) {
+        let pos = -1, pulos = 0;
+        for (const letra of busca) {
+            const achou = chave.indexOf(letra, pos + 1);
+            if (achou < 0) return null;
+            pulos += achou - pos - 1;
+            pos = achou;
+        }
+        return pulos;
+    }
+
+    function buscar(texto) {
+        const termos = normalizar(texto).split(/[^a-z0-9]+/).filter(Boolean);
+        if (!termos.length) return itens.slice(0, 50);
+        let candidatos = null;
+        for (const termo of termos) {
+            const achados = porPrefixo(termo);
+            candidatos = candidatos === null ? achados : new Set([...candidatos].filter(i => achados.has(i)));
+        }
+        if (candidatos.size) {
+            return [...candidatos].map(i => itens[i])
+                .sort((a, b) => (b.chave.startsWith(termos[0]) - a.chave.startsWith(termos[0])) || a.nome.length - b.nome.length)
+                .slice(0, 50);
+        }
+        const busca = termos.join('');
+        return itens.map(item => [item, pontuarFuzzy(item.chave, busca)])
+            .filter(([, pulos]) => pulos !== null)
+            .sort((a, b) => a[1] - b[1])
+            .slice(0, 50)
+            .map(([item]) => item);
+    }
+
+    function mensagem(texto) {
+        lista.innerHTML = '<div class="cx-paleta-vazio"></div>';
+        lista.firstChild.textContent = texto;
+    }
+
+    function desenhar() {
+        if (!resultados.length) return mensagem('Nenhum workspace encontrado');
+        lista.replaceChildren(...resultados.map((item, i) => {
+            const linha = document.createElement('a');
+            linha.className = 'cx-paleta-item' + (i === selecionado ? ' cx-paleta-ativo' : '');
+            linha.href = `/dashboard/${item.id}`;
+            linha.innerHTML = '<span></span><small></small>';
+            linha.firstChild.textContent = item.nome;
+            linha.lastChild.textContent = item.tipo;
+            return linha;
+        }));
+        lista.children[selecionado]?.scrollIntoView({block: 'nearest'});
+    }
+
+    function atualizar() {
+        selecionado = 0;
+        resultados = buscar(campo.value);
+        desenhar();
+    }
+
+    function criar() {
+        painel = document.createElement('div');
+        painel.className = 'cx-paleta';
+        painel.innerHTML = '<div class="cx-paleta-caixa"><input class="cx-paleta-campo" placeholder="Ir para workspace…" autocomplete="off"><div class="cx-paleta-lista"></div></div>';
+        document.body.appendChild(painel);
+        campo = painel.querySelector('.cx-paleta-campo');
+        lista = painel.querySelector('.cx-paleta-lista');
+        painel.addEventListener('mousedown', e => { if (e.target === painel) fechar(); });
+        campo.addEventListener('input', () => { if (itens) atualizar(); });
+        campo.addEventListener('keydown', e => {
+            if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                e.preventDefault();
+                if (!resultados.length) return;
+                selecionado = (selecionado + (e.key === 'ArrowDown' ? 1 : -1) + resultados.length) % resultados.length;
+                desenhar();
+            } else if (e.key === 'Enter' && resultados[selecionado]) {
+                window.location.href = `/dashboard/${resultados[selecionado].id}`;
+            } else if (e.key === 'Escape') {
+                fechar();
+            }
+        });
+    }
+
+    function fechar() {
+        painel.style.display = 'none';
+    }
+
+    window.cxAbrirPaleta = function () {
+        if (!painel) criar();
+        painel.style.display = 'flex';
+        campo.value = '';
+        campo.focus();
+        if (itens) return atualizar();
+        mensagem('Carregando…');
+        pedido = pedido || fetch('/api/workspaces', {credentials: 'same-origin'})
+            .then(resposta => resposta.ok ? resposta.json() : Promise.reject(resposta.status))
+            .then(indexar)
+            .catch(() => { pedido = null; });
+        pedido.then(() => itens ? atualizar() : mensagem('Não foi possível carregar os workspaces'));
+    };
+
+    document.addEventListener('keydown', e => {
+        if ((e.ctrlKey || e.metaKey) && e.key.toLowerCase() === 'k') {
+            e.preventDefault();
+            window.cxAbrirPaleta();
+        }
+    });
+})();
+'''
+
+# Matriz de permissões: carrega a matriz inteira uma vez (JSON compacto), as edições
+# ficam num Map no browser e o Salvar manda só as células que mudaram.
+PERMISSOES_JS = r'''
+(() => {
+    const normalizar = t => t.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+    const escapar = t => String(t).replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+
+    window.cxMatrizPermissoes = function (raiz) {
+        let perfis = [], dashboards = [], originais = new Set(), alteracoes = new Map(), visiveis = [];
+        const chave = (dashId, perfil) => `${dashId}\u0000${perfil}`;
+
+        raiz.innerHTML = `
+            <div class="cx-matriz-barra">
+                <input class="cx-matriz-filtro" placeholder="Filtrar dashboards…">
+                <input class="cx-matriz-novo" placeholder="Novo perfil" maxlength="50">
+                <button class="cx-matriz-adicionar" type="button">Adicionar perfil</button>
+                <span class="cx-matriz-status"></span>
+                <span style="flex: 1"></span>
+                <button class="cx-matriz-descartar" type="button" disabled>Descartar</button>
+                <button class="cx-matriz-salvar" type="button" disabled>Salvar</button>
+            </div>
+            <div class="cx-matriz-rolagem"><table class="cx-matriz-tabela"><thead></thead><tbody></tbody></table></div>`;
+        const [filtro, novo, adicionar, status, descartar, salvar] = ['filtro', 'novo', 'adicionar', 'status', 'descartar', 'salvar']
+            .map(nome => raiz.querySelector(`.cx-matriz-${nome}`));
+        const cabecalho = raiz.querySelector('thead'), corpo = raiz.querySelector('tbody');
+
+        const marcado = (dashId, perfil) => {
+            const k = chave(dashId, perfil);
+            return alteracoes.has(k) ? alteracoes.get(k) : originais.has(k);
+        };
+
+        function definir(dashId, perfil, valor) {
+            const k = chave(dashId, perfil);
+            if (valor === originais.has(k)) alteracoes.delete(k); else alteracoes.set(k, valor);
+        }
+
+        function celula(dashId, perfil) {
+            const k = chave(dashId, perfil);
+            const classes = 'cx-matriz-celula' + (marcado(dashId, perfil) ? ' cx-matriz-on' : '') + (alteracoes.has(k) ? ' cx-matriz-alterada' : '');
+            return `<td class="${classes}" data-p="${escapar(perfil)}"></td>`;
+        }
+
+        function resumo() {
+            const n = alteracoes.size;
+            status.textContent = n ? `${n} ${n === 1 ? 'alteração pendente' : 'alterações pendentes'}` : `${visiveis.length} de ${dashboards.length} dashboards`;
+            salvar.disabled = descartar.disabled = !n;
+        }
+
+        function desenhar() {
+            const busca = normalizar(filtro.value.trim());
+            visiveis = busca ? dashboards.filter(d => normalizar(d[1]).includes(busca)) : dashboards;
+            cabecalho.innerHTML = '<tr><th>Dashboard</th>' + perfis.map(p => `<th data-p="${escapar(p)}" title="Marcar/desmarcar os dashboards visíveis">${escapar(p)}</th>`).join('') + '</tr>';
+            corpo.innerHTML = visiveis.map(([id, nome, tipo]) =>
+                `<tr data-d="${id}"><td>${escapar(nome)} <small style="color: #6c757d">${escapar(tipo)}</small></td>${perfis.map(p => celula(id, p)).join('')}</tr>`
+            ).join('');
+            resumo();
+        }
+
+        async function carregar() {
+            status.textContent = 'Carregando…';
+            const resposta = await fetch('/admin/permissoes/matriz', {credentials: 'same-origin'});
+            if (!resposta.ok) { status.textContent = 'Não foi possível carregar as permissões'; return; }
+            const matriz = await resposta.json();
+            perfis = matriz.perfis;
+            dashboards = matriz.dashboards;
+            originais = new Set();
+            dashboards.forEach(([id, , , indices]) => indices.forEach(i => originais.add(chave(id, perfis[i]))));
+            alteracoes.clear();
+            desenhar();
+        }
+
+        corpo.addEventListener('click', e => {
+            const td = e.target.closest('td[data-p]');
+            if (!td) return;
+            const dashId = Number(td.parentElement.dataset.d), perfil = td.dataset.p;
+            definir(dashId, perfil, !marcado(dashId, perfil));
+            td.outerHTML = celula(dashId, perfil);
+            resumo();
+        });
+
+        // Clique no perfil: liga a coluna inteira (só as linhas filtradas) ou desliga se já estava toda ligada
+        cabecalho.addEventListener('click', e => {
+            const perfil = e.target.closest('th[data-p]')?.dataset.p;
+            if (perfil === undefined) return;
+            const valor = !visiveis.every(([id]) => marcado(id, perfil));
+            visiveis.forEach(([id]) => definir(id, perfil, valor));
+            desenhar();
+        });
+
+        filtro.addEventListener('input', desenhar);
+        adicionar.addEventListener('click', () => {
+            const perfil = novo.value.trim();
+            if (perfil && !perfis.includes(perfil)) { perfis.push(perfil); desenhar(); }
+            novo.value = '';
+        });
+        descartar.addEventListener('click', () => { alteracoes.clear(); desenhar(); });
+
+        salvar.addEventListener('click', async () => {
+            const diff = {conceder: [], revogar: []};
+            alteracoes.forEach((valor, k) => {
+                const [dashId, perfil] = k.split('\u0000');
+                (valor ? diff.conceder : diff.revogar).push([Number(dashId), perfil]);
+            });
+            salvar.disabled = descartar.disabled = true;
+            status.textContent = 'Salvando…';
+            const resposta = await fetch('/admin/permissoes/matriz', {
+                method: 'POST', credentials: 'same-origin',
+                headers: {'Content-Type': 'application/json'}, body: JSON.stringify(diff),
+            });
+            const resultado = await resposta.json().catch(() => ({}));
+            if (!resposta.ok) {
+                status.textContent = resultado.erro || `Erro ao salvar (HTTP ${resposta.status})`;
+                salvar.disabled = descartar.disabled = false;
+                return;
+            }
+            await carregar();
+            status.textContent = `Salvo: ${resultado.concedidas} concedidas, ${resultado.revogadas} revogadas`;
+        });
+
+        window.addEventListener('beforeunload', e => { if (alteracoes.size) e.preventDefault(); });
+        carregar();
+    };
+})();
+'''
+
+# Home com pastas: o conteúdo de cada pasta é buscado quando ela abre pela primeira vez
+PASTAS_JS = r'''
+(() => {
+    // 'toggle' não borbulha: captura no document vale para pastas criadas depois (níveis carregados)
+    document.addEventListener('toggle', e => {
+        const pasta = e.target;
+        if (!pasta.classList?.contains('cx-pasta') || !pasta.open || pasta.dataset.carregada) return;
+        pasta.dataset.carregada = '1';
+        const conteudo = pasta.querySelector(':scope > .cx-pasta-conteudo');
+        conteudo.innerHTML = '<div class="cx-pasta-aviso">Carregando…</div>';
+        fetch(`/api/pastas/${pasta.dataset.pastaId}`, {credentials: 'same-origin'})
+            .then(resposta => resposta.ok ? resposta.text() : Promise.reject(resposta.status))
+            .then(fragmento => { conteudo.innerHTML = fragmento; })
+            .catch(() => {
+                delete pasta.dataset.carregada;
+                conteudo.innerHTML = '<div class="cx-pasta-aviso">Não foi possível abrir a pasta</div>';
+            });
+    }, true);
+
+    // Diff ao vivo (CanalWorkspaces) com pastas: o card pode estar em qualquer nível aberto.
+    // Remoção e renomeação valem onde ele estiver; inclusão não diz a pasta, então recarrega.
+    window.cxAplicarDiffWorkspaces = function (diff) {
+        if (diff.recarregar || diff.adicionados.length) { window.location.reload(); return; }
+        diff.removidos.forEach(id => document.querySelectorAll(`.cx-pastas [data-dash-id="${id}"]`).forEach(card => card.remove()));
+        Object.entries(diff.renomeados).forEach(([id, nome]) =>
+            document.querySelectorAll(`.cx-pastas [data-dash-id="${id}"] .cx-workspace-nome`).forEach(label => { label.textContent = nome; }));
+        const total = document.querySelector('.cx-workspace-total');
+        if (total) total.textContent = `${diff.total} ${diff.total === 1 ? 'workspace' : 'workspaces'}`;
+    };
+})();
+'''
+
+URL_ESTILOS_GLOBAIS = publicar_estatico('globais', 'css', ESTILOS_GLOBAIS_CSS, 'text/css')
+URL_GLOBAIS_JS = publicar_estatico('globais', 'js', GLOBAIS_JS, 'text/javascript')
+URL_PALETA_JS = publicar_estatico('paleta', 'js', PALETA_JS, 'text/javascript')
+URL_PASTAS_JS = publicar_estatico('pastas', 'js', PASTAS_JS, 'text/javascript')
+URL_PERMISSOES_JS = publicar_estatico('permissoes', 'js', PERMISSOES_JS, 'text/javascript')
+
+@app.get('/estilos/{arquivo}', include_in_schema=False)
+def arquivos_estaticos(arquivo: str, request: Request):
+    if arquivo in ARQUIVOS_ESTATICOS:
+        cabecalhos = {'Cache-Control': 'public, max-age=31536000, immutable', 'ETag': f'"{arquivo.split(".")[1]}"'}
+    else:
+        # Hash de outro deploy (página antiga aberta): entrega a versão atual, sem cache
+        arquivo = _ESTATICO_ATUAL.get((arquivo.split('.')[0], arquivo.rsplit('.', 1)[-1]))
+        if arquivo is None:
+            return PlainTextResponse('não encontrado', status_code=404)
+        cabecalhos = {'Cache-Control': 'no-cache'}
+    corpo, comprimido, media_type = ARQUIVOS_ESTATICOS[arquivo]
+    cabecalhos['Vary'] = 'Accept-Encoding'
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        cabecalhos['Content-Encoding'] = 'gzip'
+        return Response(comprimido, media_type=media_type, headers=cabecalhos)
+    return Response(corpo, media_type=media_type, headers=cabecalhos)
 
-# Dropdown icon
-
-ui.icon('expand_more', size='18px').style(f'color: {DS.TEXT_TERTIARY};')
-
-
-# Hover effect
-
-user_menu.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER};'))
-
-user_menu.on('mouseleave', lambda e: e.sender.style(f'background: transparent;'))
-
-
-# Menu dropdown (via NiceGUI menu)
-
-with user_menu:
-
-with ui.menu().props('offset-y').style(f'''
-
-background: {DS.SURFACE_ELEVATED};
-
-border: 1px solid {DS.BORDER};
-
-border-radius: {DS.RADIUS_LG};
-
-box-shadow: {DS.SHADOW_LG};
-
-padding: {DS.SPACING_SM};
-
-min-width: 200px;
-
-'''):
-
-# Menu items
-
-with ui.column().classes('w-full').style(f'gap: {DS.SPACING_XS};'):
-
-# Settings (disabled visually)
-
-settings_item = ui.row().classes('w-full items-center cursor-not-allowed').style(f'''
-
-gap: {DS.SPACING_MD};
-
-padding: {DS.SPACING_SM} {DS.SPACING_MD};
-
-border-radius: {DS.RADIUS_SM};
-
-opacity: 0.5;
-
-''')
-
-with settings_item:
-
-ui.icon('settings', size='18px').style(f'color: {DS.TEXT_TERTIARY};')
-
-ui.label('Configurações').classes('text-sm').style(f'color: {DS.TEXT_SECONDARY};')
-
-
-ui.separator().style(f'background: {DS.BORDER}; margin: {DS.SPACING_SM} 0;')
-
-
-# Logout
-
-def logout_action():
-
-state = app.storage.user.get('state')
-
-if state:
-
-state.logout()
-
-app.storage.user['state'] = state
-
-ui.navigate.to('/login')
-
-
-logout_item = ui.row().classes('w-full items-center cursor-pointer').style(f'''
-
-gap: {DS.SPACING_MD};
-
-padding: {DS.SPACING_SM} {DS.SPACING_MD};
-
-border-radius: {DS.RADIUS_SM};
-
-transition: background {DS.TRANSITION_FAST};
-
-''')
-
-with logout_item:
-
-ui.icon('logout', size='18px').style(f'color: {DS.TEXT_SECONDARY};')
-
-ui.label('Sair').classes('text-sm').style(f'color: {DS.TEXT_SECONDARY}; font-weight: 500;')
-
-
-logout_item.on('click', logout_action)
-
-logout_item.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER};'))
-
-logout_item.on('mouseleave', lambda e: e.sender.style(f'background: transparent;'))
-
-
-
-# ============================================================================
-
-# UI COMPONENTS - PREMIUM
-
-# ============================================================================
-
-
-
-class UIComponents:
-
-@staticmethod
-
-def input_field(label: str, password: bool = False, placeholder: str = '', icon: Optional[str] = None):
-
-with ui.column().classes('w-full').style(f'gap: {DS.SPACING_SM};'):
-
-ui.label(label).classes('text-sm').style(f'''
-
-color: {DS.TEXT_SECONDARY};
-
-font-weight: 500;
-
-''')
-
-with ui.row().classes('w-full items-center relative'):
-
-if icon:
-
-ui.icon(icon, size='18px').classes('absolute z-10').style(f'''
-
-left: 14px;
-
-color: {DS.TEXT_TERTIARY};
-
-pointer-events: none;
-
-''')
-
-input_elem = ui.input(placeholder=placeholder, password=password).classes('w-full').props('outlined borderless').style(f'''
-
-background: {DS.SURFACE};
-
-border: 1.5px solid {DS.BORDER};
-
-border-radius: {DS.RADIUS_MD};
-
-padding-left: {"44px" if icon else "14px"};
-
-transition: all {DS.TRANSITION_FAST};
-
-height: 44px;
-
-font-size: 14px;
-
-''')
-
-input_elem.on('focus', lambda e: e.sender.style(f'''
-
-border-color: {DS.BORDER_FOCUS};
-
-box-shadow: {DS.SHADOW_FOCUS};
-
-'''))
-
-input_elem.on('blur', lambda e: e.sender.style(f'''
-
-border-color: {DS.BORDER};
-
-box-shadow: none;
-
-'''))
-
-return input_elem
-
-
-
-@staticmethod
-
-def primary_button(text: str, on_click=None, full_width: bool = False, icon: Optional[str] = None):
-
-btn = ui.button(text, on_click=on_click).props('no-caps flat').style(f'''
-
-background: {DS.PRIMARY};
-
-color: {DS.TEXT_INVERSE};
-
-border-radius: {DS.RADIUS_MD};
-
-padding: 0 20px;
-
-font-weight: 600;
-
-font-size: 14px;
-
-height: 44px;
-
-box-shadow: {DS.SHADOW_XS};
-
-transition: all {DS.TRANSITION_FAST};
-
-{"width: 100%;" if full_width else ""}
-
-''')
-
-if icon: btn.props(f'icon={icon}')
-
-btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.PRIMARY_HOVER}; box-shadow: {DS.SHADOW_SM};'))
-
-btn.on('mouseleave', lambda e: e.sender.style(f'background: {DS.PRIMARY}; box-shadow: {DS.SHADOW_XS};'))
-
-return btn
-
-
-
-@staticmethod
-
-def ghost_button(text: str, on_click=None, icon: Optional[str] = None):
-
-btn = ui.button(text, on_click=on_click).props('no-caps flat').style(f'''
-
-background: transparent;
-
-color: {DS.TEXT_SECONDARY};
-
-border: 1.5px solid {DS.BORDER};
-
-border-radius: {DS.RADIUS_MD};
-
-padding: 0 16px;
-
-height: 36px;
-
-font-weight: 500;
-
-font-size: 13px;
-
-transition: all {DS.TRANSITION_FAST};
-
-''')
-
-if icon: btn.props(f'icon={icon}')
-
-btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER}; border-color: {DS.BORDER_HOVER}; color: {DS.TEXT_PRIMARY};'))
-
-btn.on('mouseleave', lambda e: e.sender.style(f'background: transparent; border-color: {DS.BORDER}; color: {DS.TEXT_SECONDARY};'))
-
-return btn
-
-
-
-@staticmethod
-
-def icon_button(icon: str, on_click=None, tooltip: str = ''):
-
-btn = ui.button(icon=icon, on_click=on_click).props('flat round dense').style(f'''
-
-color: {DS.TEXT_SECONDARY};
-
-transition: all {DS.TRANSITION_FAST};
-
-''')
-
-if tooltip: btn.tooltip(tooltip)
-
-btn.on('mouseenter', lambda e: e.sender.style(f'background: {DS.SURFACE_HOVER}; color: {DS.TEXT_PRIMARY};'))
-
-btn.on('mouseleave', lambda e: e.sender.style(f'background: transparent; color: {DS.TEXT_SECONDARY};'))
-
-return btn
-
-
-
-# ============================================================================
-
-# SKELETON LOADER - REFINED
-
-# ============================================================================
-
-
-
-class SkeletonLoader:
-
-@staticmethod
-
-def create(height: str = '100%'):
-
-ui.html(f'''
-
-<div style="
-
-width: 100%;
-
-height: {height};
-
-background: linear-gradient(90deg, {DS.SURFACE_100} 0%, {DS.SURFACE_200} 50%, {DS.SURFACE_100} 100%);
-
-background-size: 200% 100%;
-
-animation: shimmer 1.8s ease-in-out infinite;
-
-border-radius: {DS.RADIUS_LG};
-
-"></div>
-
-<style>
-
-@keyframes shimmer {{
-
-0% {{ background-position: -200% 0; }}
-
-100% {{ background-position: 200% 0; }}
-
-}}
-
-</style>
-
-''', sanitize=False)
-
-
-
-# ============================================================================
-
-# DATABASE SETUP
-
-# ============================================================================
-
-
-
-DATABASE_URL = os.getenv('DATABASE_URL')
-
-if not DATABASE_URL:
-
-print("AVISO: DATABASE_URL não encontrada.")
-
-DATABASE_URL = "sqlite:///exemplo.db"
-
-if DATABASE_URL.startswith("postgres://"):
-
-DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-
-
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
-
-SessionLocal = sessionmaker(bind=engine)
-
-Base = declarative_base()
-
-
-
-# ============================================================================
-
-# MODELS
-
-# ============================================================================
-
-
-
-class Cliente(Base):
-
-__tablename__ = 'clientes'
-
-id = Column(Integer, primary_key=True)
-
-nome = Column(String(200), nullable=False)
-
-users = relationship('User', back_populates='cliente')
-
-dashboards = relationship('Dashboard', back_populates='cliente')
-
-
-
-class User(Base):
-
-__tablename__ = 'users'
-
-id = Column(Integer, primary_key=True)
-
-email = Column(String(200), unique=True, nullable=False)
-
-password_hash = Column(String(64), nullable=False)
-
-cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
-
-perfil = Column(String(50), nullable=False)
-
-cliente = relationship('Cliente', back_populates='users')
-
-
-
-class Dashboard(Base):
-
-__tablename__ = 'dashboards'
-
-id = Column(Integer, primary_key=True)
-
-cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
-
-nome = Column(String(200), nullable=False)
-
-tipo = Column(String(50), nullable=False)
-
-link_embed = Column(Text, nullable=False)
-
-cliente = relationship('Cliente', back_populates='dashboards')
-
-permissoes = relationship('DashboardPermissao', back_populates='dashboard')
-
-
-
-class DashboardPermissao(Base):
-
-__tablename__ = 'dashboard_permissoes'
-
-id = Column(Integer, primary_key=True)
-
-dashboard_id = Column(Integer, ForeignKey('dashboards.id'), nullable=False)
-
-perfil = Column(String(50), nullable=False)
-
-dashboard = relationship('Dashboard', back_populates='permissoes')
-
-
-
-# ============================================================================
-
-# AUTH & LOGIC
-
-# ============================================================================
-
-
-
-def hash_password(password: str) -> str:
-
-return hashlib.sha256(password.encode()).hexdigest()
-
-
-
-def autenticar_usuario(email: str, password: str) -> Optional[User]:
-
-db = SessionLocal()
-
-try:
-
-return db.query(User).filter(User.email == email, User.password_hash == hash_password(password)).first()
-
-finally: db.close()
-
-
-
-def obter_dashboards_autorizados(cliente_id: int, perfil: str) -> List[Dashboard]:
-
-db = SessionLocal()
-
-try:
-
-return db.query(Dashboard).join(DashboardPermissao).filter(Dashboard.cliente_id == cliente_id, DashboardPermissao.perfil == perfil).distinct().all()
-
-finally: db.close()
-
-
-
-class AppState:
-
-def __init__(self): self.user_email: Optional[str] = None
-
-def login(self, user: User): self.user_email = user.email
-
-def logout(self): self.user_email = None
-
-def get_user_completo(self) -> Optional[User]:
-
-if not self.user_email: return None
-
-db = SessionLocal()
-
-try: return db.query(User).filter(User.email == self.user_email).first()
-
-finally: db.close()
-
-
-
-# ============================================================================
-
-# PAGES
-
-# ============================================================================
-
-
-
-@ui.page('/login')
-
-def page_login():
-
-state = app.storage.user.get('state', AppState())
-
-if state.user_email: ui.navigate.to('/'); return
-
-
-
-with ui.column().classes('w-full h-screen items-center justify-center').style(f'''
-
-background: linear-gradient(135deg, {DS.SURFACE_50} 0%, {DS.PRIMARY_ULTRA_LIGHT} 100%);
-
-'''):
-
-# Subtle grid pattern
-
-ui.html(f'''
-
-<div style="
-
-position: absolute;
-
-top: 0;
-
-left: 0;
-
-right: 0;
-
-bottom: 0;
-
-background-image:
-
-linear-gradient(to right, {DS.BORDER_LIGHT} 1px, transparent 1px),
-
-linear-gradient(to bottom, {DS.BORDER_LIGHT} 1px, transparent 1px);
-
-background-size: 32px 32px;
-
-pointer-events: none;
-
-opacity: 0.4;
-
-"></div>
-
-''', sanitize=False)
-
-
-with ui.column().classes('w-full max-w-md px-8 relative z-10').style(f'gap: {DS.SPACING_2XL};'):
-
-# Branding
-
-with ui.column().classes('items-center').style(f'gap: {DS.SPACING_MD};'):
-
-with ui.column().classes('items-center justify-center').style(f'''
-
-width: 48px;
-
-height: 48px;
-
-background: {DS.PRIMARY};
-
-border-radius: {DS.RADIUS_LG};
-
-box-shadow: {DS.SHADOW_MD};
-
-'''):
-
-ui.icon('analytics', size='24px', color='white')
-
-ui.label('CX Data').classes('text-2xl').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 700;
-
-letter-spacing: -0.02em;
-
-''')
-
-ui.label('Analytics Platform').classes('text-xs').style(f'''
-
-color: {DS.TEXT_TERTIARY};
-
-font-weight: 500;
-
-letter-spacing: 0.05em;
-
-text-transform: uppercase;
-
-''')
-
-
-# Login Card
-
-with ui.column().classes('w-full').style(f'''
-
-gap: {DS.SPACING_XL};
-
-background: {DS.SURFACE_ELEVATED};
-
-border: 1px solid {DS.BORDER_LIGHT};
-
-border-radius: {DS.RADIUS_XL};
-
-padding: {DS.SPACING_3XL};
-
-box-shadow: {DS.SHADOW_LG};
-
-'''):
-
-ui.label('Acesse sua conta').classes('text-lg').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 600;
-
-letter-spacing: -0.01em;
-
-''')
-
-
-email = UIComponents.input_field('Email', icon='mail', placeholder='seu@email.com')
-
-senha = UIComponents.input_field('Senha', password=True, icon='lock', placeholder='••••••••')
-
-
-erro_label = ui.label('').classes('text-sm hidden').style(f'color: #dc2626;')
-
-
-def try_login():
-
-user = autenticar_usuario(email.value.strip(), senha.value)
-
-if user:
-
-state.login(user)
-
-app.storage.user['state'] = state
-
-ui.navigate.to('/')
-
-else:
-
-erro_label.text = 'Credenciais inválidas. Verifique e tente novamente.'
-
-erro_label.classes(remove='hidden')
-
-
-UIComponents.primary_button('Acessar plataforma', on_click=try_login, full_width=True, icon='arrow_forward')
-
-senha.on('keydown.enter', try_login)
-
-
-
-@ui.page('/')
-
-def page_home():
-
-state = app.storage.user.get('state', AppState())
-
-if not state or not state.user_email: ui.navigate.to('/login'); return
-
-user = state.get_user_completo()
-
-if not user: state.logout(); ui.navigate.to('/login'); return
-
-
-db = SessionLocal()
-
-cliente = db.query(Cliente).filter(Cliente.id == user.cliente_id).first()
-
-dashboards = obter_dashboards_autorizados(user.cliente_id, user.perfil)
-
-db.close()
-
-
-
-with ui.column().classes('w-full h-screen').style(f'''
-
-background: {DS.SURFACE_50};
-
-margin: 0;
-
-padding: 0;
-
-font-family: {DS.FONT};
-
-'''):
-
-# Topbar Navigation
-
-TopbarNavigation.create(
-
-cliente_nome=cliente.nome,
-
-user_email=user.email,
-
-current_page='home'
-
-)
-
-
-# Main Content (com padding-top para compensar topbar fixa)
-
-with ui.column().classes('w-full').style(f'''
-
-padding-top: 64px;
-
-min-height: 100vh;
-
-'''):
-
-# Page Header
-
-with ui.column().classes('w-full').style(f'''
-
-padding: {DS.SPACING_3XL} {DS.SPACING_2XL} {DS.SPACING_XL} {DS.SPACING_2XL};
-
-background: {DS.SURFACE};
-
-border-bottom: 1px solid {DS.BORDER_LIGHT};
-
-'''):
-
-with LayoutComponents.page_container(padding='0'):
-
-with ui.column().style(f'gap: {DS.SPACING_SM};'):
-
-ui.label('Seus Workspaces').classes('text-2xl').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 700;
-
-letter-spacing: -0.02em;
-
-''')
-
-ui.label(f'Bem-vindo de volta, {cliente.nome.split()[0]}').classes('text-sm').style(f'''
-
-color: {DS.TEXT_SECONDARY};
-
-''')
-
-
-# Workspace Grid
-
-with LayoutComponents.page_container(padding=f'{DS.SPACING_2XL}'):
-
-if dashboards:
-
-# Section Header
-
-with ui.row().classes('w-full items-center justify-between').style(f'margin-bottom: {DS.SPACING_XL};'):
-
-ui.label('Todos os workspaces').classes('text-sm').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 600;
-
-''')
-
-ui.label(f'{len(dashboards)} {"workspace" if len(dashboards) == 1 else "workspaces"}').classes('text-xs').style(f'''
-
-color: {DS.TEXT_TERTIARY};
-
-background: {DS.SURFACE_100};
-
-padding: 4px 12px;
-
-border-radius: {DS.RADIUS_FULL};
-
-font-weight: 500;
-
-''')
-
-
-
-# Cards Grid
-
-with ui.grid(columns='repeat(auto-fill, minmax(340px, 1fr))').classes('w-full').style(f'gap: {DS.SPACING_XL};'):
-
-for idx, dash in enumerate(dashboards):
-
-card = ui.column().classes('cursor-pointer').style(f'''
-
-background: {DS.SURFACE_ELEVATED};
-
-border: 1px solid {DS.BORDER};
-
-border-radius: {DS.RADIUS_LG};
-
-overflow: hidden;
-
-transition: all {DS.TRANSITION_BASE};
-
-box-shadow: {DS.SHADOW_SM};
-
-animation: fadeInUp 0.4s cubic-bezier(0.4, 0, 0.2, 1) forwards;
-
-animation-delay: {idx * 0.04}s;
-
-opacity: 0;
-
-''')
-
-
-with card:
-
-# Card Header
-
-with ui.row().classes('items-start justify-between w-full').style(f'padding: {DS.SPACING_XL};'):
-
-# Icon
-
-with ui.column().classes('items-center justify-center').style(f'''
-
-width: 44px;
-
-height: 44px;
-
-background: {DS.PRIMARY_ULTRA_LIGHT};
-
-border: 1px solid {DS.BORDER_LIGHT};
-
-border-radius: {DS.RADIUS_MD};
-
-'''):
-
-ui.icon('bar_chart', size='22px').style(f'color: {DS.PRIMARY};')
-
-
-# Menu icon
-
-ui.icon('more_horiz', size='20px').style(f'''
-
-color: {DS.TEXT_DISABLED};
-
-transition: color {DS.TRANSITION_FAST};
-
-''')
-
-
-# Card Content
-
-with ui.column().style(f'''
-
-gap: {DS.SPACING_SM};
-
-padding: 0 {DS.SPACING_XL} {DS.SPACING_XL} {DS.SPACING_XL};
-
-'''):
-
-ui.label(dash.nome).classes('text-base').style(f'''
-
-color: {DS.TEXT_PRIMARY};
-
-font-weight: 600;
-
-line-height: 1.4;
-
-letter-spacing: -0.01em;
-
-''')
-
-ui.label(f'{dash.tipo.capitalize()} · Dashboard').classes('text-xs').style(f'''
-
-color: {DS.TEXT_TERTIARY};
-
-font-weight: 500;
-
-''')
-
-
-# Card Footer
-
-with ui.row().classes('w-full items-center justify-between').style(f'''
-
-padding: {DS.SPACING_MD} {DS.SPACING_XL};
-
-background: {DS.SURFACE_50};
-
-border-top: 1px solid {DS.BORDER_LIGHT};
-
-'''):
-
-ui.label('Abrir workspace').classes('text-xs').style(f'''
-
-color: {DS.PRIMARY};
-
-font-weight: 600;
-
-''')
-
-ui.icon('arrow_forward', size='16px').style(f'color: {DS.PRIMARY};')
-
-
-# Card Interactions
-
-card.on('mouseenter', lambda e, c=card: c.style(f'''
-
-border-color: {DS.BORDER_HOVER};
-
-transform: translateY(-2px);
-
-box-shadow: {DS.SHADOW_MD};
-
-'''))
-
-card.on('mouseleave', lambda e, c=card: c.style(f'''
-
-border-color: {DS.BORDER};
-
-transform: translateY(0);
-
-box-shadow: {DS.SHADOW_SM};
-
-'''))
-
-card.on('click', lambda d=dash: ui.navigate.to(f'/dashboard/{d.id}'))
-
-else:
-
-with ui.column().classes('w-full').style(f'padding: {DS.SPACING_3XL} 0;'):
-
-LayoutComponents.empty_state(
-
-icon='analytics',
-
-title='Nenhum workspace disponível',
-
-description='Você ainda não tem workspaces atribuídos. Entre em contato com seu administrador.'
-
-)
-
-
-
-@ui.page('/dashboard/{dash_id}')
-
-def page_dashboard(dash_id: int):
-
-state = app.storage.user.get('state', AppState())
-
-if not state or not state.user_email: ui.navigate.to('/login'); return
-
-user = state.get_user_completo()
-
-if not user: ui.navigate.to('/login'); return
-
-
-db = SessionLocal()
-
-dash = db.query(Dashboard).filter(Dashboard.id == dash_id).first()
-
-cliente = db.query(Cliente).filter(Cliente.id == user.cliente_id).first()
-
-db.close()
-
-
-
-if not dash:
-
-with ui.column().classes('w-full h-screen items-center justify-center'):
-
-LayoutComponents.empty_state(
-
-icon='error_outline',
-
-title='Workspace não encontrado',
-
-description='O workspace solicitado não existe ou você não tem permissão para acessá-lo.'
-
-)
-
-return
-
-
-
-with ui.column().classes('w-full h-screen').style(f'''
-
-background: {DS.SURFACE_50};
-
-margin: 0;
-
-padding: 0;
-
-overflow: hidden;
-
-'''):
-
-# Topbar Navigation com Breadcrumb
-
-TopbarNavigation.create(
-
-cliente_nome=cliente.nome,
-
-user_email=user.email,
-
-current_page='dashboard',
-
-breadcrumb=[
-
-{'label': 'Workspaces', 'onClick': lambda: ui.navigate.to('/')},
-
-{'label': dash.nome}
-
-]
-
-)
-
-
-
-# Embed Container (com padding-top para compensar topbar fixa)
-
-content_area = ui.column().classes('w-full flex-grow relative').style(f'''
-
-padding: 0;
-
-margin: 0;
-
-overflow: hidden;
-
-margin-top: 64px;
-
-''')
-
-
-with content_area:
-
-# Loading Skeleton
-
-with ui.column().classes('w-full h-full absolute top-0 left-0 z-0 items-center justify-center').style(f'''
-
-background: {DS.SURFACE};
-
-padding: {DS.SPACING_2XL};
-
-'''):
-
-with ui.column().classes('w-full h-full').style(f'''
-
-max-width: 1400px;
-
-margin: 0 auto;
-
-'''):
-
-SkeletonLoader.create('100%')
-
-
-# Embed with Premium Wrapper
-
-ui.html(f'''
-
-<div style="
-
-position: absolute;
-
-top: {DS.SPACING_XL};
-
-left: {DS.SPACING_XL};
-
-right: {DS.SPACING_XL};
-
-bottom: {DS.SPACING_XL};
-
-z-index: 10;
-
-background: {DS.SURFACE_ELEVATED};
-
-border-radius: {DS.RADIUS_LG};
-
-border: 1px solid {DS.BORDER};
-
-box-shadow: {DS.SHADOW_MD};
-
-overflow: hidden;
-
-">
-
-<iframe
-
-src="{dash.link_embed}"
-
-style="
-
-width: 100%;
-
-height: 100%;
-
-border: none;
-
-background: transparent;
-
-"
-
-allowfullscreen>
-
-</iframe>
-
-</div>
-
-''', sanitize=False)
-
-
-
-# ============================================================================
-
-# INITIALIZATION
-
-# ============================================================================
-
-
-
-Base.metadata.create_all(bind=engine)
-
-
-
-def inject_global_styles():
-
-ui.add_head_html(f'''
-
-<style>
-
-/* Global Reset */
-
-* {{
-
-margin: 0;
-
-padding: 0;
-
-box-sizing: border-box;
-
-}}
-
-
-/* Body */
-
-body {{
-
-font-family: {DS.FONT};
-
-background: {DS.SURFACE_50};
-
--webkit-font-smoothing: antialiased;
-
--moz-osx-font-smoothing: grayscale;
-
-}}
-
-
-/* Scrollbar */
-
-::-webkit-scrollbar {{
-
-width: 8px;
-
-height: 8px;
-
-}}
-
-::-webkit-scrollbar-track {{
-
-background: transparent;
-
-}}
-
-::-webkit-scrollbar-thumb {{
-
-background: {DS.BORDER};
-
-border-radius: {DS.RADIUS_SM};
-
-}}
-
-::-webkit-scrollbar-thumb:hover {{
-
-background: {DS.BORDER_HOVER};
-
-}}
-
-
-/* Animations */
-
-@keyframes fadeInUp {{
-
-from {{
-
-opacity: 0;
-
-transform: translateY(12px);
-
-}}
-
-to {{
-
-opacity: 1;
-
-transform: translateY(0);
-
-}}
-
-}}
-
-
-@keyframes shimmer {{
-
-0% {{
-
-background-position: -200% 0;
-
-}}
-
-100% {{
-
-background-position: 200% 0;
-
-}}
-
-}}
-
-</style>
-
-''', shared=True)
+def inject_global_styles():
+    ui.add_head_html(f'<link rel="stylesheet" href="{URL_ESTILOS_GLOBAIS}">', shared=True)
 
+def inject_global_scripts():
+    ui.add_head_html(f'<script defer src="{URL_GLOBAIS_JS}"></script>', shared=True)
 
 
 if __name__ in {'__main__', '__mp_main__'}:
-
-inject_global_styles()
-
-port = int(os.environ.get('PORT', 8080))
-
-ui.run(
-
-title='CX Data',
-
-favicon='📊',
-
-host='0.0.0.0',
-
-port=port,
-
-storage_secret='cx_secure_key_v7',
-
-reload=False
-
-)
+    inject_global_styles()
+    inject_global_scripts()
+    port = int(os.environ.get('PORT', 8080))
+    ui.run(
+        title='CX Data',
+        favicon='📊',
+        host='0.0.0.0',
+        port=port,
+        storage_secret='cx_secure_key_v7',
+        reload=False
+    )
@@ -0,0 +1,198 @@
+"""
+Gera uma base sintética com cara de produção para benchmarks e testes.
+
+Uso:
+    python gerar_dados_sinteticos.py --escala 1 --seed 42 [--limpar]
+
+A base usada é a do DATABASE_URL (SQLite ou Postgres), a mesma do app.
+Escala 1 = 1.000 clientes; dashboards e usuários por cliente seguem
+distribuições assimétricas (poucos clientes grandes, muitos pequenos).
+Mesma seed + mesma escala = mesmos dados, ids inclusive.
+Todo usuário gerado tem a senha SENHA_PADRAO; cada cliente tem um
+admin@clienteN.example.com. Clientes com PASTAS_A_PARTIR_DE dashboards ou mais
+organizam tudo em pastas área > recorte (tirado do nome do dashboard).
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import delete, func, select, text
+
+from cxdata_app import (
+    Base, engine, Cliente, User, Dashboard, DashboardPermissao, PastaDashboard, TemaCliente,
+    PERFIL_ADMIN, hash_password, carimbar_versoes,
+)
+
+CLIENTES_POR_ESCALA = 1000
+SENHA_PADRAO = 'bench123'
+TAMANHO_LOTE = 10000
+PASTAS_A_PARTIR_DE = 40
+
+PREFIXOS = ['Alfa', 'Nova', 'Grupo', 'Rede', 'Brasil', 'Atlântica', 'Prime', 'Vale', 'Horizonte', 'Delta',
+            'Sul', 'Norte', 'Central', 'União', 'Real', 'Vitória', 'Aurora', 'Global', 'Master', 'Líder']
+SETORES = ['Varejo', 'Logística', 'Saúde', 'Seguros', 'Telecom', 'Energia', 'Educação', 'Bancos',
+           'Farma', 'Alimentos', 'Construção', 'Turismo', 'Agro', 'Têxtil', 'Automotivo']
+AREAS = ['Vendas', 'Atendimento', 'NPS', 'Churn', 'Financeiro', 'Operações', 'Marketing', 'RH',
+         'Cobrança', 'Estoque', 'SLA', 'Ouvidoria', 'Retenção', 'Qualidade', 'Canais Digitais']
+RECORTES = ['Diário', 'Semanal', 'Mensal', 'Regional', 'Executivo', 'Detalhado', 'por Loja', 'por Produto']
+# (perfil, peso na distribuição de usuários); admin é sempre incluído à parte
+PERFIS = [('diretoria', 2), ('gerente', 6), ('coordenador', 8), ('analista', 20), ('vendas', 15),
+          ('atendimento', 18), ('financeiro', 5), ('marketing', 5), ('operacoes', 8), ('auditoria', 1)]
+TIPOS = [('powerbi', 80), ('looker', 10), ('tableau', 7), ('metabase', 3)]
+
+
+def _assimetrico(rng: random.Random, minimo: int, maximo: int, alpha: float) -> int:
+    """Cauda longa (Pareto): a maioria perto do mínimo, alguns perto do máximo"""
+    return min(maximo, int(minimo * rng.paretovariate(alpha)))
+
+
+def _inserir(conn, tabela, linhas: list):
+    for i in range(0, len(linhas), TAMANHO_LOTE):
+        conn.execute(tabela.insert(), linhas[i:i + TAMANHO_LOTE])
+
+
+def _pastas_por_nome(cliente_id: int, dashboards_cliente: list, pastas: list):
+    """
+    Pastas área > recorte a partir do nome '{área} {recorte} {n}' (sem sortear
+    nada: a mesma seed continua gerando os mesmos dados). Preenche pasta_id dos
+    dashboards e acrescenta as pastas, com ids explícitos, em `pastas`.
+    """
+    ids = {}
+    for dash in dashboards_cliente:
+        area = next(a for a in AREAS if dash['nome'].startswith(a + ' '))
+        recorte = dash['nome'][len(area) + 1:].rsplit(' ', 1)[0]
+        pai = None
+        for nome in (area, recorte):
+            chave = (pai, nome)
+            if chave not in ids:
+                ids[chave] = len(pastas) + 1
+                caminho_pai = pastas[pai - 1]['caminho'] if pai else ''
+                pastas.append({'id': ids[chave], 'cliente_id': cliente_id, 'nome': nome,
+                               'caminho': f'{caminho_pai}{ids[chave]}/', 'profundidade': 1 if pai is None else 2})
+            pai = ids[chave]
+        dash['pasta_id'] = pai
+
+def _ajustar_sequences(conn):
+    if conn.dialect.name == 'postgresql':
+        # Ids foram explícitos: as sequences precisam andar até o max(id)
+        for modelo in (Cliente, User, PastaDashboard, Dashboard, DashboardPermissao):
+            tabela = modelo.__tablename__
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                              f"COALESCE((SELECT MAX(id) FROM {tabela}), 1))"))
+
+
+def gerar_dados(escala: float = 1, seed: int = 42, limpar: bool = False) -> dict:
+    rng = random.Random(seed)
+    senha_hash = hash_password(SENHA_PADRAO)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Cliente.__table__)).scalar():
+            if not limpar:
+                raise RuntimeError("Já existem dados no banco. Use --limpar para apagar e gerar de novo.")
+            # versoes_dados fica: carimbar_versoes só avança os carimbos existentes,
+            # e processos já rodando veem a mudança (inclusive dos clientes que somem)
+            apagados = set(conn.execute(select(Cliente.__table__.c.id)).scalars())
+            for modelo in (DashboardPermissao, Dashboard, PastaDashboard, User, TemaCliente, Cliente):
+                conn.execute(delete(modelo.__table__))
+        else:
+            apagados = set()
+
+        clientes, users, pastas, dashboards, permissoes = [], [], [], [], []
+        perfis_nomes = [p for p, _ in PERFIS]
+        perfis_pesos = [w for _, w in PERFIS]
+        tipos_nomes = [t for t, _ in TIPOS]
+        tipos_pesos = [w for _, w in TIPOS]
+
+        for cliente_id in range(1, int(CLIENTES_POR_ESCALA * escala) + 1):
+            clientes.append({'id': cliente_id, 'nome': f'{rng.choice(PREFIXOS)} {rng.choice(SETORES)} {cliente_id}'})
+
+            # Perfis usados por este cliente: 2 a 8 além do admin
+            perfis_cliente = rng.sample(perfis_nomes, rng.randint(2, 8))
+
+            users.append({'id': len(users) + 1, 'email': f'admin@cliente{cliente_id}.example.com',
+                          'password_hash': senha_hash, 'cliente_id': cliente_id, 'perfil': PERFIL_ADMIN})
+            pesos = [perfis_pesos[perfis_nomes.index(p)] for p in perfis_cliente]
+            for n in range(_assimetrico(rng, 3, 2000, 1.1)):
+                users.append({'id': len(users) + 1, 'email': f'usuario{n}@cliente{cliente_id}.example.com',
+                              'password_hash': senha_hash, 'cliente_id': cliente_id,
+                              'perfil': rng.choices(perfis_cliente, pesos)[0]})
+
+            primeiro_dash = len(dashboards)
+            for n in range(_assimetrico(rng, 2, 500, 1.3)):
+                dash_id = len(dashboards) + 1
+                tipo = rng.choices(tipos_nomes, tipos_pesos)[0]
+                dashboards.append({'id': dash_id, 'cliente_id': cliente_id, 'tipo': tipo,
+                                   'nome': f'{rng.choice(AREAS)} {rng.choice(RECORTES)} {n + 1}',
+                                   'link_embed': f'https://embed.example.com/{tipo}/{cliente_id}/{dash_id}'})
+                for perfil in [PERFIL_ADMIN] + rng.sample(perfis_cliente, rng.randint(0, len(perfis_cliente))):
+                    permissoes.append({'id': len(permissoes) + 1, 'dashboard_id': dash_id, 'perfil': perfil})
+            if len(dashboards) - primeiro_dash >= PASTAS_A_PARTIR_DE:
+                _pastas_por_nome(cliente_id, dashboards[primeiro_dash:], pastas)
+
+        for dash in dashboards:
+            dash.setdefault('pasta_id', None)  # executemany exige as mesmas chaves em todas as linhas
+        for modelo, linhas in ((Cliente, clientes), (User, users), (PastaDashboard, pastas), (Dashboard, dashboards),
+                               (DashboardPermissao, permissoes)):
+            _inserir(conn, modelo.__table__, linhas)
+
+        _ajustar_sequences(conn)
+
+        # Insert em massa não passa pela SessionLocal: carimba as versões à mão
+        # para que processos do app já rodando descartem seus caches
+        carimbar_versoes(conn, apagados | {c['id'] for c in clientes})
+
+    return {'clientes': len(clientes), 'users': len(users), 'pastas': len(pastas), 'dashboards': len(dashboards),
+            'permissoes': len(permissoes)}
+
+
+def gerar_clientes_fixos(dashboards_por_cliente: list, seed: int = 42, clientes_com_pastas: tuple = ()) -> list:
+    """
+    Base pequena e exata para testes de orçamento: o cliente i tem exatamente
+    dashboards_por_cliente[i] dashboards, todos liberados para o seu admin.
+    Os clientes em clientes_com_pastas (ids, a partir de 1) ganham pastas
+    área > recorte. Retorna os emails dos admins, na mesma ordem. Espera uma base vazia.
+    """
+    rng = random.Random(seed)
+    senha_hash = hash_password(SENHA_PADRAO)
+    Base.metadata.create_all(bind=engine)
+    clientes, users, pastas, dashboards, permissoes = [], [], [], [], []
+    for cliente_id, quantidade in enumerate(dashboards_por_cliente, start=1):
+        primeiro_dash = len(dashboards)
+        clientes.append({'id': cliente_id, 'nome': f'{rng.choice(PREFIXOS)} {rng.choice(SETORES)} {cliente_id}'})
+        users.append({'id': cliente_id, 'email': f'admin@cliente{cliente_id}.example.com',
+                      'password_hash': senha_hash, 'cliente_id': cliente_id, 'perfil': PERFIL_ADMIN})
+        for n in range(quantidade):
+            dash_id = len(dashboards) + 1
+            dashboards.append({'id': dash_id, 'cliente_id': cliente_id, 'tipo': 'powerbi',
+                               'nome': f'{rng.choice(AREAS)} {rng.choice(RECORTES)} {n + 1}',
+                               'link_embed': f'https://embed.example.com/powerbi/{cliente_id}/{dash_id}'})
+            permissoes.append({'id': dash_id, 'dashboard_id': dash_id, 'perfil': PERFIL_ADMIN})
+        if cliente_id in clientes_com_pastas:
+            _pastas_por_nome(cliente_id, dashboards[primeiro_dash:], pastas)
+    for dash in dashboards:
+        dash.setdefault('pasta_id', None)
+    with engine.begin() as conn:
+        for modelo, linhas in ((Cliente, clientes), (User, users), (PastaDashboard, pastas), (Dashboard, dashboards),
+                               (DashboardPermissao, permissoes)):
+            _inserir(conn, modelo.__table__, linhas)
+        _ajustar_sequences(conn)
+        carimbar_versoes(conn, {c['id'] for c in clientes})
+    return [u['email'] for u in users]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Gera uma base sintética (determinística) para benchmarks.')
+    parser.add_argument('--escala', type=float, default=1, help=f'1 = {CLIENTES_POR_ESCALA} clientes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--limpar', action='store_true', help='apaga os dados existentes antes de gerar')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        totais = gerar_dados(args.escala, args.seed, args.limpar)
+    except RuntimeError as e:
+        print(e)
+    else:
+        print(f"Sucesso em {time.perf_counter() - inicio:.1f}s: " + ', '.join(f'{n} {k}' for k, n in totais.items()))
+        print(f"Login: admin@cliente1.example.com / {SENHA_PADRAO}")
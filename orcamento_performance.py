@@ -0,0 +1,178 @@
+"""
+Orçamento de performance das páginas: renderiza page_login, page_home e
+page_dashboard com NiceGUI User (sem browser) numa base SQLite temporária
+com clientes de 10, 100 e 1000 dashboards (mais um de 1000 organizado em
+pastas, home_pastas), e compara cada medida com o orçamento abaixo.
+Estourou = sai com código 1 e lista os deltas.
+
+Uso:
+    python orcamento_performance.py [--folga-tempo 1.0] [--mostrar]
+
+Medidas por página e tamanho de cliente:
+  build_ms    mediana de REPETICOES builds com cache quente (GET inicial)
+  sql_frio    statements SQL no build logo após invalidar o cache do cliente
+  sql_quente  statements SQL no build com cache quente
+  elementos   elementos NiceGUI do client
+  payload_kb  tamanho do HTML inicial (inclui o JSON dos elementos)
+
+Ao mudar uma página de propósito, rode com --mostrar e atualize ORCAMENTOS.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import simulacao
+
+TAMANHOS = (10, 100, 1000)
+TAMANHO_PASTAS = 1000  # cliente extra, com pastas: a home só renderiza a raiz
+REPETICOES = 5
+
+# (página, dashboards do cliente) -> teto de cada medida. Tempo tem folga larga
+# (máquinas de CI variam); SQL e elementos são exatos de propósito: uma query ou
+# um elemento por card tem que quebrar aqui.
+ORCAMENTOS = {
+    ('login', None): {'build_ms': 40, 'sql_frio': 0, 'sql_quente': 0, 'elementos': 26, 'payload_kb': 19},
+    ('home', 10): {'build_ms': 40, 'sql_frio': 4, 'sql_quente': 1, 'elementos': 37, 'payload_kb': 32},
+    ('home', 100): {'build_ms': 60, 'sql_frio': 4, 'sql_quente': 1, 'elementos': 37, 'payload_kb': 135},
+    ('home', 1000): {'build_ms': 350, 'sql_frio': 4, 'sql_quente': 1, 'elementos': 37, 'payload_kb': 1150},
+    ('dashboard', 10): {'build_ms': 40, 'sql_frio': 5, 'sql_quente': 2, 'elementos': 39, 'payload_kb': 22},
+    ('dashboard', 100): {'build_ms': 40, 'sql_frio': 5, 'sql_quente': 2, 'elementos': 39, 'payload_kb': 22},
+    ('dashboard', 1000): {'build_ms': 40, 'sql_frio': 5, 'sql_quente': 2, 'elementos': 39, 'payload_kb': 22},
+    ('home_pastas', 1000): {'build_ms': 40, 'sql_frio': 5, 'sql_quente': 1, 'elementos': 37, 'payload_kb': 32},
+}
+
+
+class ContadorSQL:
+    """
+    Conta statements executados na thread do event loop (a do build); pollers em
+    threads ficam de fora. O BEGIN explícito do modo SQLite de produção não conta:
+    no Postgres ele é implícito no driver e os números têm que valer para os dois.
+    """
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.total = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread_id and not statement.startswith('BEGIN'):
+            self.total += 1
+
+
+async def medir_build(navegador: simulacao.Navegador, rota: str, contador: ContadorSQL) -> dict:
+    contador.total = 0
+    inicio = time.perf_counter()
+    resposta = await navegador.baixar(rota)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    assert resposta.status_code == 200, f'{rota}: HTTP {resposta.status_code}'
+    client = navegador.client_da_resposta(resposta)
+    medida = {
+        'build_ms': duracao_ms,
+        'sql': contador.total,
+        'elementos': len(client.elements),
+        'payload_kb': len(resposta.content) / 1024,
+    }
+    client.delete()
+    return medida
+
+
+async def medir_pagina(navegador: simulacao.Navegador, rota: str, contador: ContadorSQL,
+                       invalidar=None) -> dict:
+    if invalidar:
+        invalidar()
+    fria = await medir_build(navegador, rota, contador)
+    quentes = [await medir_build(navegador, rota, contador) for _ in range(REPETICOES)]
+    return {
+        'build_ms': round(statistics.median(m['build_ms'] for m in quentes), 1),
+        'sql_frio': fria['sql'],
+        'sql_quente': max(m['sql'] for m in quentes),
+        'elementos': quentes[-1]['elementos'],
+        'payload_kb': round(quentes[-1]['payload_kb'], 1),
+    }
+
+
+async def medir_tudo(emails: list, senha: str) -> dict:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    contador = ContadorSQL()
+    event.listen(Engine, 'before_cursor_execute', contador)
+    medidas = {}
+    async with simulacao.app_simulado():
+        app_globais = simulacao.globais_do_app()
+        medidas[('login', None)] = await medir_pagina(simulacao.Navegador(), '/login', contador)
+
+        primeiro_dash = 1
+        for cliente_id, (tamanho, email) in enumerate(zip(TAMANHOS, emails), start=1):
+            navegador = await simulacao.logar(email, senha)
+            invalidar = lambda c=cliente_id: app_globais['VersaoDados'].incrementar(c)
+            medidas[('home', tamanho)] = await medir_pagina(navegador, '/', contador, invalidar)
+            medidas[('dashboard', tamanho)] = await medir_pagina(navegador, f'/dashboard/{primeiro_dash}', contador, invalidar)
+            primeiro_dash += tamanho
+            simulacao.apagar_clients()
+
+        cliente_id = len(TAMANHOS) + 1
+        navegador = await simulacao.logar(emails[-1], senha)
+        invalidar = lambda: app_globais['VersaoDados'].incrementar(cliente_id)
+        medidas[('home_pastas', TAMANHO_PASTAS)] = await medir_pagina(navegador, '/', contador, invalidar)
+        simulacao.apagar_clients()
+    event.remove(Engine, 'before_cursor_execute', contador)
+    return medidas
+
+
+def comparar(medidas: dict, folga_tempo: float) -> list:
+    estouros = []
+    for chave, orcamento in ORCAMENTOS.items():
+        for metrica, teto in orcamento.items():
+            if metrica == 'build_ms':
+                teto = teto * folga_tempo
+            valor = medidas[chave][metrica]
+            if valor > teto:
+                estouros.append((chave, metrica, valor, teto))
+    return estouros
+
+
+def nome(chave) -> str:
+    pagina, tamanho = chave
+    return pagina if tamanho is None else f'{pagina}@{tamanho}'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Orçamento de performance das páginas.')
+    parser.add_argument('--folga-tempo', type=float, default=1.0, help='multiplica os orçamentos de build_ms (CI lento)')
+    parser.add_argument('--mostrar', action='store_true', help='imprime as medidas no formato de ORCAMENTOS')
+    args = parser.parse_args()
+
+    simulacao.preparar_ambiente()
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp(prefix="cx-orcamento-")}/orcamento.db'
+    from gerar_dados_sinteticos import gerar_clientes_fixos, SENHA_PADRAO
+    emails = gerar_clientes_fixos(list(TAMANHOS) + [TAMANHO_PASTAS], clientes_com_pastas=(len(TAMANHOS) + 1,))
+
+    medidas = asyncio.run(medir_tudo(emails, SENHA_PADRAO))
+    estouros = comparar(medidas, args.folga_tempo)
+    estourados = {(chave, metrica) for chave, metrica, _, _ in estouros}
+
+    metricas = list(next(iter(ORCAMENTOS.values())))
+    print(f"{'página':<16}" + ''.join(f'{m:>22}' for m in metricas))
+    for chave, orcamento in ORCAMENTOS.items():
+        celulas = []
+        for metrica in metricas:
+            marca = ' !' if (chave, metrica) in estourados else '  '
+            celulas.append(f"{medidas[chave][metrica]:>10g} / {orcamento[metrica]:<7g}{marca}")
+        print(f'{nome(chave):<16}' + ''.join(f'{c:>22}' for c in celulas))
+
+    if args.mostrar:
+        print('\nORCAMENTOS = {')
+        for chave in ORCAMENTOS:
+            print(f'    {chave!r}: {medidas[chave]!r},')
+        print('}')
+
+    if estouros:
+        print(f'\n{len(estouros)} orçamento(s) estourado(s):')
+        for chave, metrica, valor, teto in estouros:
+            print(f'  {nome(chave)} {metrica}: {valor:g} > {teto:g} (+{valor - teto:g})')
+        sys.exit(1)
+    print('\nTodos os orçamentos respeitados.')
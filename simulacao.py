@@ -0,0 +1,99 @@
+"""
+Sessões simuladas (NiceGUI User, sem browser) contra o cxdata_app, para os
+scripts de benchmark e de orçamento de performance.
+
+O app é reexecutado como __main__ dentro de user_simulation: para mexer no estado
+dele (caches, versões) use globais_do_app(); classes sem estado podem vir
+de um import normal do cxdata_app, feito com DATABASE_URL já definido.
+"""
+import inspect
+import os
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import httpx
+from nicegui import Client, core, ui
+from nicegui.storage import Storage
+from nicegui.testing.user import User
+from nicegui.testing.user_simulation import user_simulation
+
+ARQUIVO_APP = Path(__file__).with_name('cxdata_app.py')
+
+
+def preparar_ambiente():
+    """Chamar antes de importar o cxdata_app: desliga o que distorce as medições"""
+    # Nem o load shedding: builds grandes medidos em sequência atrasam o loop de propósito
+    os.environ.setdefault('CX_LOOP_LAG_REJECT_MS', '1000000')
+    # Sem warmup nem pollers rodando SQL no meio das medições
+    os.environ.setdefault('CX_WARMUP_LIMIT', '0')
+    os.environ.setdefault('CX_HEALTH_CHECK_INTERVAL', '3600')
+    os.environ.setdefault('CX_VERSION_POLL_INTERVAL', '3600')
+    # Links sintéticos (embed.example.com) não devem ser sondados
+    os.environ.setdefault('CX_EMBED_PROBE_INTERVAL', '0')
+
+
+class Navegador:
+    """Um cookie jar (sessão) que abre quantos clients quiser, todos vivos até serem apagados"""
+    def __init__(self, cookies: Optional[httpx.Cookies] = None):
+        self.cookies = cookies
+
+    def _http(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(core.app), base_url='http://test', cookies=self.cookies)
+
+    async def abrir(self, rota: str) -> Client:
+        """Build + handshake do websocket, como um browser"""
+        return await User(self._http()).open(rota)
+
+    async def baixar(self, rota: str) -> httpx.Response:
+        """Só o GET inicial (build + payload), sem conectar o websocket"""
+        async with self._http() as http:
+            return await http.get(rota, follow_redirects=True)
+
+    @staticmethod
+    def client_da_resposta(resposta: httpx.Response) -> Optional[Client]:
+        achado = re.search(r"'client_id': '([0-9a-f-]+)'", resposta.text)
+        return Client.instances.get(achado.group(1)) if achado else None
+
+
+def globais_do_app() -> dict:
+    """Globais do cxdata_app que está rodando na simulação (a cópia reexecutada como __main__)"""
+    pagina = next(iter(Client.page_routes))
+    return inspect.unwrap(pagina).__globals__
+
+
+def apagar_clients():
+    for client in list(Client.instances.values()):
+        client.delete()
+
+
+@asynccontextmanager
+async def app_simulado() -> AsyncIterator[User]:
+    Storage.path = Path(tempfile.mkdtemp(prefix='cx-simulacao-storage-'))
+    core.app.storage = Storage()
+    # A simulação de usuários do NiceGUI foi feita para rodar dentro do pytest: o reset
+    # de estado dela (app.storage.clear) e o ui.run só sabem disso por esta variável.
+    # O cxdata_app não a lê; ela vale só enquanto a simulação está aberta.
+    anterior = os.environ.get('PYTEST_CURRENT_TEST')
+    os.environ['PYTEST_CURRENT_TEST'] = 'simulacao'
+    try:
+        async with user_simulation(main_file=ARQUIVO_APP) as user:
+            yield user
+    finally:
+        if anterior is None:
+            os.environ.pop('PYTEST_CURRENT_TEST', None)
+        else:
+            os.environ['PYTEST_CURRENT_TEST'] = anterior
+
+
+async def logar(email: str, senha: str) -> Navegador:
+    """Login pela própria tela de login; devolve um Navegador com a sessão logada"""
+    user = User(Navegador()._http())
+    await user.open('/login')
+    campo_email, campo_senha = sorted(user.find(ui.input).elements, key=lambda e: e.id)[:2]
+    campo_email.value, campo_senha.value = email, senha
+    user.find('Acessar plataforma').click()
+    await user.should_see('Seus Workspaces')
+    return Navegador(user.http_client.cookies)
@@ -0,0 +1,32 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _gerar(banco: Path, *args: str):
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{banco}'}
+    subprocess.run([sys.executable, 'gerar_dados_sinteticos.py', '--escala', '0.01', *args],
+                   cwd=RAIZ, env=env, check=True, capture_output=True, timeout=300)
+
+
+def _versoes(banco: Path) -> dict:
+    with sqlite3.connect(banco) as conn:
+        return dict(conn.execute('SELECT cliente_id, versao FROM versoes_dados').fetchall())
+
+
+def test_limpar_avanca_os_carimbos_de_versao(tmp_path):
+    banco = tmp_path / 'cx.db'
+    _gerar(banco)
+    antes = _versoes(banco)
+
+    _gerar(banco, '--limpar')
+    depois = _versoes(banco)
+
+    # Processos já rodando comparam a versão global: se ela voltasse a 1,
+    # continuariam servindo o cache da base apagada
+    assert depois[0] > antes[0]
+    assert all(depois[cliente_id] > versao for cliente_id, versao in antes.items())